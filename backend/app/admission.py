@@ -0,0 +1,332 @@
+"""Priority-aware admission control and per-client rate limiting.
+
+Every API request is assigned a traffic class:
+* the first ``ADMISSION_ROUTES`` pattern matching ``"METHOD /path"`` (path below ``API_PREFIX``);
+* otherwise the class of the caller's role in ``ADMISSION_ROLES``, read from the access token;
+* otherwise ``interactive``.
+
+Each class has:
+* a token bucket per client (user or address), whose refusals answer ``429``;
+* its own concurrency cap;
+* a bounded queue.
+
+All classes also share ``ADMISSION_MAX_CONCURRENCY``. When slots free up, waiting requests
+are admitted in class priority order, so machine ingest is not starved by exports. A
+request that finds its class queue full, or waits longer than the class allows, is shed
+with ``503``. Both rejections carry ``Retry-After``.
+
+Limits apply per worker process.
+"""
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import json
+import logging
+import math
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+
+from .config import get_settings
+from .metrics import Counter, Gauge, Histogram, registry
+from .security import decode_token
+
+logger = logging.getLogger(__name__)
+
+ADMITTED_REQUESTS = registry.register(
+    Counter("admission_admitted_total", "Requests admitted by traffic class and whether they queued.", ("class", "queued"))
+)
+REJECTED_REQUESTS = registry.register(
+    Counter(
+        "admission_rejected_total",
+        "Requests refused by traffic class and reason (rate_limited, queue_full, queue_timeout).",
+        ("class", "reason"),
+    )
+)
+QUEUE_DEPTH = registry.register(Gauge("admission_queue_depth", "Requests waiting for admission.", ("class",)))
+ADMITTED_IN_FLIGHT = registry.register(Gauge("admission_in_flight", "Admitted requests still running.", ("class",)))
+QUEUE_WAIT = registry.register(
+    Histogram("admission_queue_wait_seconds", "Time queued requests waited before admission.", ("class",))
+)
+
+DEFAULT_CLASS = "interactive"
+# Idle buckets are pruned once this many clients have been seen.
+_MAX_BUCKETS = 10_000
+
+
+@dataclass(frozen=True)
+class TrafficClass:
+    """Admission limits of one class of requests."""
+
+    name: str
+    priority: int
+    concurrency: int
+    queue: int
+    queue_timeout: float
+    rate: Optional[float] = None
+    burst: float = 1.0
+
+
+DEFAULT_CLASSES: dict[str, TrafficClass] = {
+    "ingest": TrafficClass("ingest", priority=0, concurrency=32, queue=256, queue_timeout=10.0),
+    "interactive": TrafficClass(
+        "interactive", priority=1, concurrency=32, queue=128, queue_timeout=5.0, rate=20.0, burst=40.0
+    ),
+    "bulk": TrafficClass("bulk", priority=2, concurrency=2, queue=8, queue_timeout=30.0, rate=0.5, burst=3.0),
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; ``retry_after`` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def load_classes(overrides: dict[str, dict[str, float]]) -> dict[str, TrafficClass]:
+    """Default classes updated, or extended, with ``ADMISSION_CLASSES`` settings."""
+
+    classes = dict(DEFAULT_CLASSES)
+    for name, values in overrides.items():
+        base = classes.get(name) or TrafficClass(name, priority=len(classes), concurrency=8, queue=32, queue_timeout=10.0)
+        classes[name] = replace(base, **values)
+    return classes
+
+
+class TokenBuckets:
+    """Per-client token buckets of one class."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, client: str, now: float) -> float:
+        """Take a token for ``client``; returns 0 on success, else seconds until one is available."""
+
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1.0:
+            self._buckets[client] = (tokens, now)
+            return (1.0 - tokens) / self.rate
+        if len(self._buckets) >= _MAX_BUCKETS and client not in self._buckets:
+            self._prune(now)
+        self._buckets[client] = (tokens - 1.0, now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        refill = self.burst / self.rate
+        self._buckets = {
+            client: state for client, state in self._buckets.items() if now - state[1] < refill
+        }
+
+
+class AdmissionController:
+    """Concurrency slots shared by all classes and granted to waiters in priority order."""
+
+    def __init__(self, classes: dict[str, TrafficClass], max_concurrency: int) -> None:
+        self.classes = classes
+        self.max_concurrency = max_concurrency
+        self._by_priority = sorted(classes.values(), key=lambda traffic_class: traffic_class.priority)
+        self._buckets = {
+            name: TokenBuckets(traffic_class.rate, traffic_class.burst)
+            for name, traffic_class in classes.items()
+            if traffic_class.rate
+        }
+        self._running = dict.fromkeys(classes, 0)
+        self._total = 0
+        self._waiters: dict[str, deque[asyncio.Future[None]]] = {name: deque() for name in classes}
+        # Moving average of admitted request duration per class, for Retry-After estimates.
+        self._service_seconds = dict.fromkeys(classes, 0.1)
+
+    def _has_capacity(self, traffic_class: TrafficClass) -> bool:
+        return self._total < self.max_concurrency and self._running[traffic_class.name] < traffic_class.concurrency
+
+    def _queued_ahead(self, traffic_class: TrafficClass) -> bool:
+        return any(
+            self._waiters[other.name]
+            for other in self._by_priority
+            if other.priority <= traffic_class.priority
+        )
+
+    def _start(self, name: str) -> None:
+        self._running[name] += 1
+        self._total += 1
+        ADMITTED_IN_FLIGHT.inc((name,))
+
+    def _retry_after(self, traffic_class: TrafficClass) -> float:
+        backlog = len(self._waiters[traffic_class.name]) + 1
+        return backlog * self._service_seconds[traffic_class.name] / traffic_class.concurrency
+
+    async def acquire(self, traffic_class: TrafficClass, client: str) -> float:
+        """Wait for a slot for ``traffic_class``; returns the seconds spent queued."""
+
+        name = traffic_class.name
+        buckets = self._buckets.get(name)
+        if buckets is not None:
+            wait = buckets.take(client, time.monotonic())
+            if wait:
+                raise AdmissionRejected("rate_limited", wait)
+        if self._has_capacity(traffic_class) and not self._queued_ahead(traffic_class):
+            self._start(name)
+            ADMITTED_REQUESTS.inc((name, "false"))
+            return 0.0
+        waiters = self._waiters[name]
+        if len(waiters) >= traffic_class.queue:
+            raise AdmissionRejected("queue_full", self._retry_after(traffic_class))
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        QUEUE_DEPTH.inc((name,))
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(traffic_class.queue_timeout):
+                await waiter
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the wait ended: hand the slot to the next waiter.
+                self.release(traffic_class, 0.0)
+            else:
+                waiter.cancel()
+                waiters.remove(waiter)
+                QUEUE_DEPTH.dec((name,))
+            if isinstance(exc, TimeoutError):
+                raise AdmissionRejected("queue_timeout", self._retry_after(traffic_class)) from None
+            raise
+        waited = time.monotonic() - started
+        ADMITTED_REQUESTS.inc((name, "true"))
+        QUEUE_WAIT.observe(waited, (name,))
+        return waited
+
+    def release(self, traffic_class: TrafficClass, seconds: float) -> None:
+        name = traffic_class.name
+        self._running[name] -= 1
+        self._total -= 1
+        ADMITTED_IN_FLIGHT.dec((name,))
+        if seconds:
+            self._service_seconds[name] += 0.2 * (seconds - self._service_seconds[name])
+        self._wake()
+
+    def _wake(self) -> None:
+        for traffic_class in self._by_priority:
+            waiters = self._waiters[traffic_class.name]
+            while waiters and self._has_capacity(traffic_class):
+                waiter = waiters.popleft()
+                QUEUE_DEPTH.dec((traffic_class.name,))
+                self._start(traffic_class.name)
+                waiter.set_result(None)
+            if self._total >= self.max_concurrency:
+                return
+
+    def status(self) -> dict[str, Any]:
+        return {
+            name: {"running": self._running[name], "queued": len(self._waiters[name])}
+            for name in self.classes
+        }
+
+
+def _compile_routes(routes: dict[str, str]) -> list[tuple[re.Pattern[str], str]]:
+    compiled = []
+    for pattern, name in routes.items():
+        method, _, path = pattern.partition(" ") if " " in pattern else ("*", "", pattern)
+        compiled.append((re.compile(fnmatch.translate(f"{method.upper()} {path}")), name))
+    return compiled
+
+
+def _caller(scope: dict[str, Any]) -> tuple[Optional[str], Optional[str]]:
+    """``(subject, role)`` from a valid bearer token, if any."""
+
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                break
+            try:
+                payload = decode_token(token)
+            except Exception:  # noqa: BLE001 - invalid tokens are handled by the endpoint
+                break
+            return payload.get("sub"), payload.get("role")
+    return None, None
+
+
+async def _send_rejection(send: Any, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware classifying API requests and admitting them within their class limits."""
+
+    def __init__(self, app: Any) -> None:
+        settings = get_settings()
+        self.app = app
+        self.prefix = settings.api_prefix
+        self.routes = _compile_routes(settings.admission_routes)
+        self.roles = settings.admission_roles
+        classes = load_classes(settings.admission_classes)
+        unknown = {*settings.admission_routes.values(), *settings.admission_roles.values()} - classes.keys()
+        if unknown:
+            raise ValueError(f"Admission rules refer to undefined traffic classes: {', '.join(sorted(unknown))}")
+        self.controller = AdmissionController(classes, settings.admission_max_concurrency)
+
+    def classify(self, scope: dict[str, Any]) -> tuple[TrafficClass, str]:
+        """Traffic class of the request and the client its rate limit is tracked under."""
+
+        path = scope["path"][len(self.prefix) :]
+        subject, role = _caller(scope)
+        client = f"user:{subject}" if subject else f"address:{(scope.get('client') or ('unknown',))[0]}"
+        target = f"{scope['method']} {path}"
+        for pattern, name in self.routes:
+            if pattern.match(target):
+                return self.controller.classes[name], client
+        name = self.roles.get(role, DEFAULT_CLASS) if role else DEFAULT_CLASS
+        return self.controller.classes[name], client
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix + "/"):
+            await self.app(scope, receive, send)
+            return
+
+        traffic_class, client = self.classify(scope)
+        try:
+            await self.controller.acquire(traffic_class, client)
+        except AdmissionRejected as exc:
+            REJECTED_REQUESTS.inc((traffic_class.name, exc.reason))
+            if exc.reason == "rate_limited":
+                await _send_rejection(send, 429, "Rate limit exceeded", exc.retry_after)
+            else:
+                logger.warning("Shedding %s %s (%s, class %s)", scope["method"], scope["path"], exc.reason, traffic_class.name)
+                await _send_rejection(send, 503, "Server is busy, retry later", exc.retry_after)
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(traffic_class, time.monotonic() - started)
+
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionMiddleware",
+    "AdmissionRejected",
+    "DEFAULT_CLASSES",
+    "TokenBuckets",
+    "TrafficClass",
+    "load_classes",
+]
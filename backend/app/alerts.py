@@ -0,0 +1,360 @@
+"""Overdue action and shot threshold alerting."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_WATERMARK = "action_overdue"
+THRESHOLD_WATERMARK = "shot_threshold"
+_OPEN_ACTION_STATUSES = (models.ActionStatus.open, models.ActionStatus.in_progress)
+# Rows flushed just before a run may commit after it; re-reading this window is
+# harmless because alert keys are deduplicated.
+_WATERMARK_GRACE = timedelta(minutes=1)
+
+
+@dataclass(frozen=True)
+class Alert:
+    """A single alert ready to be recorded and delivered."""
+
+    key: str
+    kind: str
+    entity_id: str
+    message: str
+    recipient_id: Optional[str] = None
+
+
+@dataclass
+class AlertBatch:
+    """Alerts coalesced for one recipient (``None`` addresses the maintenance team)."""
+
+    recipient_id: Optional[str]
+    recipient_name: Optional[str] = None
+    recipient_email: Optional[str] = None
+    alerts: list[Alert] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "recipient_id": self.recipient_id,
+            "recipient_name": self.recipient_name,
+            "recipient_email": self.recipient_email,
+            "alerts": [asdict(alert) for alert in self.alerts],
+        }
+
+
+class Notifier(ABC):
+    """Delivery channel for coalesced alert batches."""
+
+    @abstractmethod
+    async def send(self, batch: AlertBatch) -> None:
+        """Deliver a batch, raising on failure so it is retried on the next run."""
+
+
+class LogNotifier(Notifier):
+    """Write alert batches to the application log."""
+
+    async def send(self, batch: AlertBatch) -> None:
+        recipient = batch.recipient_name or batch.recipient_id or "maintenance team"
+        for alert in batch.alerts:
+            logger.warning("Alert for %s: %s", recipient, alert.message)
+
+
+class FileNotifier(Notifier):
+    """Append alert batches as JSON lines to a file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def _append(self, line: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+    async def send(self, batch: AlertBatch) -> None:
+        await asyncio.to_thread(self._append, json.dumps(batch.to_dict()))
+
+
+class WebhookNotifier(Notifier):
+    """POST alert batches as JSON to a webhook URL."""
+
+    def __init__(self, url: str, timeout: float = 10.0) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, body: bytes) -> None:
+        request = urllib.request.Request(
+            self.url, data=body, method="POST", headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):  # noqa: S310 - URL is operator configured
+            pass
+
+    async def send(self, batch: AlertBatch) -> None:
+        await asyncio.to_thread(self._post, json.dumps(batch.to_dict()).encode("utf-8"))
+
+
+class MemoryNotifier(Notifier):
+    """Collect alert batches in memory; intended for tests and local development."""
+
+    def __init__(self) -> None:
+        self.batches: list[AlertBatch] = []
+
+    async def send(self, batch: AlertBatch) -> None:
+        self.batches.append(batch)
+
+
+def build_notifier(settings: Settings) -> Notifier:
+    """Create the notifier selected by ``alert_notifier``."""
+
+    channel = settings.alert_notifier
+    if channel == "log":
+        return LogNotifier()
+    if channel == "memory":
+        return MemoryNotifier()
+    if not settings.alert_notifier_target:
+        raise ValueError(f"alert_notifier_target is required for the {channel} notifier")
+    if channel == "file":
+        return FileNotifier(settings.alert_notifier_target)
+    if channel == "webhook":
+        return WebhookNotifier(settings.alert_notifier_target)
+    raise ValueError(f"Unknown alert notifier: {channel}")
+
+
+_notifier: Optional[Notifier] = None
+
+
+def get_notifier() -> Notifier:
+    """Return the active notifier, building it from settings on first use."""
+
+    global _notifier
+    if _notifier is None:
+        _notifier = build_notifier(get_settings())
+    return _notifier
+
+
+def set_notifier(notifier: Optional[Notifier]) -> None:
+    """Replace the active notifier (``None`` rebuilds it from settings)."""
+
+    global _notifier
+    _notifier = notifier
+
+
+async def _load_watermarks(session: AsyncSession) -> dict[str, models.AlertWatermark]:
+    result = await session.execute(select(models.AlertWatermark))
+    return {mark.name: mark for mark in result.scalars().all()}
+
+
+def _set_watermark(session: AsyncSession, marks: dict[str, models.AlertWatermark], name: str, value: datetime) -> None:
+    mark = marks.get(name)
+    if mark is None:
+        session.add(models.AlertWatermark(name=name, value=value))
+    else:
+        mark.value = value
+
+
+async def _newly_overdue(session: AsyncSession, since: Optional[datetime], today: date) -> list[Alert]:
+    """Open actions that became overdue, or were changed while overdue, since ``since``.
+
+    Both lookups are range scans: the ``(status, due_date)`` index covers due dates that
+    fell in ``[since, today)`` and the ``updated_at`` index covers actions created or
+    edited with a due date already in the past.
+    """
+
+    base = select(models.ActionItem).where(
+        models.ActionItem.status.in_(_OPEN_ACTION_STATUSES),
+        models.ActionItem.due_date < today,
+    )
+    queries = [base]
+    if since is not None:
+        queries = [
+            base.where(models.ActionItem.due_date >= since.date()),
+            base.where(models.ActionItem.updated_at >= since),
+        ]
+
+    items: dict[str, models.ActionItem] = {}
+    for query in queries:
+        result = await session.execute(query)
+        for item in result.scalars().all():
+            items[item.id] = item
+    return [
+        Alert(
+            key=f"action_overdue:{item.id}:{item.due_date.isoformat()}",
+            kind="action_overdue",
+            entity_id=item.id,
+            message=f"Action '{item.title}' was due on {item.due_date.isoformat()}",
+            recipient_id=item.assigned_to,
+        )
+        for item in items.values()
+    ]
+
+
+async def _threshold_crossings(session: AsyncSession, since: Optional[datetime], thresholds: list[float]) -> list[Alert]:
+    """Tools updated since ``since`` whose shot count has crossed a threshold."""
+
+    if not thresholds:
+        return []
+    lowest = min(thresholds)
+    query = select(models.Tool).where(
+        models.Tool.max_shot_count.is_not(None),
+        models.Tool.max_shot_count > 0,
+        models.Tool.current_shot_count >= models.Tool.max_shot_count * lowest,
+    )
+    if since is not None:
+        query = query.where(models.Tool.updated_at >= since)
+    result = await session.execute(query)
+
+    alerts: list[Alert] = []
+    for tool in result.scalars().all():
+        ratio = tool.current_shot_count / tool.max_shot_count
+        crossed = max((level for level in thresholds if ratio >= level), default=None)
+        if crossed is None:
+            continue
+        alerts.append(
+            Alert(
+                key=f"shot_threshold:{tool.id}:{crossed:g}",
+                kind="shot_threshold",
+                entity_id=tool.id,
+                message=(
+                    f"Tool {tool.asset_number} ({tool.name}) is at {tool.current_shot_count} shots, "
+                    f"{ratio:.0%} of its {tool.max_shot_count} shot limit"
+                ),
+            )
+        )
+    return alerts
+
+
+async def _record(session: AsyncSession, alerts: list[Alert]) -> int:
+    """Store alerts that have not been seen before and return how many were new."""
+
+    if not alerts:
+        return 0
+    keys = [alert.key for alert in alerts]
+    existing = await session.execute(
+        select(models.AlertDelivery.alert_key).where(models.AlertDelivery.alert_key.in_(keys))
+    )
+    seen = set(existing.scalars().all())
+    created = 0
+    for alert in alerts:
+        if alert.key in seen:
+            continue
+        seen.add(alert.key)
+        session.add(
+            models.AlertDelivery(
+                alert_key=alert.key,
+                kind=alert.kind,
+                entity_id=alert.entity_id,
+                recipient_id=alert.recipient_id,
+                message=alert.message,
+            )
+        )
+        created += 1
+    return created
+
+
+async def deliver_pending(session: AsyncSession, notifier: Notifier) -> dict[str, int]:
+    """Send every undelivered alert, one batch per recipient."""
+
+    result = await session.execute(
+        select(models.AlertDelivery)
+        .where(models.AlertDelivery.status != models.AlertStatus.sent)
+        .order_by(models.AlertDelivery.created_at)
+    )
+    deliveries = result.scalars().all()
+    grouped: dict[Optional[str], list[models.AlertDelivery]] = defaultdict(list)
+    for delivery in deliveries:
+        grouped[delivery.recipient_id].append(delivery)
+
+    recipient_ids = [recipient for recipient in grouped if recipient is not None]
+    users: dict[str, models.User] = {}
+    if recipient_ids:
+        user_rows = await session.execute(select(models.User).where(models.User.id.in_(recipient_ids)))
+        users = {user.id: user for user in user_rows.scalars().all()}
+
+    sent = failed = 0
+    for recipient_id, rows in grouped.items():
+        user = users.get(recipient_id) if recipient_id else None
+        batch = AlertBatch(
+            recipient_id=recipient_id,
+            recipient_name=user.full_name if user else None,
+            recipient_email=user.email if user else None,
+            alerts=[
+                Alert(row.alert_key, row.kind, row.entity_id, row.message, row.recipient_id) for row in rows
+            ],
+        )
+        try:
+            await notifier.send(batch)
+        except Exception as exc:  # noqa: BLE001 - retried on the next evaluation
+            logger.exception("Alert delivery to %s failed", recipient_id or "maintenance team")
+            for row in rows:
+                row.status = models.AlertStatus.failed
+                row.attempts += 1
+                row.last_error = f"{type(exc).__name__}: {exc}"
+            failed += len(rows)
+        else:
+            delivered_at = datetime.utcnow()
+            for row in rows:
+                row.status = models.AlertStatus.sent
+                row.attempts += 1
+                row.delivered_at = delivered_at
+            sent += len(rows)
+        await session.commit()
+    return {"sent": sent, "failed": failed}
+
+
+async def evaluate_alerts(
+    session: AsyncSession,
+    notifier: Optional[Notifier] = None,
+    *,
+    now: Optional[datetime] = None,
+    thresholds: Optional[list[float]] = None,
+) -> dict[str, int]:
+    """Detect new alerts since the last run, record them and deliver pending batches."""
+
+    now = now or datetime.utcnow()
+    today = now.date()
+    thresholds = sorted(thresholds if thresholds is not None else get_settings().alert_shot_thresholds)
+    marks = await _load_watermarks(session)
+
+    overdue_since = marks[OVERDUE_WATERMARK].value if OVERDUE_WATERMARK in marks else None
+    overdue = await _newly_overdue(session, overdue_since, today)
+
+    threshold_since = marks[THRESHOLD_WATERMARK].value if THRESHOLD_WATERMARK in marks else None
+    crossings = await _threshold_crossings(session, threshold_since, thresholds)
+
+    created = await _record(session, overdue + crossings)
+    _set_watermark(session, marks, OVERDUE_WATERMARK, now - _WATERMARK_GRACE)
+    _set_watermark(session, marks, THRESHOLD_WATERMARK, now - _WATERMARK_GRACE)
+    await session.commit()
+
+    delivery = await deliver_pending(session, notifier or get_notifier())
+    return {"overdue": len(overdue), "thresholds": len(crossings), "created": created, **delivery}
+
+
+__all__ = [
+    "Alert",
+    "AlertBatch",
+    "FileNotifier",
+    "LogNotifier",
+    "MemoryNotifier",
+    "Notifier",
+    "WebhookNotifier",
+    "build_notifier",
+    "deliver_pending",
+    "evaluate_alerts",
+    "get_notifier",
+    "set_notifier",
+]
@@ -0,0 +1,277 @@
+"""Online SQLite backups using the engine's incremental backup API.
+
+Snapshots are copied a bounded number of pages at a time in a worker thread, pausing
+between steps so the event loop and writers keep running. In WAL mode the copy reads from
+one pinned snapshot, so concurrent commits neither block it nor force it to restart. Each
+snapshot gets a JSON manifest with its SHA-256 and integrity check result::
+
+    python -m app.backup create
+    python -m app.backup list
+    python -m app.backup verify <name>
+    python -m app.backup restore <name>
+
+Restoring replaces the live database contents; stop the API workers first.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from .config import get_settings
+from .database import sqlite_database_path
+
+_SUFFIX = ".sqlite3"
+# Labels become part of the snapshot file name.
+_LABEL = re.compile(r"[A-Za-z0-9_-]{1,32}")
+
+
+class BackupError(RuntimeError):
+    """Raised when a backup cannot be taken, verified or restored."""
+
+
+class UnknownBackupError(BackupError):
+    """Raised when a named snapshot does not exist."""
+
+
+@dataclass(frozen=True)
+class BackupManifest:
+    name: str
+    created_at: datetime
+    label: Optional[str]
+    size_bytes: int
+    pages: int
+    sha256: str
+    integrity: str
+    duration_seconds: float
+
+    def to_json(self) -> str:
+        return json.dumps({**asdict(self), "created_at": self.created_at.isoformat()}, indent=2)
+
+    @classmethod
+    def from_json(cls, content: str) -> "BackupManifest":
+        data = json.loads(content)
+        return cls(**{**data, "created_at": datetime.fromisoformat(data["created_at"])})
+
+
+def _directory() -> Path:
+    return Path(get_settings().backup_directory)
+
+
+def _database() -> Path:
+    path = sqlite_database_path()
+    if path is None:
+        raise BackupError("Online backups are only available for SQLite file databases")
+    return path
+
+
+def _manifest_path(snapshot: Path) -> Path:
+    return snapshot.with_suffix(".json")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection, pages: int, pause: float) -> None:
+    wal = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    if wal:
+        # Hold one read transaction so every step copies the same snapshot; WAL writers are
+        # not blocked by it and the backup never restarts because of their commits.
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        source.backup(target, pages=pages, progress=progress)
+    finally:
+        if wal:
+            source.execute("COMMIT")
+
+
+def _snapshot(database: Path, target: Path, pages: int, pause: float) -> tuple[int, str]:
+    source = sqlite3.connect(f"file:{database}?mode=ro", uri=True, isolation_level=None)
+    destination = sqlite3.connect(target, isolation_level=None)
+    try:
+        _copy(source, destination, pages, pause)
+        # Make the snapshot a single self-contained file.
+        destination.execute("PRAGMA journal_mode = DELETE")
+        integrity = destination.execute("PRAGMA integrity_check").fetchone()[0]
+        page_count = destination.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        destination.close()
+        source.close()
+    return page_count, integrity
+
+
+def _create(label: Optional[str]) -> BackupManifest:
+    if label is not None and not _LABEL.fullmatch(label):
+        raise BackupError("Backup labels are 1 to 32 letters, digits, '-' or '_'")
+    settings = get_settings()
+    database = _database()
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.utcnow()
+    name = f"{database.stem}-{created_at.strftime('%Y%m%dT%H%M%S%f')}{f'-{label}' if label else ''}"
+    snapshot = directory / f"{name}{_SUFFIX}"
+    temporary = directory / f".{name}.tmp"
+
+    started = time.perf_counter()
+    try:
+        pages, integrity = _snapshot(
+            database, temporary, max(1, settings.backup_pages_per_step), settings.backup_step_pause_seconds
+        )
+        if integrity != "ok":
+            raise BackupError(f"Snapshot failed its integrity check: {integrity}")
+        with temporary.open("rb") as handle:
+            os.fsync(handle.fileno())
+        manifest = BackupManifest(
+            name=name,
+            created_at=created_at,
+            label=label,
+            size_bytes=temporary.stat().st_size,
+            pages=pages,
+            sha256=_sha256(temporary),
+            integrity=integrity,
+            duration_seconds=round(time.perf_counter() - started, 3),
+        )
+        os.replace(temporary, snapshot)
+    finally:
+        temporary.unlink(missing_ok=True)
+    _manifest_path(snapshot).write_text(manifest.to_json(), encoding="utf-8")
+    return manifest
+
+
+def _list() -> list[BackupManifest]:
+    directory = _directory()
+    if not directory.is_dir():
+        return []
+    manifests = []
+    for path in directory.glob(f"*{_SUFFIX}"):
+        try:
+            manifests.append(BackupManifest.from_json(_manifest_path(path).read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError, KeyError):
+            continue
+    return sorted(manifests, key=lambda manifest: manifest.created_at, reverse=True)
+
+
+def _rotate(keep: int) -> list[str]:
+    removed = []
+    for manifest in _list()[max(keep, 1) :]:
+        snapshot = _directory() / f"{manifest.name}{_SUFFIX}"
+        snapshot.unlink(missing_ok=True)
+        _manifest_path(snapshot).unlink(missing_ok=True)
+        removed.append(manifest.name)
+    return removed
+
+
+def _verify(name: str) -> BackupManifest:
+    snapshot = _directory() / f"{name}{_SUFFIX}"
+    if snapshot.parent != _directory() or name.startswith("."):
+        raise UnknownBackupError(name)
+    try:
+        manifest = BackupManifest.from_json(_manifest_path(snapshot).read_text(encoding="utf-8"))
+    except FileNotFoundError as exc:
+        raise UnknownBackupError(name) from exc
+    if not snapshot.is_file() or _sha256(snapshot) != manifest.sha256:
+        raise BackupError(f"Backup {name} failed checksum verification")
+    connection = sqlite3.connect(f"file:{snapshot}?mode=ro", uri=True)
+    try:
+        integrity = connection.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        connection.close()
+    if integrity != "ok":
+        raise BackupError(f"Backup {name} failed its integrity check: {integrity}")
+    return manifest
+
+
+def _restore(name: str) -> BackupManifest:
+    manifest = _verify(name)
+    settings = get_settings()
+    source = sqlite3.connect(f"file:{_directory() / f'{name}{_SUFFIX}'}?mode=ro", uri=True, isolation_level=None)
+    destination = sqlite3.connect(_database(), isolation_level=None)
+    try:
+        # Copying through the backup API takes the database locks properly, including the WAL.
+        source.backup(destination, pages=max(1, settings.backup_pages_per_step))
+    finally:
+        destination.close()
+        source.close()
+    return manifest
+
+
+async def create_backup(label: Optional[str] = None) -> dict[str, Any]:
+    """Snapshot the live database, then delete snapshots beyond the retention count."""
+
+    manifest = await asyncio.to_thread(_create, label)
+    removed = await asyncio.to_thread(_rotate, get_settings().backup_keep)
+    return {"backup": manifest.name, "sha256": manifest.sha256, "size_bytes": manifest.size_bytes, "removed": removed}
+
+
+async def list_backups() -> list[BackupManifest]:
+    """Return the manifests of available snapshots, newest first."""
+
+    return await asyncio.to_thread(_list)
+
+
+async def verify_backup(name: str) -> BackupManifest:
+    """Check a snapshot's checksum and run SQLite's integrity check on it."""
+
+    return await asyncio.to_thread(_verify, name)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Back up and restore the Tool Maintenance database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="take a snapshot now")
+    create.add_argument("--label")
+    commands.add_parser("list", help="list snapshots")
+    commands.add_parser("verify", help="verify a snapshot").add_argument("name")
+    restore = commands.add_parser("restore", help="replace the database with a snapshot")
+    restore.add_argument("name")
+    restore.add_argument("--no-safety-copy", action="store_true", help="skip the snapshot taken before restoring")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "create":
+            print(json.dumps(asyncio.run(create_backup(args.label)), indent=2))
+        elif args.command == "list":
+            for manifest in _list():
+                print(f"{manifest.name}  {manifest.size_bytes} bytes  {manifest.sha256}")
+        elif args.command == "verify":
+            print(f"{_verify(args.name).name}: ok")
+        else:
+            if not args.no_safety_copy:
+                print(f"saved current database as {_create('pre-restore').name}")
+            print(f"restored {_restore(args.name).name}")
+    except BackupError as exc:
+        parser.exit(1, f"error: {exc}\n")
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = [
+    "BackupError",
+    "BackupManifest",
+    "UnknownBackupError",
+    "create_backup",
+    "list_backups",
+    "verify_backup",
+]
@@ -0,0 +1 @@
+"""Synthetic plant data generation, in-process load testing and latency baselines."""
@@ -0,0 +1,130 @@
+"""Command line entry point: ``python -m app.benchmarks {generate,run,ids}``.
+
+Point ``DATABASE_URL`` at a scratch database before running; ``generate`` refuses to add
+data to a database that already contains tools unless ``--reset`` is given.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import platform
+import sys
+from dataclasses import asdict, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from .. import models
+from ..database import SessionLocal, get_engine, init_models
+from . import ids
+from .datagen import PROFILES, clear, generate
+from .load import LoadDriver, WorkloadMix
+from .report import compare, format_table, load_baseline, save_baseline
+
+
+async def _generate(args: argparse.Namespace) -> int:
+    profile = PROFILES[args.profile]
+    overrides = {
+        name: value
+        for name, value in (("tools", args.tools), ("shot_counters", args.shot_counters), ("years", args.years), ("seed", args.seed))
+        if value is not None
+    }
+    profile = replace(profile, **overrides)
+    await init_models()
+    async with SessionLocal() as session:
+        existing = (await session.execute(select(func.count()).select_from(models.Tool))).scalar_one()
+    if existing and not args.reset:
+        print(f"Database already contains {existing} tools; pass --reset to replace them", file=sys.stderr)
+        return 1
+    if args.reset:
+        await clear()
+    print(f"Generating {args.profile} plant: {asdict(profile)}")
+    await generate(profile, progress=lambda table, count, seconds: print(f"  {table:<20} {count:>10} rows {seconds:8.2f}s"))
+    return 0
+
+
+async def _run(args: argparse.Namespace) -> int:
+    from ..main import app  # noqa: WPS433 - import after DATABASE_URL is configured
+
+    mix = WorkloadMix(*args.mix) if args.mix else WorkloadMix()
+    async with app.router.lifespan_context(app):
+        driver = LoadDriver(app, concurrency=args.concurrency, mix=mix, seed=args.seed or 7)
+        result = await driver.run(duration=args.duration, operations=args.operations)
+    result["recorded_at"] = datetime.utcnow().isoformat()
+    result["database"] = get_engine().url.render_as_string(hide_password=True)
+    result["platform"] = {"python": platform.python_version(), "machine": platform.machine()}
+
+    print(format_table(result["endpoints"]))
+    total = result["total"]
+    print(f"\n{total['requests']} requests, {total['errors']} errors, {total['throughput_rps']} req/s")
+
+    exit_code = 0
+    if args.compare:
+        regressions = compare(load_baseline(args.compare), result, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if not regressions:
+            print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+        exit_code = 1 if regressions else 0
+    if args.save:
+        save_baseline(args.save, result)
+        print(f"Saved results to {args.save}")
+    return exit_code
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.benchmarks", description="Tool Maintenance benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Fill the database with a synthetic plant.")
+    gen.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    gen.add_argument("--tools", type=int)
+    gen.add_argument("--shot-counters", type=int)
+    gen.add_argument("--years", type=int)
+    gen.add_argument("--seed", type=int)
+    gen.add_argument("--reset", action="store_true", help="Delete existing plant data first.")
+
+    run = commands.add_parser("run", help="Replay the workload mix and report latency percentiles.")
+    limit = run.add_mutually_exclusive_group()
+    limit.add_argument("--duration", type=float, default=None, help="Seconds to run (default 30).")
+    limit.add_argument("--operations", type=int, help="Total operations across all virtual users.")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--seed", type=int)
+    run.add_argument(
+        "--mix",
+        type=float,
+        nargs=4,
+        metavar=("INGEST", "DASHBOARD", "EDIT", "LOGIN"),
+        help="Relative weights of the workload operations.",
+    )
+    run.add_argument("--save", type=Path, help="Write the results to this baseline file.")
+    run.add_argument("--compare", type=Path, help="Fail if results regress against this baseline file.")
+    run.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 0.2).")
+
+    id_bench = commands.add_parser("ids", help="Compare insert and lookup cost of id schemes on scratch SQLite files.")
+    id_bench.add_argument("--rows", type=int, default=200_000)
+    id_bench.add_argument("--lookups", type=int, default=20_000)
+    id_bench.add_argument("--cache-kib", type=int, default=2048, help="SQLite page cache size per database.")
+
+    args = parser.parse_args(argv)
+    if args.command == "ids":
+        print(ids.format_results(ids.run(rows=args.rows, lookups=args.lookups, cache_kib=args.cache_kib)))
+        return
+    if args.command == "run" and args.duration is None and args.operations is None:
+        args.duration = 30.0
+    logging.basicConfig(level=logging.WARNING)
+
+    async def execute() -> int:
+        try:
+            return await (_generate(args) if args.command == "generate" else _run(args))
+        finally:
+            await get_engine().dispose()
+
+    sys.exit(asyncio.run(execute()))
+
+
+if __name__ == "__main__":
+    main()
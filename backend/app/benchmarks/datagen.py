@@ -0,0 +1,339 @@
+"""Deterministic synthetic plant data for benchmarks."""
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from .. import models
+from ..database import get_engine
+from ..ids import build_uuid7
+from ..security import hash_password
+
+BENCHMARK_PASSWORD = "benchmark-password"
+INSERT_BATCH_SIZE = 5000
+
+_MANUFACTURERS = ("Hasco", "DME", "Meusburger", "Husky", "Mold-Masters", "Engel")
+_LOCATIONS = ("Press 1", "Press 2", "Press 3", "Press 4", "Tool Room", "Store")
+_OBSERVATIONS = (
+    "Cleaned vents and parting line.",
+    "Replaced ejector pin, checked cooling circuits.",
+    "Greased slides, no defects found.",
+    "Polished cavity, minor wear on gate.",
+)
+_FAILURES = ("Flash", "Short shot", "Sink mark", "Burn mark", "Cracked insert", "Water leak", "Stuck ejector", "Warpage")
+
+
+@dataclass(frozen=True)
+class PlantProfile:
+    """Size of a generated plant; all rows derive from ``seed``."""
+
+    tools: int = 50
+    shot_counters: int = 100_000
+    years: int = 2
+    technicians: int = 20
+    engineers: int = 5
+    failure_codes: int = 24
+    maintenance_per_tool_per_month: float = 2.0
+    failures_per_tool_per_month: float = 0.5
+    actions_per_failure: float = 1.2
+    seed: int = 42
+
+
+PROFILES: dict[str, PlantProfile] = {
+    "tiny": PlantProfile(tools=10, shot_counters=5_000, years=1, technicians=5, engineers=2),
+    "small": PlantProfile(),
+    "plant": PlantProfile(tools=250, shot_counters=2_000_000, years=5, technicians=60, engineers=12),
+}
+
+
+class _Ids:
+    """Deterministic, time-ordered UUIDv7 strings so repeated runs produce identical databases."""
+
+    def __init__(self, rng: random.Random, start: datetime) -> None:
+        self._rng = rng
+        self._ms = int(start.replace(tzinfo=timezone.utc).timestamp() * 1000)
+        self._sequence = 0
+
+    def __call__(self) -> str:
+        self._sequence += 1
+        if self._sequence > 0xFFF:
+            self._ms += 1
+            self._sequence = 0
+        return str(build_uuid7(self._ms, self._sequence, self._rng.getrandbits(62)))
+
+
+def benchmark_username(role: models.UserRole, index: int) -> str:
+    """Username of the ``index``-th generated user with ``role``."""
+
+    return f"bench-{role.value}-{index:03d}"
+
+
+def _batches(rows: Iterator[dict[str, Any]], size: int = INSERT_BATCH_SIZE) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _insert(conn: AsyncConnection, model: type[models.Base], rows: Iterator[dict[str, Any]]) -> int:
+    count = 0
+    for batch in _batches(rows):
+        await conn.execute(insert(model), batch)
+        count += len(batch)
+    return count
+
+
+async def clear(engine: Optional[AsyncEngine] = None) -> None:
+    """Delete all plant data (but not jobs or schema bookkeeping)."""
+
+    engine = engine or get_engine()
+    async with engine.begin() as conn:
+        for model in (
+            models.AlertDelivery,
+            models.AlertWatermark,
+            models.ActionItem,
+            models.FailurePhoto,
+            models.FailureReport,
+            models.FailureCode,
+            models.MaintenanceLog,
+            models.ToolShotCounter,
+            models.ToolPhoto,
+            models.Tool,
+            models.AuditLog,
+            models.User,
+        ):
+            await conn.execute(delete(model))
+
+
+async def generate(
+    profile: PlantProfile,
+    engine: Optional[AsyncEngine] = None,
+    *,
+    now: Optional[datetime] = None,
+    progress: Optional[Callable[[str, int, float], None]] = None,
+) -> dict[str, int]:
+    """Fill an empty database with a synthetic plant and return row counts per table.
+
+    Rows are inserted with bulk Core statements in batches; the same profile and ``now``
+    always produce the same data. Every generated user has the password ``BENCHMARK_PASSWORD``.
+    """
+
+    engine = engine or get_engine()
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    start = now - timedelta(days=365 * profile.years)
+    span_seconds = int((now - start).total_seconds())
+    months = profile.years * 12
+    rng = random.Random(profile.seed)
+    new_id = _Ids(rng, start)
+    password_hash = hash_password(BENCHMARK_PASSWORD)
+    counts: dict[str, int] = {}
+
+    def report(table: str, count: int, started: float) -> None:
+        counts[table] = count
+        if progress is not None:
+            progress(table, count, time.perf_counter() - started)
+
+    def timestamp() -> datetime:
+        return start + timedelta(seconds=rng.randrange(span_seconds))
+
+    users = [
+        (new_id(), role, index)
+        for role, total in (
+            (models.UserRole.technician, profile.technicians),
+            (models.UserRole.engineer, profile.engineers),
+            (models.UserRole.manager, 1),
+            (models.UserRole.admin, 1),
+        )
+        for index in range(total)
+    ]
+    technician_ids = [user_id for user_id, role, _ in users if role is models.UserRole.technician]
+    engineer_ids = [user_id for user_id, role, _ in users if role is models.UserRole.engineer] or technician_ids
+    tool_ids = [new_id() for _ in range(profile.tools)]
+    code_ids = [new_id() for _ in range(profile.failure_codes)]
+
+    async with engine.begin() as conn:
+        started = time.perf_counter()
+        count = await _insert(
+            conn,
+            models.User,
+            (
+                {
+                    "id": user_id,
+                    "username": benchmark_username(role, index),
+                    "full_name": f"{role.value.title()} {index}",
+                    "email": f"{benchmark_username(role, index)}@example.com",
+                    "role": role,
+                    "password_hash": password_hash,
+                    "created_at": start,
+                }
+                for user_id, role, index in users
+            ),
+        )
+        report("users", count, started)
+
+        started = time.perf_counter()
+        max_shots = [rng.choice((250_000, 500_000, 1_000_000, None)) for _ in tool_ids]
+        initial_shots = [rng.randrange(0, 50_000, 100) for _ in tool_ids]
+        count = await _insert(
+            conn,
+            models.Tool,
+            (
+                {
+                    "id": tool_id,
+                    "asset_number": f"T-{index:05d}",
+                    "name": f"Mould {index:05d}",
+                    "description": f"{rng.choice((1, 2, 4, 8, 16))}-cavity production mould",
+                    "manufacturer": rng.choice(_MANUFACTURERS),
+                    "cavity_count": rng.choice((1, 2, 4, 8, 16)),
+                    "initial_shot_count": initial_shots[index],
+                    "current_shot_count": initial_shots[index],
+                    "max_shot_count": max_shots[index],
+                    "status": rng.choices(list(models.ToolStatus), weights=(85, 10, 5))[0],
+                    "location": rng.choice(_LOCATIONS),
+                    "created_at": start,
+                    "updated_at": start,
+                }
+                for index, tool_id in enumerate(tool_ids)
+            ),
+        )
+        report("tools", count, started)
+
+        started = time.perf_counter()
+        count = await _insert(
+            conn,
+            models.FailureCode,
+            (
+                {
+                    "id": code_id,
+                    "code": f"F{index:03d}",
+                    "name": f"{_FAILURES[index % len(_FAILURES)]} {index // len(_FAILURES) + 1}",
+                    "description": None,
+                    "severity_default": rng.choice(list(models.Severity)),
+                    "active": True,
+                }
+                for index, code_id in enumerate(code_ids)
+            ),
+        )
+        report("failure_codes", count, started)
+
+        started = time.perf_counter()
+        per_tool = profile.shot_counters // max(len(tool_ids), 1)
+        step = timedelta(seconds=span_seconds / max(per_tool, 1))
+
+        def shot_rows() -> Iterator[dict[str, Any]]:
+            for tool_id in tool_ids:
+                for index in range(per_tool):
+                    yield {
+                        "id": new_id(),
+                        "tool_id": tool_id,
+                        "shot_count": rng.randint(50, 1_500),
+                        "recorded_by": None,
+                        "source": models.ShotSource.automatic,
+                        "recorded_at": start + step * index,
+                    }
+
+        count = await _insert(conn, models.ToolShotCounter, shot_rows())
+        report("tool_shot_counters", count, started)
+
+        started = time.perf_counter()
+        maintenance_count = int(profile.tools * months * profile.maintenance_per_tool_per_month)
+        count = await _insert(
+            conn,
+            models.MaintenanceLog,
+            (
+                {
+                    "id": new_id(),
+                    "tool_id": rng.choice(tool_ids),
+                    "performed_by": rng.choice(technician_ids),
+                    "checklist_template": None,
+                    "performed_at": timestamp(),
+                    "duration_minutes": rng.randint(15, 240),
+                    "observations": rng.choice(_OBSERVATIONS),
+                    "follow_up_required": rng.random() < 0.1,
+                }
+                for _ in range(maintenance_count)
+            ),
+        )
+        report("maintenance_logs", count, started)
+
+        started = time.perf_counter()
+        failures = [
+            (new_id(), rng.choice(tool_ids), timestamp())
+            for _ in range(int(profile.tools * months * profile.failures_per_tool_per_month))
+        ]
+        count = await _insert(
+            conn,
+            models.FailureReport,
+            (
+                {
+                    "id": failure_id,
+                    "tool_id": tool_id,
+                    "reported_by": rng.choice(technician_ids),
+                    "failure_code_id": rng.choice(code_ids) if code_ids else None,
+                    "severity": rng.choices(list(models.Severity), weights=(40, 35, 20, 5))[0],
+                    "description": rng.choice(_FAILURES),
+                    "occurred_at": occurred_at,
+                    "containment_action": "Quarantined parts since last good shot.",
+                }
+                for failure_id, tool_id, occurred_at in failures
+            ),
+        )
+        report("failure_reports", count, started)
+
+        started = time.perf_counter()
+
+        def action_rows() -> Iterator[dict[str, Any]]:
+            for failure_id, tool_id, occurred_at in failures:
+                for _ in range(int(profile.actions_per_failure + rng.random())):
+                    due: date = (occurred_at + timedelta(days=rng.randint(3, 30))).date()
+                    overdue = due < now.date()
+                    done = overdue and rng.random() < 0.9
+                    yield {
+                        "id": new_id(),
+                        "tool_id": tool_id,
+                        "failure_report_id": failure_id,
+                        "title": f"Investigate {rng.choice(_FAILURES).lower()}",
+                        "description": None,
+                        "assigned_to": rng.choice(engineer_ids),
+                        "due_date": due,
+                        "status": (
+                            models.ActionStatus.completed
+                            if done
+                            else rng.choice((models.ActionStatus.open, models.ActionStatus.in_progress))
+                        ),
+                        "completed_at": datetime.combine(due, datetime.min.time()) if done else None,
+                        "updated_at": occurred_at,
+                    }
+
+        count = await _insert(conn, models.ActionItem, action_rows())
+        report("action_items", count, started)
+
+        started = time.perf_counter()
+        totals = (
+            select(func.coalesce(func.sum(models.ToolShotCounter.shot_count), 0))
+            .where(models.ToolShotCounter.tool_id == models.Tool.id)
+            .scalar_subquery()
+        )
+        await conn.execute(update(models.Tool).values(current_shot_count=models.Tool.initial_shot_count + totals))
+        report("shot_totals", profile.tools, started)
+    return counts
+
+
+__all__ = [
+    "BENCHMARK_PASSWORD",
+    "PROFILES",
+    "PlantProfile",
+    "benchmark_username",
+    "clear",
+    "generate",
+]
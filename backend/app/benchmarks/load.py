@@ -0,0 +1,180 @@
+"""Async load driver replaying a plant workload mix against the ASGI app in-process."""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy import select
+
+from .. import models, schemas
+from ..database import SessionLocal
+from .datagen import BENCHMARK_PASSWORD
+from .report import EndpointSamples, summarise
+
+
+@dataclass(frozen=True)
+class WorkloadMix:
+    """Relative weights of the operations a virtual user performs."""
+
+    press_ingest: float = 55
+    dashboard_refresh: float = 25
+    edit: float = 12
+    login: float = 8
+
+
+DASHBOARD_ENDPOINTS = ("/api/tools", "/api/actions", "/api/failures/reports", "/api/alerts")
+
+
+def _payload(schema: type[schemas.APIModel], **values: Any) -> dict[str, Any]:
+    """Explicit JSON body for ``schema``: unspecified optional fields are sent as ``null``."""
+
+    body: dict[str, Any] = dict.fromkeys(schema.model_fields)
+    body.update(values)
+    return body
+
+
+class LoadDriver:
+    """Run ``concurrency`` virtual users against ``app`` and record latency per endpoint."""
+
+    def __init__(
+        self, app: Any, *, concurrency: int = 8, mix: WorkloadMix = WorkloadMix(), seed: int = 7
+    ) -> None:
+        self.app = app
+        self.concurrency = concurrency
+        self.mix = mix
+        self.seed = seed
+        self.samples: dict[str, EndpointSamples] = {}
+        self._tool_ids: list[str] = []
+        self._action_ids: list[str] = []
+        self._usernames: list[str] = []
+        self._budget: Optional[int] = None
+
+    async def _load_fixtures(self) -> None:
+        async with SessionLocal() as session:
+            self._tool_ids = list((await session.execute(select(models.Tool.id).order_by(models.Tool.id))).scalars())
+            self._action_ids = list(
+                (
+                    await session.execute(
+                        select(models.ActionItem.id)
+                        .where(models.ActionItem.status != models.ActionStatus.completed)
+                        .order_by(models.ActionItem.id)
+                        .limit(1000)
+                    )
+                ).scalars()
+            )
+            usernames = (
+                await session.execute(
+                    select(models.User.username)
+                    .where(models.User.role == models.UserRole.technician)
+                    .order_by(models.User.username)
+                )
+            ).scalars()
+            self._usernames = [name for name in usernames if name.startswith("bench-")]
+        if not self._tool_ids or not self._usernames:
+            raise RuntimeError("No benchmark data found; run `python -m app.benchmarks generate` first")
+
+    async def _request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs: Any) -> Optional[httpx.Response]:
+        samples = self.samples.setdefault(label, EndpointSamples())
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:  # noqa: BLE001 - counted as an error for the endpoint
+            samples.errors += 1
+            return None
+        samples.latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            samples.errors += 1
+        return response
+
+    async def _login(self, client: httpx.AsyncClient, username: str) -> None:
+        response = await self._request(
+            client,
+            "POST /api/auth/token",
+            "POST",
+            "/api/auth/token",
+            json={"username": username, "password": BENCHMARK_PASSWORD},
+        )
+        if response is not None and response.status_code == 200:
+            client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    async def _press_ingest(self, client: httpx.AsyncClient, rng: random.Random) -> None:
+        body = _payload(
+            schemas.ToolShotCounterCreate,
+            tool_id=rng.choice(self._tool_ids),
+            shot_count=rng.randint(50, 1_500),
+            source=models.ShotSource.automatic.value,
+        )
+        await self._request(client, "POST /api/shot-counters", "POST", "/api/shot-counters", json=body)
+
+    async def _dashboard_refresh(self, client: httpx.AsyncClient, rng: random.Random) -> None:
+        for url in DASHBOARD_ENDPOINTS:
+            await self._request(client, f"GET {url}", "GET", url)
+
+    async def _edit(self, client: httpx.AsyncClient, rng: random.Random) -> None:
+        if self._action_ids and rng.random() < 0.5:
+            status = rng.choice((models.ActionStatus.open, models.ActionStatus.in_progress)).value
+            body = _payload(schemas.ActionItemUpdate, status=status)
+            url = f"/api/actions/{rng.choice(self._action_ids)}"
+            await self._request(client, "PATCH /api/actions/{action_id}", "PATCH", url, json=body)
+            return
+        body = _payload(schemas.ToolUpdate, location=f"Press {rng.randint(1, 8)}")
+        url = f"/api/tools/{rng.choice(self._tool_ids)}"
+        await self._request(client, "PATCH /api/tools/{tool_id}", "PATCH", url, json=body)
+
+    def _take(self) -> bool:
+        if self._budget is None:
+            return True
+        if self._budget <= 0:
+            return False
+        self._budget -= 1
+        return True
+
+    async def _virtual_user(self, index: int, deadline: Optional[float]) -> None:
+        rng = random.Random(self.seed * 1_000 + index)
+        username = self._usernames[index % len(self._usernames)]
+        operations = (self._press_ingest, self._dashboard_refresh, self._edit, None)
+        weights = (self.mix.press_ingest, self.mix.dashboard_refresh, self.mix.edit, self.mix.login)
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            await self._login(client, username)
+            while (deadline is None or time.perf_counter() < deadline) and self._take():
+                operation = rng.choices(operations, weights)[0]
+                if operation is None:
+                    await self._login(client, username)
+                else:
+                    await operation(client, rng)
+
+    async def run(self, *, duration: Optional[float] = None, operations: Optional[int] = None) -> dict[str, Any]:
+        """Replay the workload for ``duration`` seconds or ``operations`` operations in total."""
+
+        if duration is None and operations is None:
+            raise ValueError("Specify a duration or a number of operations")
+        await self._load_fixtures()
+        self.samples = {}
+        self._budget = operations
+        started = time.perf_counter()
+        deadline = started + duration if duration is not None else None
+        await asyncio.gather(*(self._virtual_user(index, deadline) for index in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        endpoints = summarise(self.samples, elapsed)
+        total_requests = sum(len(samples.latencies) for samples in self.samples.values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "concurrency": self.concurrency,
+            "mix": asdict(self.mix),
+            "seed": self.seed,
+            "endpoints": endpoints,
+            "total": {
+                "requests": total_requests,
+                "errors": sum(samples.errors for samples in self.samples.values()),
+                "throughput_rps": round(total_requests / elapsed, 2) if elapsed > 0 else 0.0,
+            },
+        }
+
+
+__all__ = ["DASHBOARD_ENDPOINTS", "LoadDriver", "WorkloadMix"]
@@ -0,0 +1,117 @@
+"""Latency percentiles, throughput and baseline comparison for benchmark runs."""
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class EndpointSamples:
+    """Raw latencies (seconds) and error count recorded for one endpoint."""
+
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def summarise(samples: dict[str, EndpointSamples], elapsed: float) -> dict[str, dict[str, float]]:
+    """Per-endpoint request counts, errors, throughput and latency percentiles in milliseconds."""
+
+    summary: dict[str, dict[str, float]] = {}
+    for endpoint in sorted(samples):
+        recorded = samples[endpoint]
+        latencies = sorted(recorded.latencies)
+        stats: dict[str, float] = {
+            "requests": len(latencies),
+            "errors": recorded.errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+        for pct in PERCENTILES:
+            stats[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 2)
+        summary[endpoint] = stats
+    return summary
+
+
+def save_baseline(path: Path, result: dict[str, Any]) -> None:
+    """Write a run result as a baseline JSON file."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_baseline(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    *,
+    tolerance: float = 0.2,
+    metric: str = "p95_ms",
+    min_delta_ms: float = 1.0,
+) -> list[str]:
+    """Describe endpoints whose latency or throughput regressed beyond ``tolerance``.
+
+    Latency differences smaller than ``min_delta_ms`` are ignored so sub-millisecond noise
+    on fast endpoints does not fail a run.
+    """
+
+    regressions: list[str] = []
+    previous_endpoints = baseline.get("endpoints", {})
+    for endpoint, stats in current.get("endpoints", {}).items():
+        previous: Optional[dict[str, float]] = previous_endpoints.get(endpoint)
+        if previous is None:
+            continue
+        before, after = previous.get(metric, 0.0), stats.get(metric, 0.0)
+        if after - before >= min_delta_ms and after > before * (1 + tolerance):
+            regressions.append(f"{endpoint}: {metric} {before:.2f} -> {after:.2f}")
+        if stats.get("errors", 0) > previous.get("errors", 0):
+            regressions.append(f"{endpoint}: errors {previous.get('errors', 0)} -> {stats['errors']}")
+    before_rps = baseline.get("total", {}).get("throughput_rps", 0.0)
+    after_rps = current.get("total", {}).get("throughput_rps", 0.0)
+    if before_rps and after_rps < before_rps * (1 - tolerance):
+        regressions.append(f"total throughput {before_rps:.2f} -> {after_rps:.2f} req/s")
+    return regressions
+
+
+def format_table(endpoints: dict[str, dict[str, float]]) -> str:
+    """Render a per-endpoint summary as a fixed-width text table."""
+
+    columns = ("requests", "errors", "throughput_rps", *(f"p{pct}_ms" for pct in PERCENTILES), "max_ms")
+    width = max([len("endpoint"), *(len(name) for name in endpoints)])
+    lines = ["endpoint".ljust(width) + "".join(column.rjust(15) for column in columns)]
+    for name, stats in endpoints.items():
+        lines.append(name.ljust(width) + "".join(f"{stats.get(column, 0):>15}" for column in columns))
+    return "\n".join(lines)
+
+
+__all__ = [
+    "EndpointSamples",
+    "PERCENTILES",
+    "compare",
+    "format_table",
+    "load_baseline",
+    "percentile",
+    "save_baseline",
+    "summarise",
+]
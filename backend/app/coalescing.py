@@ -0,0 +1,207 @@
+"""Single-flight coalescing of identical concurrent GET requests with an optional micro-cache."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .config import get_settings
+from .coordination import Stamp, shared_versions
+from .metrics import Counter, registry
+from .security import decode_token
+
+logger = logging.getLogger(__name__)
+
+COALESCED_REQUESTS = registry.register(
+    Counter(
+        "http_coalesced_requests_total",
+        "Requests on coalescable routes by outcome (leader, follower, cache_hit, bypass).",
+        ("outcome",),
+    )
+)
+
+SHARED_VERSION = "http_responses"
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+_MAX_CACHE_ENTRIES = 256
+
+CacheKey = tuple[str, str, bytes, str, int]
+
+
+@dataclass(frozen=True)
+class SharedResponse:
+    """A fully buffered response that can be replayed to other clients."""
+
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    route: Any
+    created_at: float
+    version: Stamp = None
+
+
+_in_flight: dict[CacheKey, asyncio.Future[Optional[SharedResponse]]] = {}
+_cache: dict[CacheKey, SharedResponse] = {}
+_generation = 0
+
+
+def invalidate(*, publish: bool = False) -> None:
+    """Drop cached responses and stop new requests joining computations started before now.
+
+    With ``publish`` the change is also announced to other worker processes.
+    """
+
+    global _generation
+    _generation += 1
+    _cache.clear()
+    if publish:
+        shared_versions.publish(SHARED_VERSION)
+
+
+def _authorisation_scope(scope: dict[str, Any]) -> Optional[str]:
+    """Return the sharing scope of a request, or ``None`` when it must not be coalesced.
+
+    Coalesced routes return the same data to every authenticated user, so any request with a
+    valid bearer token shares the ``authenticated`` scope. Requests without one are passed
+    through so they receive their own 401.
+    """
+
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                payload = decode_token(token)
+            except Exception:  # noqa: BLE001 - invalid tokens are handled by the endpoint
+                return None
+            return "authenticated" if payload.get("sub") else None
+    return None
+
+
+async def _replay(response: SharedResponse, scope: dict[str, Any], send: Any, outcome: str) -> None:
+    if response.route is not None:
+        scope["route"] = response.route
+    headers = [*response.headers, (b"x-coalesced", outcome.encode())]
+    await send({"type": "http.response.start", "status": response.status, "headers": headers})
+    body = b"" if scope["method"] == "HEAD" else response.body
+    await send({"type": "http.response.body", "body": body})
+
+
+class CoalescingMiddleware:
+    """ASGI middleware that lets identical concurrent reads share one computation."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        settings = get_settings()
+        self.paths = frozenset(settings.api_prefix + path for path in settings.coalescing_paths)
+        # Writes below these prefixes can change coalesced responses; others (such as logins) cannot.
+        self.write_prefixes = tuple(
+            settings.api_prefix + path for path in (*settings.coalescing_paths, *settings.coalescing_invalidated_by)
+        )
+        self.cache_seconds = settings.coalescing_cache_seconds
+        self.max_body_bytes = settings.coalescing_max_body_bytes
+        if self.cache_seconds > 0:
+            shared_versions.track(SHARED_VERSION)
+
+    def _invalidates(self, path: str) -> bool:
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.write_prefixes)
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        if method not in _SAFE_METHODS and self._invalidates(scope["path"]):
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                invalidate(publish=self.cache_seconds > 0)
+            return
+        if method not in ("GET", "HEAD") or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        auth_scope = _authorisation_scope(scope)
+        if auth_scope is None:
+            COALESCED_REQUESTS.inc(("bypass",))
+            await self.app(scope, receive, send)
+            return
+
+        key: CacheKey = ("GET", scope["path"], scope.get("query_string", b""), auth_scope, _generation)
+        cached = _cache.get(key)
+        if (
+            cached is not None
+            and time.monotonic() - cached.created_at < self.cache_seconds
+            and cached.version == shared_versions.current(SHARED_VERSION)
+        ):
+            COALESCED_REQUESTS.inc(("cache_hit",))
+            await _replay(cached, scope, send, "cache")
+            return
+
+        pending = _in_flight.get(key)
+        if pending is not None:
+            shared = await asyncio.shield(pending)
+            if shared is not None:
+                COALESCED_REQUESTS.inc(("follower",))
+                await _replay(shared, scope, send, "follower")
+                return
+            COALESCED_REQUESTS.inc(("bypass",))
+            await self.app(scope, receive, send)
+            return
+
+        COALESCED_REQUESTS.inc(("leader",))
+        await self._lead(key, scope, receive, send)
+
+    def _store(self, key: CacheKey, response: SharedResponse) -> None:
+        if len(_cache) >= _MAX_CACHE_ENTRIES:
+            expiry = time.monotonic() - self.cache_seconds
+            for stale in [name for name, entry in _cache.items() if entry.created_at < expiry]:
+                del _cache[stale]
+            if len(_cache) >= _MAX_CACHE_ENTRIES:
+                _cache.clear()
+        _cache[key] = response
+
+    async def _lead(self, key: CacheKey, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        future: asyncio.Future[Optional[SharedResponse]] = asyncio.get_running_loop().create_future()
+        _in_flight[key] = future
+        start: Optional[dict[str, Any]] = None
+        chunks: list[bytes] = []
+        size = 0
+        shareable = True
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal start, size, shareable
+            if message["type"] == "http.response.start":
+                start = message
+                shareable = message["status"] == 200
+            elif message["type"] == "http.response.body" and shareable:
+                size += len(message.get("body", b""))
+                if size > self.max_body_bytes:
+                    shareable = False
+                    chunks.clear()
+                else:
+                    chunks.append(message.get("body", b""))
+            await send(message)
+
+        shared: Optional[SharedResponse] = None
+        version = shared_versions.current(SHARED_VERSION)
+        try:
+            await self.app(scope, receive, send_wrapper)
+            if shareable and start is not None and scope["method"] == "GET":
+                shared = SharedResponse(
+                    status=start["status"],
+                    headers=list(start.get("headers", [])),
+                    body=b"".join(chunks),
+                    route=scope.get("route"),
+                    created_at=time.monotonic(),
+                    version=version,
+                )
+                if self.cache_seconds > 0 and key[-1] == _generation:
+                    self._store(key, shared)
+        finally:
+            _in_flight.pop(key, None)
+            future.set_result(shared)
+
+
+__all__ = ["CoalescingMiddleware", "SharedResponse", "invalidate"]
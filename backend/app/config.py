@@ -12,12 +12,194 @@ class Settings(BaseSettings):
     app_name: str = Field("Tool Maintenance Management System API", description="Human friendly service name.")
     environment: str = Field("development", description="Runtime environment identifier.")
     database_url: str = Field("sqlite+aiosqlite:///./tool_maintenance.db", description="SQLAlchemy database URL.")
+    database_read_url: Optional[str] = Field(
+        None, description="Optional read replica URL for GET requests; SQLite files get a read-only pool automatically."
+    )
+    sqlite_wal: bool = Field(True, description="Use write-ahead logging so SQLite readers never block the writer.")
+    compact_ids: bool = Field(
+        False,
+        description="Store ids as 16-byte binary (native uuid on PostgreSQL) instead of 36-character strings.",
+    )
+    read_your_writes_seconds: float = Field(
+        5.0, description="After a write, route the client's reads to the primary for this long when using a replica."
+    )
     access_token_secret: str = Field("change-me", description="Secret used for signing JWT access tokens.")
     access_token_expire_minutes: int = Field(60 * 8, description="Default access token lifetime in minutes.")
     api_prefix: str = Field("/api", description="Base path for API routes.")
     cors_origins: list[str] = Field(default_factory=lambda: ["*"], description="Allowed CORS origins.")
     api_port: int = Field(6000, description="Port the HTTP server listens on by default.")
     debug: bool = Field(False, description="Enable debug mode.")
+    jobs_enabled: bool = Field(True, description="Run the in-process background job workers.")
+    job_workers: int = Field(2, description="Number of concurrent background job workers.")
+    job_poll_interval_seconds: float = Field(2.0, description="Idle delay between job queue polls.")
+    job_max_attempts: int = Field(3, description="Default number of attempts before a job is marked failed.")
+    job_retry_backoff_seconds: float = Field(10.0, description="Base delay for exponential job retry backoff.")
+    job_drain_timeout_seconds: float = Field(30.0, description="Time allowed for running jobs to finish on shutdown.")
+    export_directory: str = Field("./exports", description="Directory where background exports are written.")
+    shot_reconcile_interval_seconds: int = Field(
+        60 * 60, description="Interval between scheduled shot count reconciliation runs."
+    )
+
+    alerts_enabled: bool = Field(True, description="Periodically evaluate overdue actions and shot thresholds.")
+    alert_interval_seconds: int = Field(5 * 60, description="Interval between alert evaluation runs.")
+    alert_shot_thresholds: list[float] = Field(
+        default_factory=lambda: [0.8, 1.0],
+        description="Fractions of max_shot_count that raise a shot threshold alert when crossed.",
+    )
+    alert_notifier: str = Field("log", description="Alert delivery channel: log, file or webhook.")
+    alert_notifier_target: Optional[str] = Field(
+        None, description="File path or webhook URL used by the file and webhook notifiers."
+    )
+
+    metrics_enabled: bool = Field(True, description="Collect request, database and event loop metrics.")
+    metrics_loop_lag_interval_seconds: float = Field(
+        0.5, description="Sampling interval for the event loop lag monitor."
+    )
+
+    query_inspection_enabled: bool = Field(
+        False, description="Track SQL statements per request to flag N+1 patterns and slow queries."
+    )
+    slow_query_threshold_ms: float = Field(100.0, description="Statements slower than this are logged with EXPLAIN.")
+    n_plus_one_threshold: int = Field(5, description="Repetitions of one statement shape that are reported as N+1.")
+    query_budget_default: Optional[int] = Field(None, description="Default maximum statements per request.")
+    query_budgets: dict[str, int] = Field(
+        default_factory=dict, description="Per-route statement budgets keyed by route path template."
+    )
+    query_budget_strict: bool = Field(False, description="Fail reads that exceed their query budget with a 500.")
+
+    request_deadline_seconds: Optional[float] = Field(
+        None, description="Default time a request's SQL may run before it is cancelled with a 504."
+    )
+    request_deadlines: dict[str, float] = Field(
+        default_factory=dict, description="Per-route request deadlines in seconds keyed by route path template."
+    )
+    cancel_on_disconnect: bool = Field(True, description="Cancel read requests, and their running SQL, when the client leaves.")
+
+    profiling_enabled: bool = Field(True, description="Keep stack profiles and SQL of requests over the slow threshold.")
+    slow_request_threshold_ms: float = Field(1000.0, description="Requests slower than this are profiled and retained.")
+    profiling_sample_interval_ms: float = Field(5.0, description="Interval between stack samples while profiling.")
+    profiling_slow_request_keep: int = Field(50, description="Number of slow-request profiles kept per worker.")
+    profiling_max_seconds: float = Field(60.0, description="Longest on-demand event loop profile an admin can request.")
+    profiling_max_statements: int = Field(200, description="SQL statements recorded per profiled request.")
+
+    tracing_enabled: bool = Field(True, description="Record spans for sampled requests and background jobs.")
+    tracing_sample_ratio: float = Field(
+        0.1, ge=0.0, le=1.0, description="Share of new traces that are recorded; callers' traceparent flags win."
+    )
+    tracing_buffer_traces: int = Field(500, description="Number of finished traces kept in memory per worker.")
+    tracing_max_spans: int = Field(2000, description="Spans recorded per trace before further spans are dropped.")
+    tracing_export_path: Optional[str] = Field(
+        None, description="File that finished traces are appended to as OTLP/JSON lines."
+    )
+
+    reports_enabled: bool = Field(True, description="Track report source changes and rebuild reports on a schedule.")
+    report_interval_seconds: int = Field(60 * 60, description="Interval between incremental report refreshes.")
+    report_directory: str = Field("./data/reports", description="Directory holding materialised report artifacts.")
+
+    admission_enabled: bool = Field(False, description="Classify API requests and apply per-class admission limits.")
+    admission_max_concurrency: int = Field(64, ge=1, description="API requests running at once across all classes.")
+    admission_classes: dict[str, dict[str, float]] = Field(
+        default_factory=dict,
+        description="Overrides of traffic class limits (priority, concurrency, queue, queue_timeout, rate, burst).",
+    )
+    admission_routes: dict[str, str] = Field(
+        default_factory=lambda: {
+            "POST /shot-counters": "ingest",
+            "POST /batch": "ingest",
+            "GET /jobs/*/artifact": "bulk",
+            "POST /backups*": "bulk",
+            "POST /profiling/*": "bulk",
+        },
+        description="Traffic class by 'METHOD /path' pattern below the API prefix; the first match wins.",
+    )
+    admission_roles: dict[str, str] = Field(
+        default_factory=lambda: {"service": "ingest"},
+        description="Traffic class of requests from each user role that match no route pattern.",
+    )
+
+    fleet_snapshot_enabled: bool = Field(True, description="Serve GET /tools/fleet from an in-memory columnar snapshot.")
+    fleet_rate_window_days: int = Field(30, ge=1, description="Days of shot counters used for the shots-per-day rate.")
+    fleet_snapshot_max_age_seconds: float = Field(
+        900.0, description="Reload the fleet snapshot in full after this long, keeping shot rates current."
+    )
+
+    photo_storage_directory: str = Field(
+        "./data/photos", description="Directory where tool and failure photos are stored."
+    )
+    readiness_cache_seconds: float = Field(5.0, description="How long readiness probe results are reused.")
+    readiness_db_timeout_seconds: float = Field(2.0, description="Timeout for the readiness database probe.")
+    readiness_min_free_mb: int = Field(200, description="Minimum free disk space required to report ready.")
+    auto_migrate: bool = Field(
+        True,
+        description="Apply pending schema migrations at startup; disable when running `python -m app.migrations upgrade`.",
+    )
+
+    coalescing_enabled: bool = Field(True, description="Share one computation between identical concurrent GETs.")
+    coalescing_paths: list[str] = Field(
+        default_factory=lambda: ["/tools", "/failures/codes", "/failures/reports", "/actions", "/maintenance"],
+        description="API paths (without the API prefix) whose GET responses may be shared between users.",
+    )
+    coalescing_invalidated_by: list[str] = Field(
+        default_factory=lambda: ["/shot-counters", "/batch"],
+        description="Further API paths (without the API prefix) whose writes change coalesced responses.",
+    )
+    coalescing_cache_seconds: float = Field(
+        0.0, description="Micro-cache window for coalesced responses; 0 only shares in-flight requests."
+    )
+    coalescing_max_body_bytes: int = Field(
+        4 * 1024 * 1024, description="Responses larger than this are not shared or cached."
+    )
+
+    runtime_directory: str = Field(
+        "./data/run", description="Directory for files shared between worker processes on this host."
+    )
+    coordination_poll_seconds: float = Field(
+        1.0, description="How often workers check for shared state changed by other worker processes."
+    )
+    workers: int = Field(1, description="Number of API worker processes started by `python -m app.serve`.")
+    api_host: str = Field("0.0.0.0", description="Interface the HTTP server binds to.")
+    graceful_shutdown_seconds: int = Field(
+        30, description="Time a worker is given to finish in-flight requests when stopping or restarting."
+    )
+    leader_retry_seconds: float = Field(
+        5.0, description="How often non-leader workers try to take over singleton background jobs."
+    )
+    metrics_share_interval_seconds: float = Field(
+        5.0, description="How often each worker publishes its metrics for pool-wide aggregation."
+    )
+
+    retention_enabled: bool = Field(False, description="Periodically move old raw rows into archive files.")
+    retention_interval_seconds: int = Field(24 * 60 * 60, description="Interval between archival runs.")
+    archive_directory: str = Field("./data/archive", description="Directory holding compressed archive segments.")
+    retention_shot_counter_days: int = Field(365, description="Age after which shot counter rows are archived.")
+    retention_audit_log_days: int = Field(365, description="Age after which audit log rows are archived.")
+    retention_integration_event_days: int = Field(90, description="Age after which integration events are archived.")
+    retention_batch_size: int = Field(5000, description="Rows archived per transaction.")
+
+    batch_max_operations: int = Field(200, description="Maximum number of operations accepted by POST /batch.")
+
+    idempotency_enabled: bool = Field(
+        True, description="Honour Idempotency-Key on POST requests and deduplicate batch operations by id."
+    )
+    idempotency_ttl_seconds: int = Field(24 * 60 * 60, description="How long completed responses can be replayed.")
+    idempotency_lock_seconds: float = Field(
+        60.0, description="After this long an unfinished request no longer blocks retries with the same key."
+    )
+    idempotency_max_body_bytes: int = Field(
+        1024 * 1024, description="Responses larger than this are not stored; retries with their key run again."
+    )
+    idempotency_purge_interval_seconds: int = Field(60 * 60, description="Interval between purges of expired keys.")
+
+    backup_enabled: bool = Field(False, description="Periodically snapshot the SQLite database while it stays online.")
+    backup_interval_seconds: int = Field(24 * 60 * 60, description="Interval between scheduled backups.")
+    backup_directory: str = Field("./data/backups", description="Directory holding database snapshots.")
+    backup_keep: int = Field(7, description="Number of snapshots kept; older ones are deleted after a backup.")
+    backup_pages_per_step: int = Field(
+        1024, description="Database pages copied per backup step before yielding to other connections."
+    )
+    backup_step_pause_seconds: float = Field(
+        0.01, description="Pause between backup steps, bounding the I/O a backup takes from live traffic."
+    )
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
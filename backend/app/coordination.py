@@ -0,0 +1,326 @@
+"""Coordination between worker processes serving the API on one host.
+
+Workers share a runtime directory containing:
+
+* ``leader.lock`` - an exclusive ``flock`` held by the process that runs singleton
+  background work (the job runner and its periodic schedule);
+* ``versions/<name>`` - files replaced whenever shared state changes so other workers
+  drop their cached copies;
+* ``metrics/<pid>.json`` - periodic snapshots of each worker's metrics, merged by
+  ``/metrics`` so any worker reports totals for the whole pool.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from .config import get_settings
+from .metrics import MetricsRegistry
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+Stamp = Optional[tuple[int, int, int]]
+
+_deferred: ContextVar[Optional[list[Callable[[], None]]]] = ContextVar("deferred_invalidations", default=None)
+
+
+@contextmanager
+def deferred_invalidations() -> Iterator[list[Callable[[], None]]]:
+    """Collect cache invalidations made inside the block instead of applying them.
+
+    For code whose ``commit()`` calls only release a savepoint: the caller runs the
+    collected callbacks once the enclosing transaction has committed, or drops them on
+    rollback, so no reader can cache rows that are not yet (or never) committed.
+    """
+
+    callbacks: list[Callable[[], None]] = []
+    token = _deferred.set(callbacks)
+    try:
+        yield callbacks
+    finally:
+        _deferred.reset(token)
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """Run ``callback`` now, or after the enclosing deferred transaction commits."""
+
+    callbacks = _deferred.get()
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+
+def runtime_path(*parts: str) -> Path:
+    """Return a path inside the configured runtime directory."""
+
+    return Path(get_settings().runtime_directory).joinpath(*parts)
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary.write_text(content, encoding="utf-8")
+    # Readers only ever see a whole old or a whole new file.
+    os.replace(temporary, path)
+
+
+class SharedVersions:
+    """Change markers for named shared state, observed by polling the marker files.
+
+    Each write stores a unique ``<time_ns> <pid> <sequence>`` stamp in the file, so two
+    changes are never mistaken for one even when the filesystem reuses inodes or its
+    timestamps are too coarse to tell them apart.
+    """
+
+    def __init__(self) -> None:
+        self._observed: dict[str, Stamp] = {}
+        self._sequence = itertools.count()
+        # Changes waiting for a version file write, and the task writing each name's file.
+        self._queued: dict[str, list[Callable[[Stamp, Stamp], None]]] = {}
+        self._writers: dict[str, asyncio.Task[None]] = {}
+
+    def _path(self, name: str) -> Path:
+        return runtime_path("versions", name)
+
+    def _read(self, name: str) -> Stamp:
+        try:
+            content = self._path(name).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            written_ns, pid, sequence = (int(part) for part in content.split())
+        except ValueError:
+            logger.warning("Ignoring malformed shared version file for %s", name)
+            return None
+        return written_ns, pid, sequence
+
+    def current(self, name: str) -> Stamp:
+        """Last observed version of ``name``; never touches the filesystem."""
+
+        return self._observed.get(name)
+
+    def bump(self, name: str) -> Stamp:
+        """Record a change to ``name`` for this and every other worker."""
+
+        stamp = (time.time_ns(), os.getpid(), next(self._sequence))
+        try:
+            _write_atomic(self._path(name), " ".join(map(str, stamp)) + "\n")
+            self._observed[name] = stamp
+        except OSError:
+            logger.exception("Could not publish a change to %s to other workers", name)
+        return self._observed.get(name)
+
+    def publish(self, name: str, on_published: Optional[Callable[[Stamp, Stamp], None]] = None) -> None:
+        """Record a change to ``name`` like :meth:`bump`, writing the file off the event loop.
+
+        Changes published while a write is running are folded into a single further write.
+        ``on_published`` is called on the loop with the versions before and after the write
+        covering this change. Without a running loop the file is written immediately.
+        """
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            before = self.current(name)
+            stamp = self.bump(name)
+            if on_published is not None:
+                on_published(before, stamp)
+            return
+        callbacks = self._queued.setdefault(name, [])
+        if on_published is not None:
+            callbacks.append(on_published)
+        if name not in self._writers:
+            self._writers[name] = loop.create_task(self._write_queued(name))
+
+    async def _write_queued(self, name: str) -> None:
+        try:
+            while name in self._queued:
+                callbacks = self._queued.pop(name)
+                before = self.current(name)
+                stamp = await asyncio.to_thread(self.bump, name)
+                for callback in callbacks:
+                    callback(before, stamp)
+        finally:
+            del self._writers[name]
+
+    def refresh(self, names: Optional[list[str]] = None) -> None:
+        """Re-read version files, picking up changes made by other workers."""
+
+        for name in names if names is not None else list(self._observed):
+            self._observed[name] = self._read(name)
+
+    def track(self, name: str) -> None:
+        """Include ``name`` in background refreshes."""
+
+        self._observed.setdefault(name, self._read(name))
+
+    async def watch(self, interval: float) -> None:
+        """Refresh all tracked versions every ``interval`` seconds until cancelled."""
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except OSError:
+                logger.exception("Could not read shared version files")
+
+
+class LeaderElection:
+    """Elect one process to run singleton work using a non-blocking file lock.
+
+    The lock is released by the operating system when the leader exits, so a surviving
+    worker takes over on its next attempt. Without ``fcntl`` every process is a leader,
+    which is only correct for single-worker deployments.
+    """
+
+    def __init__(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        on_resigned: Callable[[], Awaitable[None]],
+        *,
+        interval: float,
+    ) -> None:
+        self._on_elected = on_elected
+        self._on_resigned = on_resigned
+        self._interval = interval
+        self._handle: Optional[Any] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self.is_leader = False
+
+    def _try_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        path = runtime_path("leader.lock")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = path.open("a+")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(f"{os.getpid()}\n")
+        handle.flush()
+        self._handle = handle
+        return True
+
+    def _unlock(self) -> None:
+        if self._handle is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+
+    async def _campaign(self) -> None:
+        while not self.is_leader:
+            if await asyncio.to_thread(self._try_lock):
+                self.is_leader = True
+                logger.info("Worker %s elected leader for background jobs", os.getpid())
+                await self._on_elected()
+                return
+            await asyncio.sleep(self._interval)
+
+    async def start(self) -> None:
+        """Try to become leader now, then keep trying in the background."""
+
+        if await asyncio.to_thread(self._try_lock):
+            self.is_leader = True
+            logger.info("Worker %s elected leader for background jobs", os.getpid())
+            await self._on_elected()
+            return
+        self._task = asyncio.create_task(self._campaign())
+
+    async def stop(self) -> None:
+        """Stop campaigning and, if leading, run the resignation hook and release the lock."""
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            try:
+                await self._on_resigned()
+            finally:
+                self.is_leader = False
+                self._unlock()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def publish_metrics(registry: MetricsRegistry) -> None:
+    """Write this worker's metrics snapshot for the other workers to merge."""
+
+    _write_atomic(runtime_path("metrics", f"{os.getpid()}.json"), json.dumps(registry.snapshot()))
+
+
+def collect_worker_metrics() -> list[dict[str, Any]]:
+    """Read snapshots published by other live workers, removing those of exited ones."""
+
+    snapshots: list[dict[str, Any]] = []
+    directory = runtime_path("metrics")
+    if not directory.is_dir():
+        return snapshots
+    for path in directory.glob("*.json"):
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        if not _pid_alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+async def share_metrics(registry: MetricsRegistry, interval: float) -> None:
+    """Publish metrics snapshots until cancelled, then remove this worker's snapshot."""
+
+    try:
+        while True:
+            await asyncio.to_thread(publish_metrics, registry)
+            await asyncio.sleep(interval)
+    finally:
+        runtime_path("metrics", f"{os.getpid()}.json").unlink(missing_ok=True)
+
+
+shared_versions = SharedVersions()
+
+
+__all__ = [
+    "LeaderElection",
+    "SharedVersions",
+    "after_commit",
+    "collect_worker_metrics",
+    "deferred_invalidations",
+    "publish_metrics",
+    "runtime_path",
+    "share_metrics",
+    "shared_versions",
+]
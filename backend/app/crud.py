@@ -1,28 +1,84 @@
 """Database persistence helpers."""
 from __future__ import annotations
 
-from typing import Iterable, Sequence, TypeVar
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Sequence, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import Select, or_, select
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import models
+from .ids import UUIDString
+from .projection import load_columns
 from .security import hash_password
+from .tracing import traced
 
 ModelT = TypeVar("ModelT", bound=models.Base)
-
-
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ListWindow:
+    """Text search, ordering and paging requested for a list."""
+
+    q: Optional[str] = None
+    limit: Optional[int] = None
+    offset: int = 0
+    descending: bool = False
+
+    def apply(self, statement: Select, search_columns: Sequence[Any] = (), order_by: Sequence[Any] = ()) -> Select:
+        """Add a search filter over ``search_columns``, ordering and paging.
+
+        Text columns match a case-insensitive substring; id columns match the exact id, which
+        works for both string and compact binary id storage.
+        """
+
+        if self.q and search_columns:
+            pattern = "%" + self.q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            statement = statement.where(or_(*(self._match(column, pattern) for column in search_columns)))
+        if order_by:
+            statement = statement.order_by(*(column.desc() if self.descending else column for column in order_by))
+        if self.offset:
+            statement = statement.offset(self.offset)
+        if self.limit is not None:
+            statement = statement.limit(self.limit)
+        return statement
+
+    def _match(self, column: Any, pattern: str) -> Any:
+        if isinstance(column.type, UUIDString):
+            return column == self.q
+        return column.ilike(pattern, escape="\\")
+
+    def filter(self, items: Sequence[T], *attributes: str) -> list[T]:
+        """Apply the same search, ordering and paging to an in-memory list."""
+
+        if self.q and attributes:
+            needle = self.q.casefold()
+            items = [
+                item
+                for item in items
+                if any(needle in str(getattr(item, name) or "").casefold() for name in attributes)
+            ]
+        items = list(reversed(items)) if self.descending else list(items)
+        end = None if self.limit is None else self.offset + self.limit
+        return items[self.offset : end]
+
+
+@traced()
 async def create_user(session: AsyncSession, *, username: str, password: str, **kwargs) -> models.User:
     """Create a new user with hashed password."""
 
-    user = models.User(username=username, password_hash=hash_password(password), **kwargs)
+    password_hash = await asyncio.to_thread(hash_password, password)
+    user = models.User(username=username, password_hash=password_hash, **kwargs)
     session.add(user)
     await session.commit()
     await session.refresh(user)
     return user
 
 
+@traced()
 async def get_user_by_username(session: AsyncSession, username: str) -> models.User:
     """Fetch a user by their username."""
 
@@ -33,6 +89,7 @@ async def get_user_by_username(session: AsyncSession, username: str) -> models.U
     return user
 
 
+@traced()
 async def create_instance(session: AsyncSession, instance: ModelT) -> ModelT:
     """Persist and refresh an instance."""
 
@@ -42,6 +99,7 @@ async def create_instance(session: AsyncSession, instance: ModelT) -> ModelT:
     return instance
 
 
+@traced()
 async def update_instance(session: AsyncSession, instance: ModelT, data: dict[str, object]) -> ModelT:
     """Update attributes on an instance and persist changes."""
 
@@ -53,6 +111,7 @@ async def update_instance(session: AsyncSession, instance: ModelT, data: dict[st
     return instance
 
 
+@traced()
 async def delete_instance(session: AsyncSession, instance: ModelT) -> None:
     """Delete an instance from the database."""
 
@@ -60,13 +119,32 @@ async def delete_instance(session: AsyncSession, instance: ModelT) -> None:
     await session.commit()
 
 
-async def list_instances(session: AsyncSession, model: type[ModelT]) -> Sequence[ModelT]:
-    """Return all rows for a model."""
-
-    result = await session.execute(select(model))
+@traced()
+async def list_instances(
+    session: AsyncSession,
+    model: type[ModelT],
+    columns: Optional[Iterable[str]] = None,
+    window: Optional[ListWindow] = None,
+    *,
+    search_columns: Sequence[Any] = (),
+    order_by: Sequence[Any] = (),
+) -> Sequence[ModelT]:
+    """Return rows for a model, loading only ``columns`` (and the primary key) if given.
+
+    ``window`` narrows the rows by text search over ``search_columns`` and pages them in
+    ``order_by`` order.
+    """
+
+    statement = select(model)
+    if columns is not None:
+        statement = statement.options(load_columns(model, columns))
+    if window is not None:
+        statement = window.apply(statement, search_columns, order_by)
+    result = await session.execute(statement)
     return result.scalars().all()
 
 
+@traced()
 async def get_instance(session: AsyncSession, model: type[ModelT], identifier: str) -> ModelT:
     """Retrieve a single instance by primary key."""
 
@@ -78,6 +156,7 @@ async def get_instance(session: AsyncSession, model: type[ModelT], identifier: s
 
 
 __all__ = [
+    "ListWindow",
     "create_user",
     "get_user_by_username",
     "create_instance",
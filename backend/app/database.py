@@ -1,24 +1,106 @@
 """Database configuration and session management."""
 from __future__ import annotations
 
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from pathlib import Path
+from typing import Any, AsyncGenerator, Optional
+from urllib.parse import quote
 
-from sqlalchemy import inspect, text
-from sqlalchemy.engine import Connection
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import URL
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from .config import get_settings
+from .deadlines import install as install_deadlines
+from .metrics import instrument_engine, observe_session
+from .query_inspector import install as install_query_inspector
 
 
 class Base(DeclarativeBase):
     """Declarative base for SQLAlchemy models."""
 
 
+READ_YOUR_WRITES_COOKIE = "tm_primary_until"
+
+
+def _sqlite_file(url: URL) -> Optional[Path]:
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    if url.database.startswith("file:"):
+        return None
+    return Path(url.database).resolve()
+
+
+def _read_only_sqlite_url(url: URL, path: Path) -> URL:
+    # Percent-encode the path so "?", "#" or "%" in it are not read as URI syntax.
+    return url.set(database=f"file:{quote(path.as_posix())}", query={**url.query, "mode": "ro", "uri": "true"})
+
+
+def _sqlite_pragmas(read_only: bool):  # noqa: ANN202
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+    return on_connect
+
+
+def _instrument(engine: AsyncEngine) -> None:
+    if _settings.metrics_enabled:
+        instrument_engine(engine.sync_engine)
+    if _settings.query_inspection_enabled:
+        install_query_inspector(engine.sync_engine)
+    if _settings.cancel_on_disconnect or _settings.request_deadline_seconds is not None or _settings.request_deadlines:
+        install_deadlines(engine.sync_engine)
+
+
 _settings = get_settings()
 _engine: AsyncEngine = create_async_engine(_settings.database_url, future=True, echo=_settings.debug)
 SessionLocal = async_sessionmaker(bind=_engine, expire_on_commit=False)
+_instrument(_engine)
+
+_sqlite_path = _sqlite_file(_engine.url)
+_replica = False
+if _settings.database_read_url:
+    _read_engine = create_async_engine(_settings.database_read_url, future=True, echo=_settings.debug)
+    _replica = True
+elif _sqlite_path is not None and _settings.sqlite_wal:
+    # WAL lets any number of read-only connections run alongside the single writer.
+    event.listen(_engine.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+    _read_engine = create_async_engine(
+        _read_only_sqlite_url(_engine.url, _sqlite_path), future=True, echo=_settings.debug
+    )
+    event.listen(_read_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+else:
+    _read_engine = _engine
+ReadSessionLocal = async_sessionmaker(bind=_read_engine, expire_on_commit=False)
+if _read_engine is not _engine:
+    _instrument(_read_engine)
+
+
+def get_engine() -> AsyncEngine:
+    """Return the application's async engine."""
+
+    return _engine
+
+
+def sqlite_database_path() -> Optional[Path]:
+    """Return the primary SQLite database file, or ``None`` for other databases."""
+
+    return _sqlite_path
+
+
+def get_read_engine() -> AsyncEngine:
+    """Return the engine used for read-only sessions (the primary engine if none is configured)."""
+
+    return _read_engine
 
 
 @asynccontextmanager
@@ -32,49 +114,78 @@ async def lifespan_session() -> AsyncGenerator[AsyncSession, None]:
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency that yields an async database session."""
 
-    async with SessionLocal() as session:
-        yield session
+    opened = time.perf_counter()
+    try:
+        async with SessionLocal() as session:
+            yield session
+    finally:
+        if _settings.metrics_enabled:
+            observe_session(time.perf_counter() - opened)
 
 
-async def init_models() -> None:
-    """Create database schema if it does not exist."""
+def _reads_from_primary(request: Request) -> bool:
+    if not _replica:
+        return False
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
 
-    from . import models  # noqa: WPS433 F401 (import required for model discovery)
 
-    async with _engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        await conn.run_sync(_apply_schema_backfills)
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency yielding a session on the read pool.
 
+    Clients that wrote recently are served from the primary so they see their own changes.
+    """
 
-def _apply_schema_backfills(connection: Connection) -> None:
-    """Add any missing columns required by recent releases."""
+    factory = SessionLocal if _reads_from_primary(request) else ReadSessionLocal
+    opened = time.perf_counter()
+    try:
+        async with factory() as session:
+            yield session
+    finally:
+        if _settings.metrics_enabled:
+            observe_session(time.perf_counter() - opened)
 
-    if connection.dialect.name != "sqlite":
-        return
 
-    inspector = inspect(connection)
-    tool_columns = {column["name"] for column in inspector.get_columns("tools")}
+def pin_reads_to_primary(response: Response) -> None:
+    """Route the client's reads to the primary for a while after it writes through a replica setup."""
 
-    if "initial_shot_count" not in tool_columns:
-        connection.execute(
-            text(
-                "ALTER TABLE tools "
-                "ADD COLUMN initial_shot_count INTEGER NOT NULL DEFAULT 0"
-            )
+    if _replica and _settings.read_your_writes_seconds > 0:
+        window = _settings.read_your_writes_seconds
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, f"{time.time() + window:.3f}", max_age=int(window) + 1, httponly=True
         )
 
-    if "current_shot_count" not in tool_columns:
-        connection.execute(
-            text(
-                "ALTER TABLE tools "
-                "ADD COLUMN current_shot_count INTEGER NOT NULL DEFAULT 0"
-            )
-        )
 
-    if "max_shot_count" not in tool_columns:
-        connection.execute(
-            text("ALTER TABLE tools ADD COLUMN max_shot_count INTEGER")
-        )
+async def get_write_session(response: Response) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency yielding a session on the primary for requests that modify data."""
 
+    pin_reads_to_primary(response)
+    async for session in get_session():
+        yield session
 
-__all__ = ["Base", "SessionLocal", "get_session", "init_models", "lifespan_session"]
+
+async def init_models() -> dict[str, float]:
+    """Verify the schema version, applying migrations if allowed, and return per-phase durations."""
+
+    from . import models  # noqa: WPS433 F401 (import required for model discovery)
+    from .migrations import ensure_schema  # noqa: WPS433 - migrations imports this module
+
+    return await ensure_schema(_settings.auto_migrate, _engine)
+
+
+__all__ = [
+    "Base",
+    "ReadSessionLocal",
+    "SessionLocal",
+    "get_engine",
+    "get_read_engine",
+    "get_read_session",
+    "get_session",
+    "get_write_session",
+    "init_models",
+    "lifespan_session",
+    "pin_reads_to_primary",
+    "sqlite_database_path",
+]
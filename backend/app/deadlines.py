@@ -0,0 +1,279 @@
+"""Per-request deadlines and cancellation of requests whose client has gone away.
+
+``REQUEST_DEADLINES`` maps route templates to seconds (``REQUEST_DEADLINE_SECONDS`` is
+the default). SQL that is still running when its request's deadline passes is stopped by
+the database:
+* SQLite: a progress handler interrupts the statement, including while rows are fetched.
+* PostgreSQL: each transaction sets ``statement_timeout`` to the time left.
+
+The request then fails with ``504``.
+
+With ``CANCEL_ON_DISCONNECT`` a GET, HEAD or OPTIONS request is cancelled as soon as the
+client disconnects, and a running SQLite statement is interrupted too. An abandoned read
+stops holding a worker and a pooled connection instead of building a response nobody reads.
+Writes always run to completion: cancelling one between its commit and its response, or
+its idempotency record, would leave a retry unable to tell whether it was applied.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.util import await_only
+
+from .config import get_settings
+from .metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+# Only requests that change nothing are cancelled when their client disconnects.
+CANCELLABLE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+ABORTED_REQUESTS = registry.register(
+    Counter(
+        "http_requests_aborted_total",
+        "Requests stopped before completion by reason (deadline, disconnect).",
+        ("reason",),
+    )
+)
+
+# SQLite virtual machine instructions between deadline checks; a check is a few attribute reads.
+PROGRESS_HANDLER_INSTRUCTIONS = 10_000
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's database work runs past its deadline."""
+
+
+@dataclass
+class RequestDeadline:
+    """Deadline state of one request; also read from the SQLite driver thread."""
+
+    scope: dict[str, Any]
+    started: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+    _seconds: Optional[float] = None
+    _resolved: bool = False
+
+    @property
+    def seconds(self) -> Optional[float]:
+        """Configured deadline of the matched route; the default until routing has run."""
+
+        if not self._resolved:
+            settings = get_settings()
+            route = getattr(self.scope.get("route"), "path", None)
+            if route is None:
+                return settings.request_deadline_seconds
+            self._seconds = settings.request_deadlines.get(route, settings.request_deadline_seconds)
+            self._resolved = True
+        return self._seconds
+
+    def remaining(self) -> Optional[float]:
+        seconds = self.seconds
+        return None if seconds is None else seconds - (time.monotonic() - self.started)
+
+    def expired(self) -> bool:
+        if self.cancelled:
+            return True
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+_current: ContextVar[Optional[RequestDeadline]] = ContextVar("request_deadline", default=None)
+_installed: set[int] = set()
+
+
+def current_deadline() -> Optional[RequestDeadline]:
+    return _current.get()
+
+
+class _ConnectionDeadline:
+    """SQLite progress handler bound to one connection; interrupts the statement when it returns 1."""
+
+    __slots__ = ("deadline",)
+
+    def __init__(self) -> None:
+        self.deadline: Optional[RequestDeadline] = None
+
+    def __call__(self) -> int:
+        deadline = self.deadline
+        if deadline is None or not deadline.expired():
+            return 0
+        # Interrupt this statement only, not the rollback that follows it on this connection.
+        self.deadline = None
+        return 1
+
+
+def _on_sqlite_connect(dbapi_connection: Any, connection_record: Any) -> None:
+    handler = _ConnectionDeadline()
+    connection_record.info["request_deadline"] = handler
+    driver = connection_record.driver_connection
+    result = driver.set_progress_handler(handler, PROGRESS_HANDLER_INSTRUCTIONS)
+    if inspect.isawaitable(result):
+        await_only(result)  # aiosqlite applies it on its own thread
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    handler = conn.info.get("request_deadline")
+    if handler is not None:
+        # An already expired deadline interrupts the statement on its first progress check.
+        handler.deadline = _current.get()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    handler = conn.info.get("request_deadline")
+    if handler is not None:
+        handler.deadline = None
+
+
+def _on_postgresql_begin(conn) -> None:  # noqa: ANN001
+    deadline = _current.get()
+    remaining = deadline.remaining() if deadline is not None else None
+    if remaining is None:
+        return
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before the transaction started")
+    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+
+
+def _handle_error(exception_context) -> None:  # noqa: ANN001
+    original = exception_context.original_exception
+    if not isinstance(original, Exception) or isinstance(original, DeadlineExceeded):
+        # Task cancellation: the driver may still be running the statement, so leave its handler armed.
+        return
+    connection = exception_context.connection
+    handler = connection.info.get("request_deadline") if connection is not None else None
+    if handler is not None:
+        handler.deadline = None
+    deadline = _current.get()
+    if deadline is not None and deadline.expired():
+        reason = "client disconnected" if deadline.cancelled else f"deadline of {deadline.seconds:g}s exceeded"
+        raise DeadlineExceeded(f"Statement cancelled: {reason}") from original
+
+
+def install(engine: Engine) -> None:
+    """Enforce request deadlines on statements run through ``engine``."""
+
+    if id(engine) in _installed:
+        return
+    _installed.add(id(engine))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _on_sqlite_connect)
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    elif engine.dialect.name == "postgresql":
+        event.listen(engine, "begin", _on_postgresql_begin)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+async def _send_deadline_exceeded(send: Any) -> None:
+    body = json.dumps({"detail": "Request deadline exceeded"}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class DeadlineMiddleware:
+    """ASGI middleware attaching a deadline to each request and cancelling reads on client disconnect."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self.cancel_on_disconnect = get_settings().cancel_on_disconnect
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = RequestDeadline(scope)
+        token = _current.set(deadline)
+        started = False
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            if self.cancel_on_disconnect and scope["method"] in CANCELLABLE_METHODS:
+                await self._run_cancellable(scope, receive, send_wrapper, deadline)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        except DeadlineExceeded as exc:
+            ABORTED_REQUESTS.inc(("deadline",))
+            logger.warning("%s %s aborted: %s", scope["method"], scope["path"], exc)
+            if not started:
+                await _send_deadline_exceeded(send)
+        finally:
+            _current.reset(token)
+
+    async def _run_cancellable(self, scope: dict[str, Any], receive: Any, send: Any, deadline: RequestDeadline) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        messages: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        disconnected = False
+        complete = False
+
+        async def listen() -> None:
+            # Reading ahead of the app is what lets a disconnect be seen while the endpoint is busy.
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    if not complete:
+                        deadline.cancelled = True
+                        task.cancel()
+                    return
+
+        async def receive_wrapper() -> dict[str, Any]:
+            if disconnected and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                complete = True
+            await send(message)
+
+        listener = asyncio.create_task(listen())
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except asyncio.CancelledError:
+            if not deadline.cancelled or task.cancelling() > 1:
+                raise
+        except DeadlineExceeded:
+            if not deadline.cancelled:
+                raise
+        finally:
+            listener.cancel()
+        if deadline.cancelled:
+            if task.cancelling():
+                task.uncancel()
+            ABORTED_REQUESTS.inc(("disconnect",))
+            logger.info("%s %s cancelled: client disconnected", scope["method"], scope["path"])
+
+
+__all__ = [
+    "DeadlineExceeded",
+    "DeadlineMiddleware",
+    "RequestDeadline",
+    "current_deadline",
+    "install",
+]
@@ -1,24 +1,28 @@
 """Reusable dependency functions."""
 from __future__ import annotations
 
-from fastapi import Depends, HTTPException, status
+from typing import Awaitable, Callable, Literal, Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import NoResultFound
 
 from . import models
-from .crud import get_instance, get_user_by_username
-from .database import get_session
+from .crud import ListWindow, get_instance, get_user_by_username
+from .database import get_read_session
 from .security import decode_token
 from .config import get_settings
+from .tracing import traced
 
 settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/token")
 
 
+@traced()
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ) -> models.User:
     """Resolve the currently authenticated user from a JWT token."""
 
@@ -41,24 +45,48 @@ async def get_current_user(
     return user
 
 
-async def get_tool(tool_id: str, session: AsyncSession = Depends(get_session)) -> models.Tool:
+def require_roles(*roles: models.UserRole) -> Callable[..., Awaitable[models.User]]:
+    """Dependency admitting only authenticated users holding one of ``roles``."""
+
+    async def dependency(user: models.User = Depends(get_current_user)) -> models.User:
+        if user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        return user
+
+    return dependency
+
+
+def list_window(
+    q: Optional[str] = Query(None, max_length=100, description="Case-insensitive text search."),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Maximum number of rows to return."),
+    offset: int = Query(0, ge=0, description="Number of rows to skip."),
+    order: Literal["asc", "desc"] = Query("asc", description="Sort direction of the list's natural order."),
+) -> ListWindow:
+    """Search and paging parameters shared by list endpoints."""
+
+    return ListWindow(q=q or None, limit=limit, offset=offset, descending=order == "desc")
+
+
+async def get_tool(tool_id: str, session: AsyncSession = Depends(get_read_session)) -> models.Tool:
     return await get_instance(session, models.Tool, tool_id)
 
 
-async def get_failure_code(failure_code_id: str, session: AsyncSession = Depends(get_session)) -> models.FailureCode:
+async def get_failure_code(failure_code_id: str, session: AsyncSession = Depends(get_read_session)) -> models.FailureCode:
     return await get_instance(session, models.FailureCode, failure_code_id)
 
 
-async def get_failure_report(report_id: str, session: AsyncSession = Depends(get_session)) -> models.FailureReport:
+async def get_failure_report(report_id: str, session: AsyncSession = Depends(get_read_session)) -> models.FailureReport:
     return await get_instance(session, models.FailureReport, report_id)
 
 
-async def get_action_item(action_id: str, session: AsyncSession = Depends(get_session)) -> models.ActionItem:
+async def get_action_item(action_id: str, session: AsyncSession = Depends(get_read_session)) -> models.ActionItem:
     return await get_instance(session, models.ActionItem, action_id)
 
 
 __all__ = [
     "get_current_user",
+    "list_window",
+    "require_roles",
     "oauth2_scheme",
     "get_tool",
     "get_failure_code",
@@ -0,0 +1,432 @@
+"""In-process columnar snapshot of tool state for fleet-wide queries.
+
+The snapshot holds one NumPy array per attribute:
+* shot counts and limits,
+* status and location codes,
+* last maintenance time,
+* recent shot rate.
+
+Fleet queries are then vectorised masks and sorts over a few thousand values, with no
+database access.
+
+The snapshot is loaded at startup and kept current without reloading:
+* Sessions note which tools a commit touched (tools, shot counters or maintenance logs).
+  The next query re-reads only those rows and patches them in place.
+* ORM bulk updates, changes published by other workers, and a snapshot older than
+  ``FLEET_SNAPSHOT_MAX_AGE_SECONDS`` trigger a full reload. The age limit keeps shot
+  rates current as the rate window moves.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Literal, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import get_settings
+from .coordination import Stamp, after_commit, shared_versions
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+SHARED_VERSION = "fleet_snapshot"
+SECONDS_PER_DAY = 86_400.0
+# Beyond this many changed tools a full reload is cheaper than a large ``IN`` list.
+MAX_PATCH_TOOLS = 500
+_STATUSES: tuple[models.ToolStatus, ...] = tuple(models.ToolStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+_COLUMNS = ("ids", "asset_numbers", "names", "shots", "limits", "rates", "last_maintenance", "status", "location", "alive")
+_TRACKED_MODELS = (models.Tool, models.ToolShotCounter, models.MaintenanceLog)
+
+FleetSort = Literal["asset_number", "usage", "projected_end_of_life", "shots_per_day", "last_maintenance"]
+
+
+@dataclass(frozen=True)
+class FleetFilter:
+    """Criteria of a fleet query; ``None`` leaves an attribute unconstrained."""
+
+    statuses: Sequence[models.ToolStatus] = ()
+    location: Optional[str] = None
+    min_usage: Optional[float] = None
+    max_usage: Optional[float] = None
+    maintained_before: Optional[datetime] = None
+    end_of_life_before: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class FleetResult:
+    total: int
+    rows: list[dict[str, Any]]
+    snapshot_age_seconds: float
+    query_microseconds: float
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    """Seconds since the epoch; naive values are UTC, as stored by the models."""
+
+    if value is None:
+        return math.nan
+    return (value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _datetime(value: float) -> Optional[datetime]:
+    return None if math.isnan(value) or math.isinf(value) else datetime.utcfromtimestamp(value)
+
+
+class FleetSnapshot:
+    """Columnar tool state, patched in place by local writes."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        self._session_factory = session_factory
+        self._lock = asyncio.Lock()
+        self._pending: set[str] = set()
+        self._reload = True
+        self._stamp: Stamp = None
+        self._loaded_at: Optional[float] = None
+        self._clear(0)
+
+    def _clear(self, capacity: int) -> None:
+        self._count = 0
+        self._row: dict[str, int] = {}
+        self._locations: list[str] = []
+        self._location_codes: dict[str, int] = {}
+        self._asset_rank: Optional[np.ndarray] = None
+        self.ids = np.full(capacity, None, dtype=object)
+        self.asset_numbers = np.full(capacity, "", dtype=object)
+        self.names = np.full(capacity, "", dtype=object)
+        self.shots = np.zeros(capacity, dtype=np.int64)
+        self.limits = np.full(capacity, math.nan, dtype=np.float64)
+        self.rates = np.zeros(capacity, dtype=np.float32)
+        self.last_maintenance = np.full(capacity, math.nan, dtype=np.float64)
+        self.status = np.full(capacity, -1, dtype=np.int8)
+        self.location = np.full(capacity, -1, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=np.bool_)
+
+    def _grow(self) -> None:
+        # Rows past ``_count`` are written in full by ``_set`` before they become alive.
+        capacity = max(64, len(self.alive) * 2)
+        for name in _COLUMNS:
+            current = getattr(self, name)
+            grown = np.zeros(capacity, dtype=current.dtype)
+            grown[: len(current)] = current
+            setattr(self, name, grown)
+
+    def _location_code(self, location: Optional[str]) -> int:
+        if not location:
+            return -1
+        key = location.casefold()
+        code = self._location_codes.get(key)
+        if code is None:
+            code = self._location_codes[key] = len(self._locations)
+            self._locations.append(location)
+        return code
+
+    def _set(self, index: int, row: Any, now: datetime, window_days: float) -> None:
+        observed_days = (now - row.created_at).total_seconds() / SECONDS_PER_DAY if row.created_at else window_days
+        self.ids[index] = row.id
+        self.asset_numbers[index] = row.asset_number
+        self.names[index] = row.name
+        self.shots[index] = row.current_shot_count
+        self.limits[index] = row.max_shot_count if row.max_shot_count else math.nan
+        self.rates[index] = (row.recent_shots or 0) / min(max(observed_days, 1.0), window_days)
+        self.last_maintenance[index] = _epoch(row.last_maintenance)
+        self.status[index] = _STATUS_CODES[row.status]
+        self.location[index] = self._location_code(row.location)
+        self.alive[index] = True
+
+    @property
+    def size(self) -> int:
+        return int(self.alive[: self._count].sum())
+
+    def nbytes(self) -> int:
+        """Memory held by the numeric columns."""
+
+        numeric = (self.shots, self.limits, self.rates, self.last_maintenance, self.status, self.location, self.alive)
+        return sum(array.nbytes for array in numeric)
+
+    # -- change tracking -------------------------------------------------------------------
+
+    def mark_changed(self, tool_ids: Iterable[str]) -> None:
+        """Patch ``tool_ids`` before the next query and tell other workers to reload."""
+
+        self._pending.update(tool_ids)
+        self._publish()
+
+    def mark_stale(self) -> None:
+        """Reload everything before the next query, e.g. after a bulk update."""
+
+        self._reload = True
+        self._publish()
+
+    def _publish(self) -> None:
+        if self._stamp != shared_versions.current(SHARED_VERSION):
+            self._reload = True
+        shared_versions.publish(SHARED_VERSION, self._published)
+
+    def _published(self, before: Stamp, stamp: Stamp) -> None:
+        # This worker already applies its own change; adopt the version unless another worker's came first.
+        if self._stamp == before:
+            self._stamp = stamp
+
+    # -- loading ---------------------------------------------------------------------------
+
+    def _statement(self, since: datetime, tool_ids: Optional[list[str]] = None):  # noqa: ANN202
+        maintenance = select(
+            models.MaintenanceLog.tool_id, func.max(models.MaintenanceLog.performed_at).label("last_maintenance")
+        ).group_by(models.MaintenanceLog.tool_id)
+        recent = (
+            select(models.ToolShotCounter.tool_id, func.sum(models.ToolShotCounter.shot_count).label("recent_shots"))
+            .where(models.ToolShotCounter.recorded_at >= since)
+            .group_by(models.ToolShotCounter.tool_id)
+        )
+        tools = select(
+            models.Tool.id,
+            models.Tool.asset_number,
+            models.Tool.name,
+            models.Tool.status,
+            models.Tool.location,
+            models.Tool.current_shot_count,
+            models.Tool.max_shot_count,
+            models.Tool.created_at,
+        )
+        if tool_ids is not None:
+            maintenance = maintenance.where(models.MaintenanceLog.tool_id.in_(tool_ids))
+            recent = recent.where(models.ToolShotCounter.tool_id.in_(tool_ids))
+            tools = tools.where(models.Tool.id.in_(tool_ids))
+        maintenance_subquery, recent_subquery, tools_subquery = (
+            maintenance.subquery(),
+            recent.subquery(),
+            tools.subquery(),
+        )
+        return (
+            select(tools_subquery, maintenance_subquery.c.last_maintenance, recent_subquery.c.recent_shots)
+            .outerjoin(maintenance_subquery, maintenance_subquery.c.tool_id == tools_subquery.c.id)
+            .outerjoin(recent_subquery, recent_subquery.c.tool_id == tools_subquery.c.id)
+        )
+
+    async def load(self) -> None:
+        """Replace the snapshot with the current state of every tool."""
+
+        settings = get_settings()
+        # Changes committed while the rows are read are marked again and applied by the next sync.
+        self._stamp, self._reload = shared_versions.current(SHARED_VERSION), False
+        pending, self._pending = self._pending, set()
+        now = datetime.utcnow()
+        window_days = float(settings.fleet_rate_window_days)
+        async with self._session_factory() as session:
+            rows = (await session.execute(self._statement(now - timedelta(days=window_days)))).all()
+        self._clear(max(64, len(rows) * 2))
+        for index, row in enumerate(rows):
+            self._set(index, row, now, window_days)
+            self._row[row.id] = index
+        self._count = len(rows)
+        self._loaded_at = time.monotonic()
+        logger.debug("Loaded fleet snapshot of %d tools (%d pending changes absorbed)", len(rows), len(pending))
+
+    async def _patch(self, tool_ids: list[str]) -> None:
+        now = datetime.utcnow()
+        window_days = float(get_settings().fleet_rate_window_days)
+        async with self._session_factory() as session:
+            rows = (await session.execute(self._statement(now - timedelta(days=window_days), tool_ids))).all()
+        found = set()
+        for row in rows:
+            found.add(row.id)
+            index = self._row.get(row.id)
+            if index is None:
+                if self._count == len(self.alive):
+                    self._grow()
+                index = self._row[row.id] = self._count
+                self._count += 1
+            self._set(index, row, now, window_days)
+        for deleted in set(tool_ids) - found:
+            index = self._row.pop(deleted, None)
+            if index is not None:
+                self.alive[index] = False
+        self._asset_rank = None
+
+    def _stale(self) -> bool:
+        return (
+            self._reload
+            or self._loaded_at is None
+            or self._stamp != shared_versions.current(SHARED_VERSION)
+            or time.monotonic() - self._loaded_at > get_settings().fleet_snapshot_max_age_seconds
+        )
+
+    async def sync(self) -> None:
+        """Apply pending local changes, or reload if the snapshot is stale."""
+
+        if not self._pending and not self._stale():
+            return
+        async with self._lock:
+            if self._stale() or len(self._pending) > MAX_PATCH_TOOLS:
+                await self.load()
+            elif self._pending:
+                pending, self._pending = self._pending, set()
+                await self._patch(sorted(pending))
+
+    # -- querying --------------------------------------------------------------------------
+
+    def _asset_ranks(self) -> np.ndarray:
+        if self._asset_rank is None:
+            count = self._count
+            ranks = np.empty(count, dtype=np.int32)
+            ranks[np.argsort(self.asset_numbers[:count], kind="stable")] = np.arange(count, dtype=np.int32)
+            self._asset_rank = ranks
+        return self._asset_rank
+
+    def query(
+        self,
+        criteria: FleetFilter,
+        sort: FleetSort = "asset_number",
+        descending: bool = False,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> FleetResult:
+        """Filter and sort the snapshot; synchronous and free of I/O."""
+
+        started = time.perf_counter()
+        count = self._count
+        now = time.time()
+        shots = self.shots[:count]
+        limits = self.limits[:count]
+        rates = self.rates[:count]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            usage = shots / limits
+            remaining = np.maximum(limits - shots, 0.0)
+            end_of_life = np.where(rates > 0, now + remaining / rates * SECONDS_PER_DAY, np.inf)
+            end_of_life = np.where(np.isnan(limits), np.nan, np.where(remaining == 0, now, end_of_life))
+
+        mask = self.alive[:count].copy()
+        if criteria.statuses:
+            mask &= np.isin(self.status[:count], [_STATUS_CODES[status] for status in criteria.statuses])
+        if criteria.location is not None:
+            code = self._location_codes.get(criteria.location.casefold(), -2)
+            mask &= self.location[:count] == code
+        if criteria.min_usage is not None:
+            mask &= usage >= criteria.min_usage
+        if criteria.max_usage is not None:
+            mask &= usage <= criteria.max_usage
+        if criteria.maintained_before is not None:
+            last = self.last_maintenance[:count]
+            mask &= np.isnan(last) | (last < _epoch(criteria.maintained_before))
+        if criteria.end_of_life_before is not None:
+            mask &= end_of_life < _epoch(criteria.end_of_life_before)
+
+        selected = np.flatnonzero(mask)
+        ranks = self._asset_ranks()[selected]
+        if sort == "asset_number":
+            order = np.argsort(-ranks if descending else ranks, kind="stable")
+        else:
+            column = {
+                "usage": usage,
+                "projected_end_of_life": end_of_life,
+                "shots_per_day": rates.astype(np.float64),
+                "last_maintenance": self.last_maintenance[:count],
+            }[sort][selected]
+            # Unknown values (NaN) sort last in either direction; ties fall back to asset number.
+            order = np.lexsort((ranks, -column if descending else column))
+        page = selected[order[offset : offset + limit]]
+
+        rows = [
+            {
+                "id": self.ids[index],
+                "asset_number": self.asset_numbers[index],
+                "name": self.names[index],
+                "status": _STATUSES[self.status[index]],
+                "location": self._locations[self.location[index]] if self.location[index] >= 0 else None,
+                "current_shot_count": int(shots[index]),
+                "max_shot_count": None if math.isnan(limits[index]) else int(limits[index]),
+                "usage": None if math.isnan(usage[index]) else round(float(usage[index]), 4),
+                "shots_per_day": round(float(rates[index]), 2),
+                "last_maintenance_at": _datetime(float(self.last_maintenance[index])),
+                "projected_end_of_life": _datetime(float(end_of_life[index])),
+            }
+            for index in page
+        ]
+        return FleetResult(
+            total=len(selected),
+            rows=rows,
+            snapshot_age_seconds=round(time.monotonic() - (self._loaded_at or time.monotonic()), 3),
+            query_microseconds=round((time.perf_counter() - started) * 1_000_000, 1),
+        )
+
+    def status_summary(self) -> dict[str, Any]:
+        return {
+            "tools": self.size,
+            "capacity": len(self.alive),
+            "bytes": self.nbytes(),
+            "pending": len(self._pending),
+            "stale": self._stale(),
+        }
+
+
+fleet_snapshot = FleetSnapshot(SessionLocal)
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    changed: set[str] = session.info.setdefault("fleet_changed", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, models.Tool):
+            changed.add(instance.id)
+        elif isinstance(instance, (models.ToolShotCounter, models.MaintenanceLog)) and instance.tool_id:
+            changed.add(instance.tool_id)
+
+
+def _do_orm_execute(state: Any) -> None:
+    if (state.is_update or state.is_delete) and any(
+        mapper.class_ in _TRACKED_MODELS for mapper in state.all_mappers
+    ):
+        state.session.info["fleet_stale"] = True
+
+
+def _after_commit(session: Session) -> None:
+    # A batch operation's commit only releases a savepoint; ``after_commit`` defers to the real commit.
+    changed = session.info.pop("fleet_changed", None)
+    if session.info.pop("fleet_stale", False):
+        after_commit(fleet_snapshot.mark_stale)
+    elif changed:
+        after_commit(lambda: fleet_snapshot.mark_changed(changed))
+
+
+def _after_rollback(session: Session) -> None:
+    if not session.in_transaction():
+        session.info.pop("fleet_changed", None)
+        session.info.pop("fleet_stale", None)
+
+
+def install() -> None:
+    """Track committed tool changes in every ORM session."""
+
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+
+
+async def warm() -> None:
+    """Track the shared version, install change tracking and load the snapshot."""
+
+    await asyncio.to_thread(shared_versions.track, SHARED_VERSION)
+    install()
+    await fleet_snapshot.load()
+
+
+__all__ = [
+    "FleetFilter",
+    "FleetResult",
+    "FleetSnapshot",
+    "FleetSort",
+    "fleet_snapshot",
+    "install",
+    "warm",
+]
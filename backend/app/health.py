@@ -0,0 +1,177 @@
+"""Readiness probes for the database, background workers and storage."""
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import func, select, text
+
+from . import models
+from .config import get_settings
+from .database import SessionLocal, get_engine
+from .jobs import job_runner
+
+_startup_phases: dict[str, float] = {}
+_startup_complete = False
+_is_leader = True
+_cache: Optional[tuple[float, bool, dict[str, Any]]] = None
+_cache_lock = asyncio.Lock()
+
+
+def record_startup_phase(name: str, seconds: float) -> None:
+    """Store how long a named startup phase took."""
+
+    _startup_phases[name] = round(seconds, 4)
+
+
+def set_leader(leader: bool) -> None:
+    """Record whether this process runs the singleton background jobs."""
+
+    global _is_leader, _cache
+    _is_leader = leader
+    _cache = None
+
+
+def mark_startup_complete(complete: bool = True) -> None:
+    """Flag whether application startup has finished."""
+
+    global _startup_complete, _cache
+    _startup_complete = complete
+    _cache = None
+
+
+async def _probe_database(timeout: float) -> dict[str, Any]:
+    engine = get_engine()
+    # SQLite answers a bare SELECT 1 without opening the file; reading the schema page does,
+    # so a locked or unreadable database fails the probe.
+    probe = "SELECT 1 FROM sqlite_master LIMIT 1" if engine.url.get_backend_name() == "sqlite" else "SELECT 1"
+    started = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            async with engine.connect() as conn:
+                await conn.execute(text(probe))
+    except TimeoutError:
+        return {"ok": False, "error": f"timed out after {timeout}s"}
+    except Exception as exc:  # noqa: BLE001 - reported in the probe payload
+        return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+def _pool_status() -> dict[str, Any]:
+    pool = get_engine().pool
+    status: dict[str, Any] = {"ok": True, "class": type(pool).__name__}
+    if all(hasattr(pool, attr) for attr in ("size", "checkedout", "overflow")):
+        size = pool.size()
+        checked_out = pool.checkedout()
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        saturation = checked_out / capacity if capacity > 0 else 0.0
+        status.update(
+            size=size,
+            checked_out=checked_out,
+            overflow=pool.overflow(),
+            saturation=round(saturation, 3),
+            ok=saturation < 1.0,
+        )
+    return status
+
+
+async def _job_status(timeout: float, leader: bool) -> dict[str, Any]:
+    settings = get_settings()
+    status: dict[str, Any] = {**job_runner.status(), "enabled": settings.jobs_enabled, "leader": leader}
+    # Only the elected leader runs the job workers; other processes just serve requests.
+    status["ok"] = job_runner.running or not settings.jobs_enabled or not leader
+    try:
+        async with asyncio.timeout(timeout):
+            async with SessionLocal() as session:
+                result = await session.execute(
+                    select(func.count(), func.min(models.Job.run_at)).where(
+                        models.Job.status == models.JobStatus.queued,
+                        models.Job.run_at <= datetime.utcnow(),
+                    )
+                )
+                backlog, oldest = result.one()
+    except Exception as exc:  # noqa: BLE001 - reported in the probe payload
+        status.update(ok=False, error=f"{type(exc).__name__}: {exc}")
+        return status
+    status["backlog"] = backlog
+    status["oldest_due_seconds"] = round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None
+    return status
+
+
+def _disk_status(path: Path, min_free_mb: int) -> dict[str, Any]:
+    probe = path
+    while not probe.exists() and probe != probe.parent:
+        probe = probe.parent
+    try:
+        usage = shutil.disk_usage(probe)
+    except OSError as exc:
+        return {"ok": False, "path": str(path), "error": str(exc)}
+    free_mb = usage.free // (1024 * 1024)
+    return {
+        "ok": free_mb >= min_free_mb,
+        "path": str(path),
+        "free_mb": free_mb,
+        "used_percent": round(usage.used / usage.total * 100, 1) if usage.total else None,
+    }
+
+
+def _storage_paths() -> dict[str, Path]:
+    settings = get_settings()
+    paths = {"photos": Path(settings.photo_storage_directory).resolve()}
+    url = get_engine().url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        paths["database"] = Path(url.database).resolve().parent
+    return paths
+
+
+async def _evaluate() -> tuple[bool, dict[str, Any]]:
+    settings = get_settings()
+    timeout = settings.readiness_db_timeout_seconds
+    database, jobs = await asyncio.gather(_probe_database(timeout), _job_status(timeout, _is_leader))
+    checks: dict[str, Any] = {
+        "database": database,
+        "pool": _pool_status(),
+        "jobs": jobs,
+        "disk": {
+            name: _disk_status(path, settings.readiness_min_free_mb) for name, path in _storage_paths().items()
+        },
+    }
+    ready = (
+        _startup_complete
+        and database["ok"]
+        and checks["pool"]["ok"]
+        and jobs["ok"]
+        and all(disk["ok"] for disk in checks["disk"].values())
+    )
+    payload = {
+        "status": "ready" if ready else "not_ready",
+        "startup": {"complete": _startup_complete, "phases": dict(_startup_phases)},
+        "worker": {"pid": os.getpid(), "leader": _is_leader},
+        "checks": checks,
+        "checked_at": datetime.utcnow().isoformat(),
+    }
+    return ready, payload
+
+
+async def readiness() -> tuple[bool, dict[str, Any]]:
+    """Return ``(ready, payload)``, reusing a recent result to keep probes cheap."""
+
+    global _cache
+    ttl = get_settings().readiness_cache_seconds
+    now = time.monotonic()
+    if _cache is not None and now - _cache[0] < ttl:
+        return _cache[1], _cache[2]
+    async with _cache_lock:
+        if _cache is not None and time.monotonic() - _cache[0] < ttl:
+            return _cache[1], _cache[2]
+        ready, payload = await _evaluate()
+        _cache = (time.monotonic(), ready, payload)
+    return ready, payload
+
+
+__all__ = ["mark_startup_complete", "readiness", "record_startup_phase", "set_leader"]
@@ -0,0 +1,370 @@
+"""Idempotency keys: replay the stored response of a completed write instead of running it again.
+
+A POST carrying ``Idempotency-Key`` first claims the key in the ``idempotency_keys`` table.
+Retries with the same key then receive the stored response (marked ``Idempotent-Replayed``)
+without touching the endpoint, or ``409`` while the first attempt is still running.
+Records hold 16-byte digests of the key and request plus the compressed response body,
+and expire after ``IDEMPOTENCY_TTL_SECONDS``. Only successful responses are kept; an error
+releases the key so a corrected retry can run.
+
+The claim is extended to the full TTL inside the endpoint's own transaction, so a key is
+never released once the endpoint's changes have committed, even if the response is lost
+before it can be stored. Retries of such a request receive ``409`` instead of running again.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import zlib
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional, Union
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import get_settings
+from .database import get_engine
+from .metrics import Counter, registry
+from .security import decode_token
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_REQUESTS = registry.register(
+    Counter(
+        "http_idempotent_requests_total",
+        "Requests carrying an idempotency key by outcome "
+        "(stored, replayed, in_progress, applied, mismatch, released, kept).",
+        ("outcome",),
+    )
+)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+_table = models.IdempotencyKey.__table__
+# Key claimed by the request being handled, committed alongside the endpoint's changes.
+_claimed: ContextVar[Optional[bytes]] = ContextVar("idempotency_claimed", default=None)
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """A claimed idempotency key and, once the request finished, its response."""
+
+    request_hash: bytes
+    status: Optional[int]
+    content_type: Optional[str]
+    body: bytes
+    # The endpoint's changes committed, but its response was never stored.
+    applied: bool = False
+
+    @property
+    def completed(self) -> bool:
+        return self.status is not None
+
+
+def digest(*parts: Union[str, bytes]) -> bytes:
+    """Return a 16-byte digest of ``parts``; records store these instead of client keys."""
+
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.digest()[:16]
+
+
+def _record(row: Any) -> StoredResponse:
+    return StoredResponse(
+        request_hash=row.request_hash,
+        status=row.status_code,
+        content_type=row.content_type,
+        body=zlib.decompress(row.body) if row.body else b"",
+    )
+
+
+async def load(connection: AsyncConnection, key: bytes) -> Optional[StoredResponse]:
+    """Return the unexpired record for ``key``."""
+
+    row = (
+        await connection.execute(select(_table).where(_table.c.key == key, _table.c.expires_at > datetime.utcnow()))
+    ).first()
+    return None if row is None else _record(row)
+
+
+async def save(
+    connection: AsyncConnection,
+    key: bytes,
+    request_hash: bytes,
+    status: int,
+    body: bytes,
+    content_type: Optional[str] = "application/json",
+) -> None:
+    """Store a completed response for ``key`` in the caller's transaction."""
+
+    now = datetime.utcnow()
+    await connection.execute(delete(_table).where(_table.c.key == key))
+    await connection.execute(
+        insert(_table).values(
+            key=key,
+            request_hash=request_hash,
+            status_code=status,
+            content_type=content_type,
+            body=zlib.compress(body),
+            created_at=now,
+            expires_at=now + timedelta(seconds=get_settings().idempotency_ttl_seconds),
+        )
+    )
+
+
+async def claim(key: bytes, request_hash: bytes) -> Optional[StoredResponse]:
+    """Claim ``key`` for a new request, or return the record that already holds it.
+
+    Expired records, including claims abandoned by requests that never finished, are
+    replaced.
+    """
+
+    engine = get_engine()
+    lock = timedelta(seconds=get_settings().idempotency_lock_seconds)
+    for _ in range(3):
+        now = datetime.utcnow()
+        async with engine.begin() as conn:
+            row = (await conn.execute(select(_table).where(_table.c.key == key))).first()
+            if row is not None and row.expires_at > now:
+                stored = _record(row)
+                if not stored.completed and row.expires_at > now + lock:
+                    return StoredResponse(stored.request_hash, None, None, b"", applied=True)
+                return stored
+            if row is not None:
+                await conn.execute(delete(_table).where(_table.c.key == key, _table.c.expires_at == row.expires_at))
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    insert(_table).values(key=key, request_hash=request_hash, created_at=now, expires_at=now + lock)
+                )
+            return None
+        except IntegrityError:
+            continue  # another request claimed the key first; read its record
+    return StoredResponse(request_hash=request_hash, status=None, content_type=None, body=b"")
+
+
+async def complete(key: bytes, status: int, content_type: Optional[str], body: bytes) -> None:
+    """Attach the finished response to a claimed key and extend it to the full TTL."""
+
+    now = datetime.utcnow()
+    async with get_engine().begin() as conn:
+        await conn.execute(
+            update(_table)
+            .where(_table.c.key == key)
+            .values(
+                status_code=status,
+                content_type=content_type,
+                body=zlib.compress(body),
+                expires_at=now + timedelta(seconds=get_settings().idempotency_ttl_seconds),
+            )
+        )
+
+
+async def release(key: bytes) -> bool:
+    """Drop an unfinished claim so the request can be retried with the same key.
+
+    Claims extended by a committed endpoint transaction are kept; returns whether the key
+    was released.
+    """
+
+    lock = timedelta(seconds=get_settings().idempotency_lock_seconds)
+    async with get_engine().begin() as conn:
+        result = await conn.execute(
+            delete(_table).where(
+                _table.c.key == key,
+                _table.c.status_code.is_(None),
+                _table.c.expires_at <= datetime.utcnow() + lock,
+            )
+        )
+    return bool(result.rowcount)
+
+
+def _before_commit(session: Session) -> None:
+    key = _claimed.get()
+    if key is None:
+        return
+    # Runs in the endpoint's transaction: once its changes commit, the claim outlives the lock.
+    expires_at = datetime.utcnow() + timedelta(seconds=get_settings().idempotency_ttl_seconds)
+    session.connection().execute(
+        update(_table).where(_table.c.key == key, _table.c.status_code.is_(None)).values(expires_at=expires_at)
+    )
+
+
+def install() -> None:
+    """Commit the current request's idempotency claim with every ORM session commit."""
+
+    if not event.contains(Session, "before_commit", _before_commit):
+        event.listen(Session, "before_commit", _before_commit)
+
+
+async def purge_expired(connection: AsyncConnection) -> int:
+    """Delete expired records and return how many were removed."""
+
+    result = await connection.execute(delete(_table).where(_table.c.expires_at <= datetime.utcnow()))
+    return result.rowcount or 0
+
+
+def _principal(scope: dict[str, Any]) -> Optional[str]:
+    """Subject of the request's bearer token; keys are scoped per user."""
+
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return decode_token(token).get("sub")
+            except Exception:  # noqa: BLE001 - invalid tokens are handled by the endpoint
+                return None
+    return None
+
+
+async def _send_json(send: Any, status: int, detail: str, headers: tuple[tuple[bytes, bytes], ...] = ()) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(stored: StoredResponse, send: Any) -> None:
+    headers = [(b"content-length", str(len(stored.body)).encode()), (b"idempotent-replayed", b"true")]
+    if stored.content_type:
+        headers.append((b"content-type", stored.content_type.encode("latin-1")))
+    await send({"type": "http.response.start", "status": stored.status, "headers": headers})
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware that makes authenticated POSTs with an ``Idempotency-Key`` safe to retry."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self.max_body_bytes = get_settings().idempotency_max_body_bytes
+        install()
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        client_key = next((value for name, value in scope.get("headers", ()) if name == IDEMPOTENCY_HEADER), None)
+        principal = _principal(scope) if client_key is not None else None
+        if principal is None:
+            # Without a key there is nothing to deduplicate; without a user the endpoint answers 401.
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(client_key) <= MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        chunks: list[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        key = digest(principal, "http", client_key)
+        request_hash = digest(scope["path"], scope.get("query_string", b""), body)
+        stored = await claim(key, request_hash)
+        if stored is not None:
+            if stored.request_hash != request_hash:
+                IDEMPOTENT_REQUESTS.inc(("mismatch",))
+                await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            elif stored.applied:
+                IDEMPOTENT_REQUESTS.inc(("applied",))
+                await _send_json(send, 409, "A request with this Idempotency-Key was already applied")
+            elif not stored.completed:
+                IDEMPOTENT_REQUESTS.inc(("in_progress",))
+                await _send_json(
+                    send, 409, "A request with this Idempotency-Key is still in progress", ((b"retry-after", b"1"),)
+                )
+            else:
+                IDEMPOTENT_REQUESTS.inc(("replayed",))
+                await _replay(stored, send)
+            return
+
+        await self._run(scope, body, receive, send, key)
+
+    async def _run(self, scope: dict[str, Any], body: bytes, receive: Any, send: Any, key: bytes) -> None:
+        delivered = False
+
+        async def replay_body() -> dict[str, Any]:
+            nonlocal delivered
+            if delivered:
+                return await receive()
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        status: Optional[int] = None
+        content_type: Optional[str] = None
+        chunks: list[bytes] = []
+        size = 0
+        storable = True
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status, content_type, size, storable
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                storable = 200 <= status < 300
+                content_type = next(
+                    (value.decode("latin-1") for name, value in message.get("headers", ()) if name == b"content-type"),
+                    None,
+                )
+            elif message["type"] == "http.response.body" and storable:
+                size += len(message.get("body", b""))
+                if size > self.max_body_bytes:
+                    storable = False
+                    chunks.clear()
+                else:
+                    chunks.append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        token = _claimed.set(key)
+        try:
+            await self.app(scope, replay_body, send_wrapper)
+            if storable and status is not None:
+                await complete(key, status, content_type, b"".join(chunks))
+                completed = True
+                IDEMPOTENT_REQUESTS.inc(("stored",))
+        finally:
+            _claimed.reset(token)
+            if not completed:
+                try:
+                    released = await release(key)
+                except Exception:  # noqa: BLE001 - the claim expires on its own
+                    logger.exception("Could not release idempotency key")
+                else:
+                    IDEMPOTENT_REQUESTS.inc(("released" if released else "kept",))
+
+
+__all__ = [
+    "IDEMPOTENCY_HEADER",
+    "IdempotencyMiddleware",
+    "StoredResponse",
+    "claim",
+    "complete",
+    "digest",
+    "install",
+    "load",
+    "purge_expired",
+    "release",
+    "save",
+]
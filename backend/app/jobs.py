@@ -0,0 +1,350 @@
+"""Durable in-process background job queue backed by the application database."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from . import models
+from .config import get_settings
+from .database import SessionLocal
+from .tracing import SpanKind, current_traceparent, start_trace, traced
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[[AsyncSession, dict[str, Any]], Awaitable[Optional[dict[str, Any]]]]
+
+_tasks: dict[str, TaskHandler] = {}
+# Roles allowed to enqueue each task through ``POST /jobs``; ``None`` allows every user.
+_task_roles: dict[str, Optional[frozenset[models.UserRole]]] = {}
+_PENDING_STATUSES = (models.JobStatus.queued, models.JobStatus.running)
+
+
+class UnknownTaskError(ValueError):
+    """Raised when a job references a task that has not been registered."""
+
+
+def task(name: str, *, roles: Optional[Iterable[models.UserRole]] = None) -> Callable[[TaskHandler], TaskHandler]:
+    """Register a coroutine as a named background task.
+
+    ``roles`` restricts who may enqueue the task through the jobs API; an empty collection
+    keeps it off that API, for tasks that are only scheduled or started by their own router.
+    """
+
+    def decorator(handler: TaskHandler) -> TaskHandler:
+        _tasks[name] = handler
+        _task_roles[name] = None if roles is None else frozenset(roles)
+        return handler
+
+    return decorator
+
+
+def registered_tasks() -> list[str]:
+    """Return the names of all registered background tasks."""
+
+    return sorted(_tasks)
+
+
+def can_enqueue(task_name: str, role: models.UserRole) -> bool:
+    """Whether a user with ``role`` may enqueue ``task_name`` through the jobs API."""
+
+    if task_name not in _tasks:
+        raise UnknownTaskError(task_name)
+    roles = _task_roles[task_name]
+    return roles is None or role in roles
+
+
+@traced(kind=SpanKind.PRODUCER)
+async def enqueue(
+    session: AsyncSession,
+    task_name: str,
+    payload: Optional[dict[str, Any]] = None,
+    *,
+    priority: int = 0,
+    run_at: Optional[datetime] = None,
+    max_attempts: Optional[int] = None,
+    unique_key: Optional[str] = None,
+    created_by: Optional[str] = None,
+) -> models.Job:
+    """Persist a new job and wake the local workers.
+
+    Higher ``priority`` values run first. When ``unique_key`` is given and a queued or
+    running job already carries the same key, that job is returned instead.
+    """
+
+    if task_name not in _tasks:
+        raise UnknownTaskError(task_name)
+
+    if unique_key is not None:
+        result = await session.execute(
+            select(models.Job).where(models.Job.unique_key == unique_key, models.Job.status.in_(_PENDING_STATUSES))
+        )
+        existing = result.scalars().first()
+        if existing is not None:
+            return existing
+
+    job = models.Job(
+        task=task_name,
+        payload=json.dumps(payload or {}),
+        priority=priority,
+        run_at=run_at or datetime.utcnow(),
+        max_attempts=max_attempts or get_settings().job_max_attempts,
+        unique_key=unique_key,
+        created_by=created_by,
+        trace_parent=current_traceparent(),
+    )
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    job_runner.notify()
+    return job
+
+
+@dataclass
+class PeriodicJob:
+    """A task that is enqueued again every ``interval`` seconds."""
+
+    task: str
+    interval: float
+    payload: dict[str, Any] = field(default_factory=dict)
+    priority: int = 0
+    next_run: float = 0.0
+
+
+class JobRunner:
+    """Asyncio worker pool that claims and executes queued jobs."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        workers: int,
+        poll_interval: float,
+        retry_backoff: float,
+        drain_timeout: float,
+    ) -> None:
+        self._session_factory = session_factory
+        self._worker_count = workers
+        self._poll_interval = poll_interval
+        self._retry_backoff = retry_backoff
+        self._drain_timeout = drain_timeout
+        self._periodic: dict[str, PeriodicJob] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: list[asyncio.Task[None]] = []
+        self._active: dict[str, str] = {}
+        self.started_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not self._stopping
+
+    def every(self, task_name: str, interval: float, payload: Optional[dict[str, Any]] = None, priority: int = 0) -> None:
+        """Schedule ``task_name`` to be enqueued periodically while the runner is active."""
+
+        if task_name not in _tasks:
+            raise UnknownTaskError(task_name)
+        self._periodic[task_name] = PeriodicJob(task_name, interval, payload or {}, priority)
+
+    def notify(self) -> None:
+        """Wake idle workers so newly enqueued work starts immediately."""
+
+        self._wakeup.set()
+
+    def status(self) -> dict[str, Any]:
+        """Return a snapshot of the worker pool state."""
+
+        return {
+            "running": self.running,
+            "workers": self._worker_count,
+            "active_jobs": dict(self._active),
+            "periodic": sorted(self._periodic),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+        }
+
+    async def start(self) -> None:
+        """Recover interrupted jobs and start the workers and scheduler."""
+
+        if self._tasks:
+            return
+        self._stopping = False
+        await self._recover_interrupted()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self._worker_count)]
+        if self._periodic:
+            self._tasks.append(asyncio.create_task(self._scheduler()))
+        self.started_at = datetime.utcnow()
+
+    async def stop(self) -> None:
+        """Stop claiming work and wait for running jobs to drain."""
+
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=self._drain_timeout)
+        for pending_task in pending:
+            pending_task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def run_pending(self) -> int:
+        """Execute every job that is currently due and return how many ran."""
+
+        executed = 0
+        while (job := await self._claim()) is not None:
+            await self._execute(job)
+            executed += 1
+        return executed
+
+    async def _worker(self, index: int) -> None:
+        while not self._stopping:
+            job = await self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._active[job.id] = job.task
+            try:
+                await self._execute(job)
+            finally:
+                self._active.pop(job.id, None)
+
+    async def _scheduler(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            now = loop.time()
+            for periodic in self._periodic.values():
+                if periodic.next_run > now:
+                    continue
+                periodic.next_run = now + periodic.interval
+                try:
+                    async with self._session_factory() as session:
+                        await enqueue(
+                            session,
+                            periodic.task,
+                            periodic.payload,
+                            priority=periodic.priority,
+                            unique_key=f"periodic:{periodic.task}",
+                        )
+                except Exception:  # noqa: BLE001 - keep the scheduler alive
+                    logger.exception("Failed to enqueue periodic job %s", periodic.task)
+            next_due = min(periodic.next_run for periodic in self._periodic.values())
+            await asyncio.sleep(max(0.0, min(next_due - loop.time(), self._poll_interval)))
+
+    async def _claim(self) -> Optional[models.Job]:
+        async with self._session_factory() as session:
+            now = datetime.utcnow()
+            candidates = await session.execute(
+                select(models.Job.id)
+                .where(models.Job.status == models.JobStatus.queued, models.Job.run_at <= now)
+                .order_by(models.Job.priority.desc(), models.Job.run_at, models.Job.created_at)
+                .limit(self._worker_count + 1)
+            )
+            for job_id in candidates.scalars().all():
+                claimed = await session.execute(
+                    update(models.Job)
+                    .where(models.Job.id == job_id, models.Job.status == models.JobStatus.queued)
+                    .values(
+                        status=models.JobStatus.running,
+                        attempts=models.Job.attempts + 1,
+                        started_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+                if claimed.rowcount == 1:
+                    result = await session.execute(select(models.Job).where(models.Job.id == job_id))
+                    return result.scalar_one()
+        return None
+
+    async def _execute(self, job: models.Job) -> None:
+        handler = _tasks.get(job.task)
+        try:
+            if handler is None:
+                raise UnknownTaskError(job.task)
+            async with self._session_factory() as session:
+                with start_trace(
+                    f"job {job.task}",
+                    SpanKind.CONSUMER,
+                    job.trace_parent,
+                    **{"job.id": job.id, "job.task": job.task, "job.attempt": job.attempts},
+                ):
+                    result = await handler(session, json.loads(job.payload or "{}"))
+        except asyncio.CancelledError:
+            await asyncio.shield(self._finish(job.id, status=models.JobStatus.queued, attempts=job.attempts - 1))
+            raise
+        except Exception as exc:  # noqa: BLE001 - failures are recorded on the job
+            logger.exception("Job %s (%s) failed", job.id, job.task)
+            error = f"{type(exc).__name__}: {exc}"
+            if job.attempts < job.max_attempts and not isinstance(exc, UnknownTaskError):
+                delay = self._retry_backoff * (2 ** (job.attempts - 1))
+                await self._finish(
+                    job.id,
+                    status=models.JobStatus.queued,
+                    last_error=error,
+                    run_at=datetime.utcnow() + timedelta(seconds=delay),
+                )
+            else:
+                await self._finish(job.id, status=models.JobStatus.failed, last_error=error, finished_at=datetime.utcnow())
+            return
+        await self._finish(
+            job.id,
+            status=models.JobStatus.succeeded,
+            result=json.dumps(result) if result is not None else None,
+            finished_at=datetime.utcnow(),
+        )
+
+    async def _finish(self, job_id: str, **values: Any) -> None:
+        async with self._session_factory() as session:
+            await session.execute(
+                update(models.Job)
+                .where(models.Job.id == job_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def _recover_interrupted(self) -> None:
+        """Requeue jobs left running by a previous process that exited uncleanly."""
+
+        async with self._session_factory() as session:
+            await session.execute(
+                update(models.Job)
+                .where(models.Job.status == models.JobStatus.running)
+                .values(status=models.JobStatus.queued)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+
+_settings = get_settings()
+job_runner = JobRunner(
+    SessionLocal,
+    workers=_settings.job_workers,
+    poll_interval=_settings.job_poll_interval_seconds,
+    retry_backoff=_settings.job_retry_backoff_seconds,
+    drain_timeout=_settings.job_drain_timeout_seconds,
+)
+
+
+__all__ = [
+    "JobRunner",
+    "PeriodicJob",
+    "TaskHandler",
+    "UnknownTaskError",
+    "can_enqueue",
+    "enqueue",
+    "job_runner",
+    "registered_tasks",
+    "task",
+]
@@ -1,25 +1,108 @@
 """FastAPI application entrypoint."""
 from __future__ import annotations
 
-from contextlib import asynccontextmanager
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
+from . import fleet
+from . import tasks  # noqa: F401 (registers background tasks)
+from .admission import AdmissionMiddleware
+from .coalescing import CoalescingMiddleware
 from .config import get_settings
+from .coordination import LeaderElection, collect_worker_metrics, share_metrics, shared_versions
 from .database import init_models
-from .routers import actions, auth, failures, maintenance, shot_counters, tools
+from .deadlines import DeadlineMiddleware
+from .health import mark_startup_complete, readiness, record_startup_phase, set_leader
+from .idempotency import IdempotencyMiddleware
+from .jobs import job_runner
+from .metrics import MetricsMiddleware, monitor_event_loop, registry
+from .profiling import SlowRequestMiddleware
+from .query_inspector import QueryInspectorMiddleware
+from .reference import reference_cache
+from .reports import install as track_report_changes
+from .routers import (
+    actions,
+    alerts,
+    auth,
+    backups,
+    batch,
+    failures,
+    jobs,
+    maintenance,
+    profiling,
+    reports,
+    shot_counters,
+    tools,
+    traces,
+)
+from .tracing import TracingMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialise application resources."""
 
-    await init_models()
-    yield
+    settings = get_settings()
+    started = time.perf_counter()
+    for phase, seconds in (await init_models()).items():
+        record_startup_phase(phase, seconds)
+    record_startup_phase("init_models", time.perf_counter() - started)
+    phase_started = time.perf_counter()
+    await reference_cache.warm()
+    record_startup_phase("reference_cache", time.perf_counter() - phase_started)
+    if settings.fleet_snapshot_enabled:
+        phase_started = time.perf_counter()
+        await fleet.warm()
+        record_startup_phase("fleet_snapshot", time.perf_counter() - phase_started)
+    if settings.reports_enabled:
+        track_report_changes()
+    background = [asyncio.create_task(shared_versions.watch(settings.coordination_poll_seconds))]
+    if settings.metrics_enabled:
+        background.append(asyncio.create_task(monitor_event_loop(settings.metrics_loop_lag_interval_seconds)))
+        if settings.workers > 1:
+            background.append(asyncio.create_task(share_metrics(registry, settings.metrics_share_interval_seconds)))
+    election = None
+    if settings.jobs_enabled:
+        job_runner.every("reconcile_shot_counts", settings.shot_reconcile_interval_seconds, priority=-10)
+        if settings.alerts_enabled:
+            job_runner.every("evaluate_alerts", settings.alert_interval_seconds)
+        if settings.retention_enabled:
+            job_runner.every("archive_expired_records", settings.retention_interval_seconds, priority=-20)
+        if settings.backup_enabled:
+            job_runner.every("backup_database", settings.backup_interval_seconds, priority=-20)
+        if settings.reports_enabled:
+            job_runner.every("refresh_reports", settings.report_interval_seconds, priority=-10)
+        if settings.idempotency_enabled:
+            job_runner.every("purge_idempotency_keys", settings.idempotency_purge_interval_seconds, priority=-20)
+
+        async def lead() -> None:
+            set_leader(True)
+            await job_runner.start()
+
+        set_leader(False)
+        election = LeaderElection(lead, job_runner.stop, interval=settings.leader_retry_seconds)
+        phase_started = time.perf_counter()
+        await election.start()
+        record_startup_phase("job_runner", time.perf_counter() - phase_started)
+    record_startup_phase("total", time.perf_counter() - started)
+    mark_startup_complete()
+    try:
+        yield
+    finally:
+        mark_startup_complete(False)
+        if election is not None:
+            await election.stop()
+        for task in background:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
 
 
 def create_app() -> FastAPI:
@@ -31,12 +114,35 @@ def create_app() -> FastAPI:
     static_directory = Path(__file__).resolve().parent / "static"
     application.mount("/static", StaticFiles(directory=static_directory), name="static")
 
+    if settings.coalescing_enabled:
+        application.add_middleware(CoalescingMiddleware)
+    if settings.idempotency_enabled:
+        # Outside coalescing so replayed responses do not invalidate cached reads.
+        application.add_middleware(IdempotencyMiddleware)
+    if settings.query_inspection_enabled:
+        application.add_middleware(QueryInspectorMiddleware)
+    if settings.profiling_enabled:
+        application.add_middleware(SlowRequestMiddleware)
+    if settings.metrics_enabled:
+        application.add_middleware(MetricsMiddleware)
+    if settings.tracing_enabled:
+        application.add_middleware(TracingMiddleware)
+    if settings.admission_enabled:
+        # Queued requests hold no trace, metrics or database state until they are admitted.
+        application.add_middleware(AdmissionMiddleware)
+    if settings.cancel_on_disconnect or settings.request_deadline_seconds is not None or settings.request_deadlines:
+        # Outside the rest, so a disconnect unwinds every other middleware's bookkeeping as well.
+        application.add_middleware(DeadlineMiddleware)
+    # Outermost: rejections, replays and timeouts from the other middleware carry CORS headers
+    # too, preflights are answered before admission, and shared responses never carry
+    # another origin's headers.
     application.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Retry-After", "Idempotent-Replayed"],
     )
 
     api_prefix = settings.api_prefix
@@ -46,6 +152,13 @@ def create_app() -> FastAPI:
     application.include_router(maintenance.router, prefix=api_prefix)
     application.include_router(failures.router, prefix=api_prefix)
     application.include_router(actions.router, prefix=api_prefix)
+    application.include_router(jobs.router, prefix=api_prefix)
+    application.include_router(alerts.router, prefix=api_prefix)
+    application.include_router(backups.router, prefix=api_prefix)
+    application.include_router(batch.router, prefix=api_prefix)
+    application.include_router(profiling.router, prefix=api_prefix)
+    application.include_router(traces.router, prefix=api_prefix)
+    application.include_router(reports.router, prefix=api_prefix)
 
     @application.get("/", include_in_schema=False)
     async def root() -> FileResponse:
@@ -53,6 +166,14 @@ def create_app() -> FastAPI:
 
         return FileResponse(static_directory / "index.html", media_type="text/html")
 
+    @application.get("/sw.js", include_in_schema=False)
+    async def service_worker() -> FileResponse:
+        """Serve the offline service worker from the root so it controls the whole portal."""
+
+        return FileResponse(
+            static_directory / "sw.js", media_type="text/javascript", headers={"Cache-Control": "no-cache"}
+        )
+
     @application.get("/health", include_in_schema=False)
     async def healthcheck() -> JSONResponse:
         """Expose a lightweight JSON healthcheck for automation tooling."""
@@ -60,6 +181,21 @@ def create_app() -> FastAPI:
         payload = {"service": settings.app_name, "status": "ok"}
         return JSONResponse(content=payload)
 
+    @application.get("/ready", include_in_schema=False)
+    async def readiness_check() -> JSONResponse:
+        """Report readiness after probing the database, workers and storage."""
+
+        ready, payload = await readiness()
+        status_code = status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        return JSONResponse(content=payload, status_code=status_code)
+
+    @application.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        """Expose metrics for all worker processes in the Prometheus text exposition format."""
+
+        snapshots = await asyncio.to_thread(collect_worker_metrics) if settings.workers > 1 else []
+        return PlainTextResponse(registry.render(snapshots), media_type="text/plain; version=0.0.4")
+
     return application
 
 
@@ -67,7 +203,6 @@ app = create_app()
 
 
 if __name__ == "__main__":
-    import uvicorn
+    from .serve import main
 
-    settings = get_settings()
-    uvicorn.run(app, host="0.0.0.0", port=settings.api_port, reload=settings.debug)
+    main()
@@ -0,0 +1,361 @@
+"""In-process Prometheus-style metrics for HTTP requests, database access and the event loop."""
+from __future__ import annotations
+
+import asyncio
+import time
+from bisect import bisect_left
+from copy import copy
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class for labelled metrics."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    values: dict[LabelValues, Any]
+
+    def samples(self, values: Optional[dict[LabelValues, Any]] = None) -> Iterable[str]:
+        raise NotImplementedError
+
+    def merge(self, values: dict[LabelValues, Any], snapshot: list[list[Any]]) -> None:
+        """Add values from another process' snapshot into ``values``."""
+
+        for labels, value in snapshot:
+            key = tuple(labels)
+            values[key] = values.get(key, 0.0) + value
+
+    def render(self, snapshots: Iterable[list[list[Any]]] = ()) -> str:
+        values = self.values
+        for snapshot in snapshots:
+            if values is self.values:
+                values = {labels: copy(value) for labels, value in self.values.items()}
+            self.merge(values, snapshot)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples(values))
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self, values: Optional[dict[LabelValues, Any]] = None) -> Iterable[str]:
+        for labels, value in (self.values if values is None else values).items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """Value that can go up and down per label set."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[LabelValues, float] = {}
+
+    def set(self, value: float, labels: LabelValues = ()) -> None:
+        self.values[labels] = value
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def samples(self, values: Optional[dict[LabelValues, Any]] = None) -> Iterable[str]:
+        for labels, value in (self.values if values is None else values).items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Bucketed observations with running sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self.values: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0.0] * (len(self.buckets) + 2)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def merge(self, values: dict[LabelValues, Any], snapshot: list[list[Any]]) -> None:
+        for labels, state in snapshot:
+            key = tuple(labels)
+            current = values.get(key)
+            values[key] = list(state) if current is None else [a + b for a, b in zip(current, state)]
+
+    def samples(self, values: Optional[dict[LabelValues, Any]] = None) -> Iterable[str]:
+        for labels, state in (self.values if values is None else values).items():
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_value(cumulative)}"
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the text exposition format."""
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict[str, list[list[Any]]]:
+        """JSON-serialisable copy of every metric's values, for cross-process aggregation."""
+
+        return {
+            name: [[list(labels), value] for labels, value in metric.values.items()]
+            for name, metric in self.metrics.items()
+        }
+
+    def render(self, snapshots: Iterable[dict[str, list[list[Any]]]] = ()) -> str:
+        """Render all metrics, adding in snapshots published by other worker processes."""
+
+        snapshots = list(snapshots)
+        return (
+            "\n".join(
+                metric.render(snapshot[name] for snapshot in snapshots if name in snapshot)
+                for name, metric in self.metrics.items()
+            )
+            + "\n"
+        )
+
+
+registry = MetricsRegistry()
+
+_ROUTE_LABELS = ("method", "router", "route", "status")
+HTTP_REQUESTS = registry.register(Counter("http_requests_total", "HTTP requests handled.", _ROUTE_LABELS))
+HTTP_LATENCY = registry.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency in seconds.", _ROUTE_LABELS)
+)
+HTTP_IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "HTTP requests currently being handled."))
+DB_QUERIES_PER_REQUEST = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements executed per HTTP request.",
+        ("router", "route"),
+        buckets=COUNT_BUCKETS,
+    )
+)
+DB_TIME_PER_REQUEST = registry.register(
+    Histogram(
+        "db_request_query_seconds",
+        "Total SQL execution time per HTTP request in seconds.",
+        ("router", "route"),
+        buckets=QUERY_BUCKETS,
+    )
+)
+DB_QUERY_DURATION = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Duration of individual SQL statements in seconds.",
+        ("router", "route"),
+        buckets=QUERY_BUCKETS,
+    )
+)
+DB_SESSION_DURATION = registry.register(
+    Histogram("db_session_duration_seconds", "Lifetime of database sessions in seconds.")
+)
+EVENT_LOOP_LAG = registry.register(
+    Histogram("event_loop_lag_seconds", "Delay between scheduled and actual event loop wake-ups.", buckets=LAG_BUCKETS)
+)
+
+
+@dataclass
+class RequestStats:
+    """Per-request accumulator shared with the database instrumentation."""
+
+    scope: dict[str, Any]
+    queries: int = 0
+    query_seconds: float = 0.0
+
+    @property
+    def labels(self) -> tuple[str, str]:
+        """``(router, route)`` labels; resolved lazily because routing happens mid-request."""
+
+        return _route_labels(self.scope)
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Return the statistics collector for the request being handled, if any."""
+
+    return _request_stats.get()
+
+
+def _route_labels(scope: dict[str, Any]) -> tuple[str, str]:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched", "unmatched"
+    tags = getattr(route, "tags", None)
+    return (str(tags[0]) if tags else "root"), path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, status codes and per-request SQL usage."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            status_code = 499  # client closed the request
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            _request_stats.reset(token)
+            router, route = stats.labels
+            labels = (scope["method"], router, route, str(status_code))
+            HTTP_REQUESTS.inc(labels)
+            HTTP_LATENCY.observe(elapsed, labels)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, (router, route))
+            DB_TIME_PER_REQUEST.observe(stats.query_seconds, (router, route))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    # A connection runs one statement at a time, so a single start time is enough.
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+
+def _record_query(conn) -> None:  # noqa: ANN001
+    started = conn.info.pop("metrics_query_start", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _request_stats.get()
+    if stats is None:
+        DB_QUERY_DURATION.observe(elapsed, ("background", "background"))
+        return
+    stats.queries += 1
+    stats.query_seconds += elapsed
+    DB_QUERY_DURATION.observe(elapsed, stats.labels)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    _record_query(conn)
+
+
+def _handle_error(exception_context) -> None:  # noqa: ANN001
+    # Failed statements never reach after_cursor_execute; count them here instead.
+    if exception_context.connection is not None:
+        _record_query(exception_context.connection)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach query timing listeners to a (sync) SQLAlchemy engine."""
+
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def observe_session(duration: float) -> None:
+    """Record how long a database session stayed open."""
+
+    DB_SESSION_DURATION.observe(duration)
+
+
+async def monitor_event_loop(interval: float) -> None:
+    """Measure event loop scheduling lag until cancelled."""
+
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsMiddleware",
+    "MetricsRegistry",
+    "RequestStats",
+    "current_request_stats",
+    "instrument_engine",
+    "monitor_event_loop",
+    "observe_session",
+    "registry",
+]
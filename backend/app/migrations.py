@@ -0,0 +1,409 @@
+"""Versioned schema migrations.
+
+Run pending migrations once per deployment, outside worker startup::
+
+    python -m app.migrations upgrade
+    python -m app.migrations status
+
+Application startup only reads the single ``schema_version`` row and compares it with
+the latest migration and the fingerprint of the declared models.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import Uuid, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from . import models
+from .config import get_settings
+from .database import Base, get_engine
+from .ids import UUIDString
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 500
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """Raised at startup when the database needs migrations that were not applied."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+@dataclass(frozen=True)
+class SchemaState:
+    version: Optional[int]
+    fingerprint: Optional[str]
+
+    @property
+    def is_current(self) -> bool:
+        return self.version == LATEST_VERSION and self.fingerprint == metadata_fingerprint()
+
+
+def metadata_fingerprint() -> str:
+    """Hash the declared tables, columns and indexes so model drift is detectable."""
+
+    description = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda item: item.name):
+        description.append(
+            {
+                "table": table.name,
+                "columns": [
+                    [column.name, str(column.type), column.nullable, column.primary_key]
+                    for column in table.columns
+                ],
+                "indexes": sorted(
+                    [index.name, [column.name for column in index.columns], bool(index.unique)]
+                    for index in table.indexes
+                ),
+            }
+        )
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _columns(connection: Connection, table: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def _add_column(connection: Connection, table: str, column: str, ddl: str) -> None:
+    if column not in _columns(connection, table):
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _ensure_indexes(connection: Connection) -> None:
+    """Create any declared index that is missing from an existing table."""
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _batched_update(connection: Connection, table: str, assignments: str, condition: str, **params: object) -> int:
+    """Apply an UPDATE in committed batches so large tables are not locked for long."""
+
+    total = 0
+    statement = text(
+        f"UPDATE {table} SET {assignments} "
+        f"WHERE id IN (SELECT id FROM {table} WHERE {condition} LIMIT {BACKFILL_BATCH_SIZE})"
+    )
+    while True:
+        updated = connection.execute(statement, params).rowcount
+        connection.commit()
+        total += updated
+        if updated < BACKFILL_BATCH_SIZE:
+            return total
+
+
+def _baseline(connection: Connection) -> None:
+    """Create missing tables and the tool shot count columns added after the first release."""
+
+    Base.metadata.create_all(connection)
+    _add_column(connection, "tools", "initial_shot_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(connection, "tools", "current_shot_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(connection, "tools", "max_shot_count", "INTEGER")
+
+
+def _alert_columns(connection: Connection) -> None:
+    """Track action item updates and index the alert evaluator's range queries."""
+
+    _add_column(connection, "action_items", "updated_at", "TIMESTAMP")
+    _ensure_indexes(connection)
+
+
+def _backfill_shot_totals(connection: Connection) -> None:
+    """Populate values left empty by the column additions above."""
+
+    _batched_update(
+        connection,
+        "tools",
+        "current_shot_count = initial_shot_count + COALESCE("
+        "(SELECT SUM(shot_count) FROM tool_shot_counters WHERE tool_shot_counters.tool_id = tools.id AND shot_count > 0), 0)",
+        "current_shot_count < initial_shot_count",
+    )
+    _batched_update(connection, "action_items", "updated_at = :now", "updated_at IS NULL", now=datetime.utcnow())
+
+
+def _archive_segments(connection: Connection) -> None:
+    """Add the archive segment catalogue and the per-tool shot counter time index."""
+
+    models.ArchiveSegment.__table__.create(connection, checkfirst=True)
+    _ensure_indexes(connection)
+
+
+def _idempotency_keys(connection: Connection) -> None:
+    """Add the idempotency key store."""
+
+    models.IdempotencyKey.__table__.create(connection, checkfirst=True)
+    _ensure_indexes(connection)
+
+
+def _job_trace_parent(connection: Connection) -> None:
+    """Let jobs continue the trace of the request that enqueued them."""
+
+    _add_column(connection, "jobs", "trace_parent", "VARCHAR(55)")
+
+
+def _service_role(connection: Connection) -> None:
+    """Allow the service account role in PostgreSQL's native enum; other databases store it as text."""
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("ALTER TYPE userrole ADD VALUE IF NOT EXISTS 'service'"))
+
+
+def _report_dirty_periods(connection: Connection) -> None:
+    """Add the queue of report periods awaiting a rebuild."""
+
+    models.ReportDirtyPeriod.__table__.create(connection, checkfirst=True)
+
+
+def _id_columns(connection: Connection) -> dict[str, list[str]]:
+    """Id and foreign key columns of the existing tables, by table."""
+
+    existing = set(inspect(connection).get_table_names())
+    return {
+        table.name: [column.name for column in table.columns if isinstance(column.type, UUIDString)]
+        for table in Base.metadata.sorted_tables
+        if table.name in existing and any(isinstance(column.type, UUIDString) for column in table.columns)
+    }
+
+
+def _convert_sqlite_ids(connection: Connection, compact: bool) -> int:
+    # SQLite columns accept either storage class whatever their declared type, so values
+    # are rewritten in place, one committed batch at a time.
+    source = "text" if compact else "blob"
+    converted = 0
+    for table, columns in _id_columns(connection).items():
+        for column in columns:
+            select_batch = text(
+                f"SELECT rowid, {column} FROM {table} WHERE typeof({column}) = :source AND rowid > :after "
+                f"ORDER BY rowid LIMIT {BACKFILL_BATCH_SIZE}"
+            )
+            update = text(f"UPDATE {table} SET {column} = :value WHERE rowid = :rowid")
+            after = 0
+            while rows := connection.execute(select_batch, {"source": source, "after": after}).all():
+                after = rows[-1][0]
+                values = []
+                for rowid, value in rows:
+                    try:
+                        stored = uuid.UUID(value).bytes if compact else str(uuid.UUID(bytes=value))
+                    except ValueError:
+                        logger.warning("Leaving non-UUID value %r in %s.%s unconverted", value, table, column)
+                        continue
+                    values.append({"rowid": rowid, "value": stored})
+                if values:
+                    connection.execute(update, values)
+                connection.commit()
+                converted += len(values)
+    return converted
+
+
+def _convert_postgresql_ids(connection: Connection, compact: bool) -> int:
+    inspector = inspect(connection)
+    target = "uuid" if compact else "varchar(36)"
+    id_columns = _id_columns(connection)
+    pending = {
+        (table, column["name"])
+        for table, names in id_columns.items()
+        for column in inspector.get_columns(table)
+        if column["name"] in names and isinstance(column["type"], Uuid) != compact
+    }
+    if not pending:
+        return 0
+    # Both sides of a foreign key must change type together, so the affected constraints
+    # are dropped and recreated around the column changes.
+    foreign_keys = [
+        (table, foreign_key)
+        for table in id_columns
+        for foreign_key in inspector.get_foreign_keys(table)
+        if any((table, name) in pending for name in foreign_key["constrained_columns"])
+        or any((foreign_key["referred_table"], name) in pending for name in foreign_key["referred_columns"])
+    ]
+    for table, foreign_key in foreign_keys:
+        connection.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{foreign_key["name"]}"'))
+    for table, column in sorted(pending):
+        connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {target} USING {column}::{target}"))
+    for table, foreign_key in foreign_keys:
+        on_delete = foreign_key.get("options", {}).get("ondelete")
+        connection.execute(
+            text(
+                f'ALTER TABLE {table} ADD CONSTRAINT "{foreign_key["name"]}" '
+                f'FOREIGN KEY ({", ".join(foreign_key["constrained_columns"])}) '
+                f'REFERENCES {foreign_key["referred_table"]} ({", ".join(foreign_key["referred_columns"])})'
+                + (f" ON DELETE {on_delete}" if on_delete else "")
+            )
+        )
+    return len(pending)
+
+
+def _convert_ids(connection: Connection) -> None:
+    """Rewrite id and foreign key columns into the storage selected by ``COMPACT_IDS``.
+
+    Existing ids keep their values; only their representation changes. Ids issued from now
+    on are time-ordered UUIDv7s.
+    """
+
+    compact = get_settings().compact_ids
+    if connection.dialect.name == "sqlite":
+        converted = _convert_sqlite_ids(connection, compact)
+    elif connection.dialect.name == "postgresql":
+        converted = _convert_postgresql_ids(connection, compact)
+    else:
+        logger.warning("Id storage conversion is not supported on %s", connection.dialect.name)
+        return
+    if converted:
+        logger.info("Converted %s id values to %s storage", converted, "binary" if compact else "string")
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "baseline schema and tool shot count columns", _baseline),
+    Migration(2, "action item updated_at and alert indexes", _alert_columns),
+    Migration(3, "backfill tool shot totals and action timestamps", _backfill_shot_totals),
+    Migration(4, "archive segments and shot counter time index", _archive_segments),
+    Migration(5, "convert ids to the configured storage", _convert_ids),
+    Migration(6, "idempotency key store", _idempotency_keys),
+    Migration(7, "job trace parent", _job_trace_parent),
+    Migration(8, "service account role", _service_role),
+    Migration(9, "report dirty periods", _report_dirty_periods),
+)
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def current_state(engine: Optional[AsyncEngine] = None) -> SchemaState:
+    """Read the stored schema version with a single-row query."""
+
+    engine = engine or get_engine()
+    try:
+        async with engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    text(f"SELECT version, fingerprint FROM {models.SchemaVersion.__tablename__} WHERE id = 1")
+                )
+            ).first()
+    except DBAPIError:
+        return SchemaState(None, None)
+    if row is None:
+        return SchemaState(None, None)
+    return SchemaState(row.version, row.fingerprint)
+
+
+def _store_version(connection: Connection, version: int) -> None:
+    models.SchemaVersion.__table__.create(connection, checkfirst=True)
+    values = {"version": version, "fingerprint": metadata_fingerprint(), "applied_at": datetime.utcnow()}
+    updated = connection.execute(
+        text(
+            "UPDATE schema_version SET version = :version, fingerprint = :fingerprint, "
+            "applied_at = :applied_at WHERE id = 1"
+        ),
+        values,
+    ).rowcount
+    if not updated:
+        connection.execute(
+            text(
+                "INSERT INTO schema_version (id, version, fingerprint, applied_at) "
+                "VALUES (1, :version, :fingerprint, :applied_at)"
+            ),
+            values,
+        )
+
+
+async def upgrade(engine: Optional[AsyncEngine] = None) -> dict[str, float]:
+    """Apply pending migrations and return the duration of each one."""
+
+    engine = engine or get_engine()
+    state = await current_state(engine)
+    applied = state.version or 0
+    timings: dict[str, float] = {}
+    for migration in MIGRATIONS:
+        if migration.version <= applied:
+            continue
+        logger.info("Applying migration %s: %s", migration.version, migration.description)
+        started = time.perf_counter()
+        async with engine.connect() as conn:
+            await conn.run_sync(migration.upgrade)
+            await conn.run_sync(_store_version, migration.version)
+            await conn.commit()
+        timings[f"migration_{migration.version}"] = time.perf_counter() - started
+
+    if state.version == LATEST_VERSION and state.fingerprint != metadata_fingerprint():
+        # Models or COMPACT_IDS changed without a new migration (typical during development):
+        # add any new tables and indexes, convert ids and record the new fingerprint.
+        logger.warning("Schema fingerprint changed without a migration; synchronising tables and indexes")
+        started = time.perf_counter()
+        async with engine.connect() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_ensure_indexes)
+            await conn.run_sync(_convert_ids)
+            await conn.run_sync(_store_version, LATEST_VERSION)
+            await conn.commit()
+        timings["schema_sync"] = time.perf_counter() - started
+    return timings
+
+
+async def ensure_schema(auto_migrate: bool, engine: Optional[AsyncEngine] = None) -> dict[str, float]:
+    """Fast startup check: verify the stored version, migrating only when allowed."""
+
+    started = time.perf_counter()
+    state = await current_state(engine)
+    timings = {"schema_check": time.perf_counter() - started}
+    if state.is_current:
+        return timings
+    if not auto_migrate:
+        raise SchemaOutOfDateError(
+            f"Database schema is at version {state.version}, expected {LATEST_VERSION}; "
+            "run `python -m app.migrations upgrade`"
+        )
+    timings.update(await upgrade(engine))
+    return timings
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the Tool Maintenance database schema.")
+    parser.add_argument("command", choices=["upgrade", "status"])
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> None:
+        if args.command == "upgrade":
+            timings = await upgrade()
+            for name, seconds in timings.items():
+                print(f"{name}: {seconds:.3f}s")
+        state = await current_state()
+        status = "up to date" if state.is_current else "out of date"
+        print(f"schema version {state.version} (latest {LATEST_VERSION}), {status}")
+        await get_engine().dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = [
+    "LATEST_VERSION",
+    "MIGRATIONS",
+    "Migration",
+    "SchemaOutOfDateError",
+    "SchemaState",
+    "current_state",
+    "ensure_schema",
+    "metadata_fingerprint",
+    "upgrade",
+]
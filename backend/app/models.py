@@ -4,21 +4,21 @@ from __future__ import annotations
 import enum
 from datetime import date, datetime
 from typing import Optional
-from uuid import uuid4
 
-from sqlalchemy import Boolean, Date, DateTime, Enum, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Date, DateTime, Enum, ForeignKey, Index, Integer, LargeBinary, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
+from .ids import UUIDString, new_id
 
 
-UUID_STR = String(36)
+UUID_STR = UUIDString()
 
 
 def uuid_str() -> str:
-    """Return a new UUID4 string."""
+    """Return a new time-ordered UUIDv7 string."""
 
-    return str(uuid4())
+    return new_id()
 
 
 class ToolStatus(str, enum.Enum):
@@ -55,11 +55,26 @@ class PhotoAngle(str, enum.Enum):
     other = "other"
 
 
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class AlertStatus(str, enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
+
 class UserRole(str, enum.Enum):
     technician = "technician"
     engineer = "engineer"
     manager = "manager"
     admin = "admin"
+    service = "service"
 
 
 class Tool(Base):
@@ -77,7 +92,9 @@ class Tool(Base):
     status: Mapped[ToolStatus] = mapped_column(Enum(ToolStatus), default=ToolStatus.active, nullable=False)
     location: Mapped[Optional[str]] = mapped_column(String(120))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
 
     shot_counters: Mapped[list["ToolShotCounter"]] = relationship(back_populates="tool", cascade="all, delete-orphan")
     maintenance_logs: Mapped[list["MaintenanceLog"]] = relationship(back_populates="tool", cascade="all, delete-orphan")
@@ -105,6 +122,7 @@ class User(Base):
 
 class ToolShotCounter(Base):
     __tablename__ = "tool_shot_counters"
+    __table_args__ = (Index("ix_tool_shot_counters_tool_id_recorded_at", "tool_id", "recorded_at"),)
 
     id: Mapped[str] = mapped_column(UUID_STR, primary_key=True, default=uuid_str)
     tool_id: Mapped[str] = mapped_column(ForeignKey("tools.id", ondelete="CASCADE"), nullable=False)
@@ -191,6 +209,7 @@ class ToolPhoto(Base):
 
 class ActionItem(Base):
     __tablename__ = "action_items"
+    __table_args__ = (Index("ix_action_items_status_due_date", "status", "due_date"),)
 
     id: Mapped[str] = mapped_column(UUID_STR, primary_key=True, default=uuid_str)
     tool_id: Mapped[str] = mapped_column(ForeignKey("tools.id", ondelete="CASCADE"), nullable=False)
@@ -201,6 +220,9 @@ class ActionItem(Base):
     due_date: Mapped[Optional[date]] = mapped_column(Date)
     status: Mapped[ActionStatus] = mapped_column(Enum(ActionStatus), default=ActionStatus.open, nullable=False)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
 
     tool: Mapped[Tool] = relationship(back_populates="action_items")
     failure_report: Mapped[Optional[FailureReport]] = relationship(back_populates="action_items")
@@ -230,6 +252,100 @@ class IntegrationEvent(Base):
     processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
 
 
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_priority_run_at", "status", "priority", "run_at"),)
+
+    id: Mapped[str] = mapped_column(UUID_STR, primary_key=True, default=uuid_str)
+    task: Mapped[str] = mapped_column(String(120), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, default="{}", nullable=False)
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.queued, nullable=False)
+    priority: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3, nullable=False)
+    unique_key: Mapped[Optional[str]] = mapped_column(String(120), index=True)
+    run_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    result: Mapped[Optional[str]] = mapped_column(Text)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_by: Mapped[Optional[str]] = mapped_column(ForeignKey("users.id"))
+    trace_parent: Mapped[Optional[str]] = mapped_column(String(55))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+
+class AlertWatermark(Base):
+    __tablename__ = "alert_watermarks"
+
+    name: Mapped[str] = mapped_column(String(60), primary_key=True)
+    value: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class AlertDelivery(Base):
+    __tablename__ = "alert_deliveries"
+
+    id: Mapped[str] = mapped_column(UUID_STR, primary_key=True, default=uuid_str)
+    alert_key: Mapped[str] = mapped_column(String(200), unique=True, nullable=False)
+    kind: Mapped[str] = mapped_column(String(60), nullable=False)
+    entity_id: Mapped[str] = mapped_column(String(120), nullable=False)
+    recipient_id: Mapped[Optional[str]] = mapped_column(ForeignKey("users.id"))
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[AlertStatus] = mapped_column(Enum(AlertStatus), default=AlertStatus.pending, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+
+class ArchiveSegment(Base):
+    __tablename__ = "archive_segments"
+    __table_args__ = (Index("ix_archive_segments_kind_tool_id_period", "kind", "tool_id", "period"),)
+
+    id: Mapped[str] = mapped_column(UUID_STR, primary_key=True, default=uuid_str)
+    kind: Mapped[str] = mapped_column(String(60), nullable=False)
+    tool_id: Mapped[Optional[str]] = mapped_column(UUID_STR)
+    period: Mapped[str] = mapped_column(String(7), nullable=False)
+    path: Mapped[str] = mapped_column(String(255), nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    shot_sum: Mapped[Optional[int]] = mapped_column(Integer)
+    first_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[bytes] = mapped_column(LargeBinary(16), primary_key=True)
+    request_hash: Mapped[bytes] = mapped_column(LargeBinary(16), nullable=False)
+    status_code: Mapped[Optional[int]] = mapped_column(Integer)
+    content_type: Mapped[Optional[str]] = mapped_column(String(120))
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class ReportDirtyPeriod(Base):
+    """A report period whose source rows changed since the report was last built; no period means all."""
+
+    __tablename__ = "report_dirty_periods"
+
+    id: Mapped[str] = mapped_column(UUID_STR, primary_key=True, default=uuid_str)
+    report: Mapped[str] = mapped_column(String(60), nullable=False)
+    period_start: Mapped[Optional[date]] = mapped_column(Date)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 __all__ = [
     "Tool",
     "ToolShotCounter",
@@ -242,10 +358,19 @@ __all__ = [
     "User",
     "AuditLog",
     "IntegrationEvent",
+    "Job",
+    "AlertWatermark",
+    "AlertDelivery",
+    "ArchiveSegment",
+    "IdempotencyKey",
+    "ReportDirtyPeriod",
+    "SchemaVersion",
     "ToolStatus",
     "ShotSource",
     "Severity",
     "ActionStatus",
     "PhotoAngle",
+    "JobStatus",
+    "AlertStatus",
     "UserRole",
 ]
@@ -0,0 +1,320 @@
+"""Sampling profiler for the event loop thread and slow-request capture.
+
+One helper thread takes stack samples, and only while there is something to sample:
+* an on-demand profile of the whole event loop thread, or
+* a request that has been running longer than ``SLOW_REQUEST_THRESHOLD_MS``.
+
+Otherwise the thread is parked on an event. Requests pay only for registering themselves
+and, while slow capture is enabled, for recording their SQL statements.
+
+Samples are kept as collapsed stacks (``outer;inner;leaf count`` lines), the input format
+of flamegraph.pl and speedscope. A suspended request contributes its coroutine await
+chain ending in ``[awaiting]``, so time spent waiting on the database shows up as well as
+time spent running.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+AWAITING = "[awaiting]"
+_PACKAGE_ROOT = str(Path(__file__).resolve().parent.parent)
+_MAX_STACK_DEPTH = 128
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when an on-demand profile is requested while another one is running."""
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_PACKAGE_ROOT):
+        module = filename[len(_PACKAGE_ROOT) + 1 :].removesuffix(".py").replace("/", ".")
+    else:
+        module = Path(filename).stem
+    return f"{module}:{code.co_qualname}"
+
+
+def _thread_stack(frame: Optional[FrameType]) -> list[FrameType]:
+    """Frames from the outermost call down to ``frame``."""
+
+    frames: list[FrameType] = []
+    while frame is not None and len(frames) < _MAX_STACK_DEPTH:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _await_chain(task: asyncio.Task[Any]) -> list[FrameType]:
+    """Frames of the coroutines ``task`` is suspended in, outermost first."""
+
+    frames: list[FrameType] = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None and len(frames) < _MAX_STACK_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is not None:
+            frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames
+
+
+def _task_stack(task: asyncio.Task[Any], loop_frame: Optional[FrameType]) -> Optional[str]:
+    chain = _await_chain(task)
+    if not chain:
+        return None
+    thread_frames = _thread_stack(loop_frame)
+    try:
+        # The task is running right now: its outermost coroutine is on the loop thread's stack.
+        start = thread_frames.index(chain[0])
+    except ValueError:
+        return ";".join([*map(_label, chain), AWAITING])
+    return ";".join(map(_label, thread_frames[start:]))
+
+
+@dataclass
+class _Watch:
+    task: asyncio.Task[Any]
+    deadline: float
+    stacks: Counter[str] = field(default_factory=Counter)
+
+
+class StackSampler:
+    """Samples the event loop thread from a helper thread while someone is listening."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watches: dict[int, _Watch] = {}
+        self._loop_profile: Optional[Counter[str]] = None
+        self.interval = get_settings().profiling_sample_interval_ms / 1000
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._loop_thread_id = threading.get_ident()
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def watch(self, key: int, task: asyncio.Task[Any], threshold: float) -> None:
+        """Start sampling ``task`` if it is still registered ``threshold`` seconds from now."""
+
+        with self._lock:
+            self._ensure_thread()
+            self._watches[key] = _Watch(task, time.perf_counter() + threshold)
+        self._wake.set()
+
+    def unwatch(self, key: int) -> Counter[str]:
+        """Stop watching and return the samples taken since the request became slow."""
+
+        with self._lock:
+            watch = self._watches.pop(key, None)
+        return watch.stacks if watch is not None else Counter()
+
+    def start_loop_profile(self) -> None:
+        with self._lock:
+            if self._loop_profile is not None:
+                raise ProfilerBusyError("A profile is already being recorded")
+            self._ensure_thread()
+            self._loop_profile = Counter()
+        self._wake.set()
+
+    def stop_loop_profile(self) -> Counter[str]:
+        with self._lock:
+            stacks, self._loop_profile = self._loop_profile or Counter(), None
+        return stacks
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            with self._lock:
+                now = time.perf_counter()
+                slow = [watch for watch in self._watches.values() if watch.deadline <= now]
+                loop_profile = self._loop_profile
+                if not self._watches and loop_profile is None:
+                    self._wake.clear()
+                    continue
+                next_deadline = min((watch.deadline for watch in self._watches.values()), default=now)
+            if slow or loop_profile is not None:
+                self._sample(slow, loop_profile)
+                time.sleep(self.interval)
+            else:
+                # Nothing is slow yet: sleep until the earliest request could become slow.
+                time.sleep(min(max(next_deadline - now, self.interval), 0.25))
+
+    def _sample(self, slow: list[_Watch], loop_profile: Optional[Counter[str]]) -> None:
+        loop_frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001 - sampling API
+        if loop_profile is not None and loop_frame is not None:
+            loop_profile[";".join(map(_label, _thread_stack(loop_frame)))] += 1
+        for watch in slow:
+            if watch.task.done():
+                continue
+            try:
+                stack = _task_stack(watch.task, loop_frame)
+            except Exception:  # noqa: BLE001 - a frame changed under us; skip this sample
+                continue
+            if stack:
+                watch.stacks[stack] += 1
+
+
+@dataclass(frozen=True)
+class SlowRequest:
+    """Profile of one request that exceeded the latency threshold."""
+
+    id: int
+    method: str
+    path: str
+    route: Optional[str]
+    status: Optional[int]
+    started_at: datetime
+    duration_ms: float
+    stacks: Counter[str]
+    statements: list[tuple[str, float]]
+
+
+sampler = StackSampler()
+_slow_requests: deque[SlowRequest] = deque(maxlen=max(1, get_settings().profiling_slow_request_keep))
+_ids = itertools.count(1)
+_request_statements: ContextVar[Optional[list[tuple[str, float]]]] = ContextVar("profiled_statements", default=None)
+_installed: set[int] = set()
+
+
+def collapsed(stacks: Counter[str]) -> str:
+    """Render stacks in the collapsed format read by flame graph tools."""
+
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def profile_event_loop(seconds: float) -> Counter[str]:
+    """Sample the event loop thread for ``seconds`` and return the collapsed stacks."""
+
+    sampler.start_loop_profile()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        stacks = sampler.stop_loop_profile()
+    return stacks
+
+
+def slow_requests() -> list[SlowRequest]:
+    """Retained slow-request profiles, newest first."""
+
+    return list(reversed(_slow_requests))
+
+
+def get_slow_request(profile_id: int) -> Optional[SlowRequest]:
+    return next((profile for profile in _slow_requests if profile.id == profile_id), None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    if _request_statements.get() is not None:
+        conn.info.setdefault("profiling_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    statements = _request_statements.get()
+    starts = conn.info.get("profiling_query_start")
+    if statements is None or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if len(statements) < get_settings().profiling_max_statements:
+        statements.append((statement, elapsed))
+
+
+def install(engines: Iterable[Engine]) -> None:
+    """Record per-request SQL statements on ``engines`` for slow-request profiles."""
+
+    for engine in engines:
+        if id(engine) in _installed:
+            continue
+        _installed.add(id(engine))
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SlowRequestMiddleware:
+    """ASGI middleware keeping a stack profile and the SQL of every request over the threshold."""
+
+    def __init__(self, app: Any) -> None:
+        from .database import get_engine, get_read_engine  # noqa: WPS433 - avoid a circular import
+
+        self.app = app
+        self.threshold = get_settings().slow_request_threshold_ms / 1000
+        install({id(engine): engine for engine in (get_engine().sync_engine, get_read_engine().sync_engine)}.values())
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        task = asyncio.current_task()
+        if scope["type"] != "http" or task is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = id(scope)
+        statements: list[tuple[str, float]] = []
+        token = _request_statements.set(statements)
+        status: Optional[int] = None
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        sampler.watch(key, task, self.threshold)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stacks = sampler.unwatch(key)
+            _request_statements.reset(token)
+            duration = time.perf_counter() - started
+            if duration >= self.threshold:
+                route = getattr(scope.get("route"), "path", None)
+                logger.warning("Slow request %s %s took %.0f ms", scope["method"], scope["path"], duration * 1000)
+                _slow_requests.append(
+                    SlowRequest(
+                        id=next(_ids),
+                        method=scope["method"],
+                        path=scope["path"],
+                        route=route,
+                        status=status,
+                        started_at=started_at,
+                        duration_ms=round(duration * 1000, 1),
+                        stacks=stacks,
+                        statements=statements,
+                    )
+                )
+
+
+__all__ = [
+    "ProfilerBusyError",
+    "SlowRequest",
+    "SlowRequestMiddleware",
+    "StackSampler",
+    "collapsed",
+    "get_slow_request",
+    "install",
+    "profile_event_loop",
+    "sampler",
+    "slow_requests",
+]
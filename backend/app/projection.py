@@ -0,0 +1,68 @@
+"""Sparse fieldsets for list endpoints.
+
+``?fields=id,name`` is validated against the endpoint's response schema, narrows the
+SELECT column list via ``load_only`` and serialises only those fields.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel, TypeAdapter, create_model
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from .models import Base
+
+Fields = Optional[tuple[str, ...]]
+
+
+class FieldSelection:
+    """Dependency parsing the ``fields`` query parameter for a response schema."""
+
+    def __init__(self, schema: type[BaseModel]) -> None:
+        self.schema = schema
+
+    def __call__(
+        self, fields: Optional[str] = Query(None, description="Comma-separated list of fields to return.")
+    ) -> Fields:
+        if fields is None:
+            return None
+        requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in requested if name not in self.schema.model_fields]
+        if not requested or unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}; "
+                f"choose from {', '.join(self.schema.model_fields)}",
+            )
+        return requested
+
+
+def load_columns(model: type[Base], fields: Iterable[str]) -> LoaderOption:
+    """Loader option selecting only the mapped columns among ``fields`` (plus the primary key)."""
+
+    columns = model.__mapper__.column_attrs
+    return load_only(*(getattr(model, name) for name in fields if name in columns))
+
+
+@lru_cache(maxsize=256)
+def _adapter(schema: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter[Any]:
+    projected = create_model(
+        f"{schema.__name__}Fields",
+        __config__=schema.model_config,
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+    )
+    return TypeAdapter(list[projected])
+
+
+def project(schema: type[BaseModel], items: Iterable[Any], fields: tuple[str, ...]) -> Response:
+    """Serialise ORM rows or schema instances with only the selected fields."""
+
+    adapter = _adapter(schema, fields)
+    content = adapter.dump_json(adapter.validate_python(list(items), from_attributes=True))
+    return Response(content, media_type="application/json")
+
+
+__all__ = ["FieldSelection", "Fields", "load_columns", "project"]
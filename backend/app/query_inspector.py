@@ -0,0 +1,260 @@
+"""Opt-in SQL inspection for spotting N+1 patterns, slow statements and query budget overruns."""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+# Strict budgets only fail reads; a write has already committed by the time its response starts.
+_STRICT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when more statements run than a query budget allows."""
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise a SQL statement so repeated executions with different values compare equal."""
+
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryLog:
+    """Statements captured for one request or test block."""
+
+    label: str
+    statements: list[tuple[str, float]] = field(default_factory=list)
+    relationship_loads: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes executed at least ``threshold`` times, most frequent first."""
+
+        shapes = Counter(statement_shape(statement) for statement, _ in self.statements)
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def repeated_relationship_loads(self, threshold: int) -> list[tuple[str, int]]:
+        return [(path, count) for path, count in self.relationship_loads.most_common() if count >= threshold]
+
+
+_request_log: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+_captures: list[QueryLog] = []
+_installed: set[int] = set()
+
+
+def _active_logs() -> list[QueryLog]:
+    logs = list(_captures)
+    request_log = _request_log.get()
+    if request_log is not None:
+        logs.append(request_log)
+    return logs
+
+
+def _explain(conn: Any, statement: str, parameters: Any) -> Optional[str]:
+    prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+        return None
+    conn.info["query_inspector_explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    except Exception as exc:  # noqa: BLE001 - diagnostics must never break the request
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        conn.info["query_inspector_explaining"] = False
+    return "\n".join(" | ".join(str(value) for value in row) for row in rows)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    if conn.info.get("query_inspector_explaining"):
+        return
+    conn.info.setdefault("query_inspector_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    if conn.info.get("query_inspector_explaining"):
+        return
+    starts = conn.info.get("query_inspector_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    logs = _active_logs()
+    for log in logs:
+        log.statements.append((statement, elapsed))
+
+    settings = get_settings()
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        plan = None if executemany else _explain(conn, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms) during %s: %s\nParameters: %s\nPlan:\n%s",
+            elapsed * 1000,
+            logs[-1].label if logs else "background work",
+            statement,
+            parameters,
+            plan or "n/a",
+        )
+
+
+def _on_orm_execute(state: ORMExecuteState) -> None:
+    if not state.is_relationship_load:
+        return
+    logs = _active_logs()
+    if not logs:
+        return
+    path = str(state.loader_strategy_path) if state.loader_strategy_path is not None else "relationship"
+    for log in logs:
+        log.relationship_loads[path] += 1
+
+
+def install(engine: Engine) -> None:
+    """Attach inspection listeners to a (sync) engine and to ORM sessions."""
+
+    if id(engine) in _installed:
+        return
+    _installed.add(id(engine))
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if not event.contains(Session, "do_orm_execute", _on_orm_execute):
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
+
+
+def _ensure_installed() -> None:
+    from .database import get_engine  # noqa: WPS433 - avoid a circular import at module load
+
+    install(get_engine().sync_engine)
+
+
+def budget_for(route: str) -> Optional[int]:
+    """Return the configured statement budget for a route template."""
+
+    settings = get_settings()
+    return settings.query_budgets.get(route, settings.query_budget_default)
+
+
+def report(log: QueryLog) -> list[str]:
+    """Describe suspicious patterns in a query log and log them as warnings."""
+
+    threshold = get_settings().n_plus_one_threshold
+    findings: list[str] = []
+    for shape, count in log.repeated_shapes(threshold):
+        findings.append(f"statement repeated {count} times: {shape}")
+    for path, count in log.repeated_relationship_loads(threshold):
+        findings.append(f"relationship {path} loaded {count} times")
+    for finding in findings:
+        logger.warning("Possible N+1 during %s: %s", log.label, finding)
+    return findings
+
+
+@asynccontextmanager
+async def capture_queries(label: str = "capture", max_queries: Optional[int] = None) -> AsyncIterator[QueryLog]:
+    """Record every statement executed inside the block, failing if ``max_queries`` is exceeded.
+
+    Intended for tests, for example ``async with capture_queries(max_queries=3): await client.get(...)``.
+    """
+
+    _ensure_installed()
+    log = QueryLog(label)
+    _captures.append(log)
+    try:
+        yield log
+    finally:
+        _captures.remove(log)
+    report(log)
+    if max_queries is not None and log.count > max_queries:
+        shapes = "\n".join(f"  {count}x {shape}" for shape, count in log.repeated_shapes(1))
+        raise QueryBudgetExceeded(f"{label} executed {log.count} statements (budget {max_queries}):\n{shapes}")
+
+
+class QueryInspectorMiddleware:
+    """ASGI middleware that tracks statements per request and enforces per-route budgets."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog(f"{scope['method']} {scope['path']}")
+        token = _request_log.set(log)
+        suppress_body = False
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal suppress_body
+            if message["type"] == "http.response.start":
+                route = getattr(scope.get("route"), "path", None)
+                budget = budget_for(route) if route else None
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(log.count).encode()))
+                if budget is not None and log.count > budget:
+                    logger.warning("%s executed %d statements, over its budget of %d", log.label, log.count, budget)
+                    headers.append((b"x-query-budget-exceeded", str(budget).encode()))
+                    if get_settings().query_budget_strict and scope["method"] in _STRICT_METHODS:
+                        suppress_body = True
+                        body = json.dumps(
+                            {"detail": f"Query budget exceeded: {log.count} statements (budget {budget})"}
+                        ).encode()
+                        await send(
+                            {
+                                "type": "http.response.start",
+                                "status": 500,
+                                "headers": [
+                                    (b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode()),
+                                ],
+                            }
+                        )
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                message = {**message, "headers": headers}
+            elif suppress_body:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_log.reset(token)
+            report(log)
+
+
+__all__ = [
+    "QueryBudgetExceeded",
+    "QueryInspectorMiddleware",
+    "QueryLog",
+    "budget_for",
+    "capture_queries",
+    "install",
+    "report",
+    "statement_shape",
+]
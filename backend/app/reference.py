@@ -0,0 +1,128 @@
+"""Versioned in-process cache for rarely changing reference data.
+
+Each dataset is tracked in ``coordination.shared_versions``. Writers bump the version when the
+data changes; every worker process polls the versions in the background and reloads a dataset
+on its next lookup once it has changed, so lookups themselves perform no I/O.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from . import models, schemas
+from .coordination import Stamp, after_commit, shared_versions
+from .database import SessionLocal
+
+FAILURE_CODES = "failure_codes"
+USERS = "users"
+TOOL_CATALOGUE = "tool_catalogue"
+
+Loader = Callable[[AsyncSession], Awaitable[list[Any]]]
+
+
+@dataclass
+class _Dataset:
+    loader: Loader
+    value: Optional[list[Any]] = None
+    stamp: Stamp = None
+    loaded_at: Optional[float] = None
+
+
+class ReferenceCache:
+    """Named datasets loaded on demand and invalidated locally or by other processes."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        self._session_factory = session_factory
+        self._datasets: dict[str, _Dataset] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def register(self, name: str, loader: Loader) -> None:
+        self._datasets[name] = _Dataset(loader)
+        self._locks[name] = asyncio.Lock()
+
+    async def get(self, name: str) -> list[Any]:
+        """Return the cached dataset, reloading it if it was invalidated."""
+
+        dataset = self._datasets[name]
+        if dataset.value is not None and dataset.stamp == shared_versions.current(name):
+            return dataset.value
+        async with self._locks[name]:
+            if dataset.value is not None and dataset.stamp == shared_versions.current(name):
+                return dataset.value
+            stamp = shared_versions.current(name)
+            async with self._session_factory() as session:
+                value = await dataset.loader(session)
+            dataset.value, dataset.stamp, dataset.loaded_at = value, stamp, time.monotonic()
+            return value
+
+    def invalidate(self, name: str) -> None:
+        """Mark a dataset as changed in this process and in every other worker.
+
+        Inside ``deferred_invalidations`` this waits until the enclosing transaction commits.
+        """
+
+        def apply() -> None:
+            self._datasets[name].value = None
+            shared_versions.publish(name)
+
+        after_commit(apply)
+
+    async def warm(self) -> None:
+        """Track every dataset's version and load it so first requests are served from memory."""
+
+        for name in self._datasets:
+            await asyncio.to_thread(shared_versions.track, name)
+            await self.get(name)
+
+    def status(self) -> dict[str, Any]:
+        return {
+            name: {
+                "cached": dataset.value is not None,
+                "entries": len(dataset.value) if dataset.value is not None else None,
+                "current": dataset.value is not None and dataset.stamp == shared_versions.current(name),
+            }
+            for name, dataset in self._datasets.items()
+        }
+
+
+async def _load_failure_codes(session: AsyncSession) -> list[schemas.FailureCodeRead]:
+    result = await session.execute(select(models.FailureCode).order_by(models.FailureCode.code))
+    return [schemas.FailureCodeRead.from_orm(code) for code in result.scalars()]
+
+
+async def _load_users(session: AsyncSession) -> list[schemas.UserSummary]:
+    result = await session.execute(
+        select(models.User.id, models.User.username, models.User.full_name, models.User.role).order_by(
+            models.User.username
+        )
+    )
+    return [schemas.UserSummary.model_validate(row._mapping) for row in result]
+
+
+async def _load_tool_catalogue(session: AsyncSession) -> list[schemas.ToolSummary]:
+    result = await session.execute(
+        select(
+            models.Tool.id, models.Tool.asset_number, models.Tool.name, models.Tool.status, models.Tool.location
+        ).order_by(models.Tool.asset_number)
+    )
+    return [schemas.ToolSummary.model_validate(row._mapping) for row in result]
+
+
+reference_cache = ReferenceCache(SessionLocal)
+reference_cache.register(FAILURE_CODES, _load_failure_codes)
+reference_cache.register(USERS, _load_users)
+reference_cache.register(TOOL_CATALOGUE, _load_tool_catalogue)
+
+
+__all__ = [
+    "FAILURE_CODES",
+    "ReferenceCache",
+    "TOOL_CATALOGUE",
+    "USERS",
+    "reference_cache",
+]
@@ -0,0 +1,456 @@
+"""Declarative management reports materialised into cached CSV and JSON artifacts.
+
+A report aggregates one source table by week and site (the tool location), plus its own
+dimensions, using additive measures (counts and sums). Each week is stored as a JSON
+partition under ``REPORT_DIRECTORY/<report>/``. The combined ``<report>.csv`` and
+``<report>.json`` are rewritten from the partitions after every build, so downloads are
+plain file reads.
+
+Writers never rebuild reports themselves. A flush that touches a report's source rows
+queues the affected weeks in ``report_dirty_periods`` within the same transaction. The
+``refresh_reports`` job then rebuilds only those weeks, and the current and previous week
+because overdue counts change with the date alone.
+
+A full rebuild is queued when a dimension the rows are grouped by changes, such as a tool
+moving site or a failure code being renamed.
+
+ORM bulk statements are not tracked. Rows archived by retention leave their table that way,
+so reports over archived tables also read the archive segments: every build, full or
+incremental, counts archived rows alongside the live ones.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import Date, and_, case, delete, event, func, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from . import models
+from .config import get_settings
+from .retention import read_archived
+
+logger = logging.getLogger(__name__)
+
+SITE = func.coalesce(models.Tool.location, "unassigned")
+_OPEN_ACTION_STATUSES = (models.ActionStatus.open, models.ActionStatus.in_progress)
+
+
+@dataclass(frozen=True)
+class Join:
+    target: Any
+    onclause: Any
+    outer: bool = False
+
+
+@dataclass(frozen=True)
+class Archived:
+    """Source rows that retention moves to ``kind`` archive segments.
+
+    Archived rows are matched to their tool by ``key`` (the report's dimensions must derive
+    from the tool) and contribute the summed ``measures`` fields, in report measure order.
+    """
+
+    kind: str
+    key: str
+    measures: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Report:
+    """A weekly report over ``model`` rows, assigned to weeks by ``timestamp``.
+
+    ``depends_on`` lists attributes of other models whose change invalidates every week.
+    """
+
+    name: str
+    title: str
+    model: type[models.Base]
+    timestamp: InstrumentedAttribute
+    dimensions: tuple[tuple[str, Any], ...]
+    measures: tuple[tuple[str, Any], ...]
+    joins: tuple[Join, ...] = ()
+    where: tuple[Any, ...] = ()
+    depends_on: tuple[InstrumentedAttribute, ...] = ()
+    archived: Optional[Archived] = None
+    precision: int = 2
+
+    @property
+    def columns(self) -> list[str]:
+        return ["period_start", *(name for name, _ in self.dimensions), *(name for name, _ in self.measures)]
+
+
+REPORTS: dict[str, Report] = {
+    report.name: report
+    for report in (
+        Report(
+            name="failures_by_code",
+            title="Failures by code and severity",
+            model=models.FailureReport,
+            timestamp=models.FailureReport.occurred_at,
+            joins=(
+                Join(models.Tool, models.Tool.id == models.FailureReport.tool_id),
+                Join(models.FailureCode, models.FailureCode.id == models.FailureReport.failure_code_id, outer=True),
+            ),
+            dimensions=(
+                ("site", SITE),
+                ("failure_code", func.coalesce(models.FailureCode.code, "uncoded")),
+                ("severity", models.FailureReport.severity),
+            ),
+            measures=(("failures", func.count()),),
+            depends_on=(models.Tool.location, models.FailureCode.code),
+        ),
+        Report(
+            name="maintenance_hours",
+            title="Maintenance events and hours",
+            model=models.MaintenanceLog,
+            timestamp=models.MaintenanceLog.performed_at,
+            joins=(Join(models.Tool, models.Tool.id == models.MaintenanceLog.tool_id),),
+            dimensions=(("site", SITE),),
+            measures=(
+                ("maintenance_events", func.count()),
+                ("maintenance_hours", func.coalesce(func.sum(models.MaintenanceLog.duration_minutes), 0) / 60.0),
+            ),
+            depends_on=(models.Tool.location,),
+        ),
+        Report(
+            name="overdue_actions",
+            title="Overdue action items by assignee (week of due date)",
+            model=models.ActionItem,
+            timestamp=models.ActionItem.due_date,
+            joins=(
+                Join(models.Tool, models.Tool.id == models.ActionItem.tool_id),
+                Join(models.User, models.User.id == models.ActionItem.assigned_to),
+            ),
+            where=(models.ActionItem.status != models.ActionStatus.cancelled,),
+            dimensions=(("site", SITE), ("assignee", models.User.username)),
+            measures=(
+                (
+                    "overdue_open",
+                    func.sum(
+                        case(
+                            (
+                                and_(
+                                    models.ActionItem.status.in_(_OPEN_ACTION_STATUSES),
+                                    models.ActionItem.due_date < func.current_date(),
+                                ),
+                                1,
+                            ),
+                            else_=0,
+                        )
+                    ),
+                ),
+                (
+                    "completed_late",
+                    func.sum(
+                        case(
+                            (
+                                and_(
+                                    models.ActionItem.status == models.ActionStatus.completed,
+                                    func.date(models.ActionItem.completed_at) > models.ActionItem.due_date,
+                                ),
+                                1,
+                            ),
+                            else_=0,
+                        )
+                    ),
+                ),
+            ),
+            depends_on=(models.Tool.location, models.User.username),
+        ),
+        Report(
+            name="shots_per_tool",
+            title="Shots per tool",
+            model=models.ToolShotCounter,
+            timestamp=models.ToolShotCounter.recorded_at,
+            joins=(Join(models.Tool, models.Tool.id == models.ToolShotCounter.tool_id),),
+            dimensions=(("site", SITE), ("asset_number", models.Tool.asset_number)),
+            measures=(("shots", func.sum(models.ToolShotCounter.shot_count)),),
+            depends_on=(models.Tool.location, models.Tool.asset_number),
+            archived=Archived("shot_counters", key="tool_id", measures=("shot_count",)),
+        ),
+    )
+}
+
+
+def period_start(value: date) -> date:
+    """Monday of the ISO week containing ``value``."""
+
+    day = value.date() if isinstance(value, datetime) else value
+    return day - timedelta(days=day.weekday())
+
+
+def _day(value: Any) -> date:
+    # SQLite returns date() results as text.
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _plain(value: Any) -> Any:
+    return value.value if hasattr(value, "value") else value
+
+
+# -- change tracking -----------------------------------------------------------------------
+
+
+def _touched_periods(session: Session) -> set[tuple[str, Optional[date]]]:
+    touched: set[tuple[str, Optional[date]]] = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, models.ReportDirtyPeriod):
+            continue
+        state = inspect(instance)
+        deleted = instance in session.deleted
+        for report in REPORTS.values():
+            if isinstance(instance, report.model):
+                if instance in session.dirty and not session.is_modified(instance):
+                    continue
+                history = state.attrs[report.timestamp.key].history
+                # New rows without a timestamp default to now, and the current week is always rebuilt.
+                for value in (*history.added, *history.unchanged, *history.deleted):
+                    if value is not None:
+                        touched.add((report.name, period_start(value)))
+            elif instance in session.new:
+                continue
+            for attribute in report.depends_on:
+                if isinstance(instance, attribute.class_) and (
+                    deleted or state.attrs[attribute.key].history.has_changes()
+                ):
+                    touched.add((report.name, None))
+    return touched
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    recent = period_start(date.today()) - timedelta(days=7)
+    for name, start in _touched_periods(session):
+        # The current and previous week are rebuilt on every refresh, so ingest queues nothing.
+        if start is None or start < recent:
+            session.add(models.ReportDirtyPeriod(report=name, period_start=start))
+
+
+def install() -> None:
+    """Queue report periods touched by every ORM flush."""
+
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+
+
+# -- building ------------------------------------------------------------------------------
+
+
+def _directory(report: Report) -> Path:
+    return Path(get_settings().report_directory) / report.name
+
+
+def artifact_path(report: Report, suffix: str) -> Path:
+    return _directory(report) / f"{report.name}.{suffix}"
+
+
+def partition_path(report: Report, start: date) -> Path:
+    return _directory(report) / "periods" / f"{start.isoformat()}.json"
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary.write_text(content, encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def read_manifest(report: Report) -> Optional[dict[str, Any]]:
+    try:
+        return json.loads(artifact_path(report, "manifest.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+async def _aggregate(session: AsyncSession, report: Report, periods: Optional[set[date]]) -> dict[date, list[dict[str, Any]]]:
+    """Rows of ``report`` by week, for ``periods`` or for all time."""
+
+    day = func.date(report.timestamp).label("day")
+    dimensions = [expression.label(name) for name, expression in report.dimensions]
+    statement = select(day, *dimensions, *(expression.label(name) for name, expression in report.measures))
+    statement = statement.select_from(report.model)
+    for join in report.joins:
+        statement = statement.join(join.target, join.onclause, isouter=join.outer)
+    statement = statement.where(report.timestamp.is_not(None), *report.where)
+    if periods is not None:
+        as_date = isinstance(report.timestamp.type, Date)
+        ranges = []
+        for start in sorted(periods):
+            lower = start if as_date else datetime.combine(start, datetime.min.time())
+            ranges.append(and_(report.timestamp >= lower, report.timestamp < lower + timedelta(days=7)))
+        statement = statement.where(or_(*ranges))
+    statement = statement.group_by(day, *dimensions)
+
+    # Measures are additive, so daily groups roll up into weeks.
+    totals: dict[tuple[date, tuple[Any, ...]], list[float]] = defaultdict(lambda: [0] * len(report.measures))
+    result = await session.execute(statement)
+    dimension_count = len(report.dimensions)
+    for row in result.all():
+        key = (period_start(_day(row[0])), tuple(_plain(value) for value in row[1 : 1 + dimension_count]))
+        measures = totals[key]
+        for index, value in enumerate(row[1 + dimension_count :]):
+            measures[index] += value or 0
+    if report.archived is not None:
+        await _add_archived(session, report, periods, totals)
+
+    weeks: dict[date, list[dict[str, Any]]] = defaultdict(list)
+    for (start, dimension_values), measures in sorted(totals.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        if not any(measures):
+            continue
+        row = {"period_start": start.isoformat()}
+        row.update(zip((name for name, _ in report.dimensions), dimension_values))
+        row.update(
+            (name, round(value, report.precision) if isinstance(value, float) else value)
+            for (name, _), value in zip(report.measures, measures)
+        )
+        weeks[start].append(row)
+    return weeks
+
+
+async def _add_archived(
+    session: AsyncSession,
+    report: Report,
+    periods: Optional[set[date]],
+    totals: dict[tuple[date, tuple[Any, ...]], list[float]],
+) -> None:
+    """Fold rows retention moved out of ``report.model`` into ``totals``."""
+
+    archived = report.archived
+    since = until = None
+    if periods is not None:
+        since = datetime.combine(min(periods), datetime.min.time())
+        until = datetime.combine(max(periods) + timedelta(days=7), datetime.min.time())
+    rows = await read_archived(session, archived.kind, since=since, until=until)
+    if not rows:
+        return
+    dimensions = [expression.label(name) for name, expression in report.dimensions]
+    result = await session.execute(select(models.Tool.id, *dimensions).select_from(models.Tool))
+    tools = {row[0]: tuple(_plain(value) for value in row[1:]) for row in result.all()}
+    for row in rows:
+        start = period_start(row[report.timestamp.key])
+        dimension_values = tools.get(row[archived.key])
+        if dimension_values is None or (periods is not None and start not in periods):
+            continue
+        measures = totals[(start, dimension_values)]
+        for index, field in enumerate(archived.measures):
+            measures[index] += row[field] or 0
+
+
+def _materialise(report: Report, weeks: dict[date, list[dict[str, Any]]], periods: Optional[set[date]]) -> dict[str, int]:
+    """Write rebuilt partitions and regenerate the combined artifacts; returns rows per week."""
+
+    partitions = _directory(report) / "periods"
+    partitions.mkdir(parents=True, exist_ok=True)
+    rebuilt = set(weeks) | (periods or set())
+    if periods is None:
+        # Full build: weeks that no longer have rows are dropped.
+        rebuilt |= {date.fromisoformat(path.stem) for path in partitions.glob("*.json")}
+    for start in rebuilt:
+        path = partition_path(report, start)
+        if weeks.get(start):
+            _write_atomic(path, json.dumps(weeks[start], default=str))
+        elif path.exists():
+            path.unlink()
+
+    counts: dict[str, int] = {}
+    rows: list[dict[str, Any]] = []
+    for path in sorted(partitions.glob("*.json")):
+        week = json.loads(path.read_text(encoding="utf-8"))
+        counts[path.stem] = len(week)
+        rows.extend(week)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=report.columns)
+    writer.writeheader()
+    writer.writerows(rows)
+    _write_atomic(artifact_path(report, "csv"), buffer.getvalue())
+    _write_atomic(artifact_path(report, "json"), json.dumps({"report": report.name, "columns": report.columns, "rows": rows}, default=str))
+    return counts
+
+
+async def build_report(session: AsyncSession, report: Report, periods: Optional[set[date]]) -> dict[str, Any]:
+    """Rebuild ``periods`` of ``report`` (``None``: every week) and its combined artifacts.
+
+    Aggregates on ``session``, which must read the primary: the caller clears the dirty
+    markers afterwards, so rows a lagging replica has not seen yet would never be rebuilt.
+    """
+
+    weeks = await _aggregate(session, report, periods)
+    counts = await asyncio.to_thread(_materialise, report, weeks, periods)
+    previous = read_manifest(report) or {}
+    now = datetime.utcnow().isoformat()
+    manifest = {
+        "report": report.name,
+        "built_at": now,
+        "full_built_at": now if periods is None else previous.get("full_built_at"),
+        "periods": counts,
+        "rows": sum(counts.values()),
+        "rebuilt_periods": len(weeks) if periods is None else len(periods),
+    }
+    await asyncio.to_thread(_write_atomic, artifact_path(report, "manifest.json"), json.dumps(manifest))
+    return manifest
+
+
+async def refresh_reports(session: AsyncSession, names: Optional[Iterable[str]] = None, full: bool = False) -> dict[str, Any]:
+    """Rebuild the queued periods of each report and clear them from the queue."""
+
+    selected = [REPORTS[name] for name in names] if names else list(REPORTS.values())
+    queued = (
+        await session.execute(
+            select(models.ReportDirtyPeriod.id, models.ReportDirtyPeriod.report, models.ReportDirtyPeriod.period_start)
+        )
+    ).all()
+    dirty: dict[str, set[Optional[date]]] = defaultdict(set)
+    for _, name, start in queued:
+        dirty[name].add(start)
+    this_week = period_start(date.today())
+    results: dict[str, Any] = {}
+    for report in selected:
+        pending = dirty.get(report.name, set())
+        if full or None in pending or read_manifest(report) is None:
+            periods = None
+        else:
+            periods = {*pending, this_week, this_week - timedelta(days=7)}
+        manifest = await build_report(session, report, periods)
+        results[report.name] = {"full": periods is None, "rebuilt_periods": manifest["rebuilt_periods"], "rows": manifest["rows"]}
+    built = {report.name for report in selected}
+    processed = [row_id for row_id, name, _ in queued if name in built]
+    if processed:
+        await session.execute(delete(models.ReportDirtyPeriod).where(models.ReportDirtyPeriod.id.in_(processed)))
+        await session.commit()
+    logger.info("Refreshed reports: %s", results)
+    return results
+
+
+async def pending_periods(session: AsyncSession) -> dict[str, int]:
+    result = await session.execute(
+        select(models.ReportDirtyPeriod.report, func.count()).group_by(models.ReportDirtyPeriod.report)
+    )
+    return dict(result.all())
+
+
+__all__ = [
+    "REPORTS",
+    "Archived",
+    "Join",
+    "Report",
+    "artifact_path",
+    "build_report",
+    "install",
+    "partition_path",
+    "pending_periods",
+    "period_start",
+    "read_manifest",
+    "refresh_reports",
+]
@@ -0,0 +1,233 @@
+"""Retention tiering: roll old raw rows into compressed archive segments.
+
+Rows older than the configured age are written to gzip-compressed NDJSON files grouped by
+month (and by tool for shot counters), catalogued in ``archive_segments`` and then deleted
+from their table. Each segment records its shot total so ``Tool.current_shot_count`` and
+reconciliation stay exact, and :func:`read_archived` serves archived ranges back on demand.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import get_settings
+from .ids import new_id
+
+logger = logging.getLogger(__name__)
+
+_DELETE_CHUNK = 500
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """How one table is archived."""
+
+    kind: str
+    model: type[models.Base]
+    timestamp: str
+    max_age_days: int
+    per_tool: bool = False
+
+
+def policies() -> list[RetentionPolicy]:
+    settings = get_settings()
+    return [
+        RetentionPolicy(
+            "shot_counters", models.ToolShotCounter, "recorded_at", settings.retention_shot_counter_days, per_tool=True
+        ),
+        RetentionPolicy("audit_logs", models.AuditLog, "timestamp", settings.retention_audit_log_days),
+        RetentionPolicy(
+            "integration_events", models.IntegrationEvent, "received_at", settings.retention_integration_event_days
+        ),
+    ]
+
+
+def _serialise(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return value
+
+
+def _write_segment(path: Path, rows: list[dict[str, Any]]) -> str:
+    """Write rows as gzip NDJSON atomically and return the file's SHA-256."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.tmp")
+    with gzip.open(temporary, "wt", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps({key: _serialise(value) for key, value in row.items()}, separators=(",", ":")))
+            handle.write("\n")
+    with temporary.open("rb") as handle:
+        digest = hashlib.sha256(handle.read()).hexdigest()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+    return digest
+
+
+def _read_segment(path: Path, sha256: Optional[str] = None) -> list[dict[str, Any]]:
+    data = path.read_bytes()
+    if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256:
+        raise ValueError(f"Archive segment {path} failed checksum verification")
+    return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines() if line]
+
+
+async def _archive_batch(session: AsyncSession, policy: RetentionPolicy, cutoff: datetime, limit: int) -> int:
+    model = policy.model
+    column = getattr(model, policy.timestamp)
+    ordering = [model.tool_id, column] if policy.per_tool else [column]
+    result = await session.execute(select(model.__table__).where(column < cutoff).order_by(*ordering).limit(limit))
+    rows = [dict(row._mapping) for row in result]
+    if not rows:
+        return 0
+
+    groups: dict[tuple[Optional[str], str], list[dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        groups[(row["tool_id"] if policy.per_tool else None, row[policy.timestamp].strftime("%Y-%m"))].append(row)
+
+    directory = Path(get_settings().archive_directory)
+    written: list[Path] = []
+    try:
+        for (tool_id, period), group in groups.items():
+            segment_id = new_id()
+            relative = Path(policy.kind, *([tool_id] if tool_id else []), f"{period}-{segment_id[:8]}.ndjson.gz")
+            digest = await asyncio.to_thread(_write_segment, directory / relative, group)
+            written.append(directory / relative)
+            session.add(
+                models.ArchiveSegment(
+                    id=segment_id,
+                    kind=policy.kind,
+                    tool_id=tool_id,
+                    period=period,
+                    path=str(relative),
+                    row_count=len(group),
+                    shot_sum=sum(row["shot_count"] for row in group) if policy.per_tool else None,
+                    first_at=min(row[policy.timestamp] for row in group),
+                    last_at=max(row[policy.timestamp] for row in group),
+                    sha256=digest,
+                )
+            )
+        ids = [row["id"] for row in rows]
+        for start in range(0, len(ids), _DELETE_CHUNK):
+            await session.execute(
+                delete(model).where(model.id.in_(ids[start : start + _DELETE_CHUNK])).execution_options(
+                    synchronize_session=False
+                )
+            )
+        await session.commit()
+    except BaseException:
+        # Rows stay in the database, so discard the files written for this batch.
+        await session.rollback()
+        for path in written:
+            path.unlink(missing_ok=True)
+        raise
+    return len(rows)
+
+
+async def archive_expired(session: AsyncSession, *, now: Optional[datetime] = None) -> dict[str, int]:
+    """Archive every row older than its retention age and return counts per table.
+
+    Does nothing unless ``RETENTION_ENABLED`` is set, however the run was started.
+    """
+
+    settings = get_settings()
+    if not settings.retention_enabled:
+        logger.info("Retention is disabled; no records archived")
+        return {}
+    now = now or datetime.utcnow()
+    limit = settings.retention_batch_size
+    archived: dict[str, int] = {}
+    for policy in policies():
+        cutoff = now - timedelta(days=policy.max_age_days)
+        total = 0
+        while count := await _archive_batch(session, policy, cutoff, limit):
+            total += count
+        archived[policy.kind] = total
+    return archived
+
+
+async def archived_shot_totals(session: AsyncSession, tool_id: Optional[str] = None) -> dict[str, int]:
+    """Return the shots held in archive segments per tool."""
+
+    statement = (
+        select(models.ArchiveSegment.tool_id, func.coalesce(func.sum(models.ArchiveSegment.shot_sum), 0))
+        .where(models.ArchiveSegment.kind == "shot_counters")
+        .group_by(models.ArchiveSegment.tool_id)
+    )
+    if tool_id is not None:
+        statement = statement.where(models.ArchiveSegment.tool_id == tool_id)
+    result = await session.execute(statement)
+    return {tool: int(total) for tool, total in result.all()}
+
+
+async def read_archived(
+    session: AsyncSession,
+    kind: str,
+    *,
+    tool_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    descending: bool = False,
+) -> list[dict[str, Any]]:
+    """Load archived rows of ``kind`` whose timestamp falls in ``[since, until)``.
+
+    Rows are ordered by timestamp and id. With ``limit`` only the first ``limit`` rows in
+    that order are returned, and segments that cannot contain them are not read.
+    """
+
+    policy = next(policy for policy in policies() if policy.kind == kind)
+    segment = models.ArchiveSegment
+    statement = select(segment).where(segment.kind == kind)
+    if tool_id is not None:
+        statement = statement.where(segment.tool_id == tool_id)
+    if since is not None:
+        statement = statement.where(segment.last_at >= since)
+    if until is not None:
+        statement = statement.where(segment.first_at < until)
+    statement = statement.order_by(segment.last_at.desc() if descending else segment.first_at)
+    segments = (await session.execute(statement)).scalars().all()
+
+    def key(row: dict[str, Any]) -> tuple[datetime, Any]:
+        return row[policy.timestamp], row["id"]
+
+    directory = Path(get_settings().archive_directory)
+    rows: list[dict[str, Any]] = []
+    for archived in segments:
+        if limit is not None and len(rows) >= limit:
+            # Segments are ordered by their nearest edge, so no later one can displace these rows.
+            boundary = rows[limit - 1][policy.timestamp]
+            if (archived.last_at < boundary) if descending else (archived.first_at > boundary):
+                break
+        for row in await asyncio.to_thread(_read_segment, directory / archived.path, archived.sha256):
+            timestamp = datetime.fromisoformat(row[policy.timestamp])
+            if (since is None or timestamp >= since) and (until is None or timestamp < until):
+                row[policy.timestamp] = timestamp
+                rows.append(row)
+        rows.sort(key=key, reverse=descending)
+        if limit is not None:
+            del rows[limit:]
+    return rows
+
+
+__all__ = [
+    "RetentionPolicy",
+    "archive_expired",
+    "archived_shot_totals",
+    "policies",
+    "read_archived",
+]
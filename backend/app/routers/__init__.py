@@ -1,4 +1,18 @@
 """API routers package."""
-from . import actions, auth, failures, maintenance, shot_counters, tools
+from . import actions, alerts, auth, backups, batch, failures, jobs, maintenance, profiling, reports, shot_counters, tools, traces
 
-__all__ = ["actions", "auth", "failures", "maintenance", "shot_counters", "tools"]
+__all__ = [
+    "actions",
+    "alerts",
+    "auth",
+    "backups",
+    "batch",
+    "failures",
+    "jobs",
+    "maintenance",
+    "profiling",
+    "reports",
+    "shot_counters",
+    "tools",
+    "traces",
+]
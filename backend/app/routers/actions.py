@@ -6,23 +6,37 @@ from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
-from ..crud import create_instance, get_instance, list_instances, update_instance
-from ..database import get_session
-from ..dependencies import get_current_user
+from ..crud import ListWindow, create_instance, get_instance, list_instances, update_instance
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user, list_window
+from ..projection import FieldSelection, Fields, project
 
 router = APIRouter(prefix="/actions", tags=["actions"], dependencies=[Depends(get_current_user)])
 
 
 @router.get("", response_model=list[schemas.ActionItemRead])
-async def list_action_items(session: AsyncSession = Depends(get_session)) -> list[schemas.ActionItemRead]:
-    items = await list_instances(session, models.ActionItem)
+async def list_action_items(
+    fields: Fields = Depends(FieldSelection(schemas.ActionItemRead)),
+    window: ListWindow = Depends(list_window),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[schemas.ActionItemRead]:
+    items = await list_instances(
+        session,
+        models.ActionItem,
+        fields,
+        window,
+        search_columns=(models.ActionItem.title, models.ActionItem.tool_id),
+        order_by=(models.ActionItem.due_date, models.ActionItem.id),
+    )
+    if fields:
+        return project(schemas.ActionItemRead, items, fields)
     return [schemas.ActionItemRead.from_orm(item) for item in items]
 
 
 @router.post("", response_model=schemas.ActionItemRead, status_code=status.HTTP_201_CREATED)
 async def create_action_item(
     payload: schemas.ActionItemCreate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.ActionItemRead:
     item = models.ActionItem(**payload.dict())
     item = await create_instance(session, item)
@@ -33,7 +47,7 @@ async def create_action_item(
 async def update_action_item(
     action_id: str,
     payload: schemas.ActionItemUpdate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.ActionItemRead:
     try:
         item = await get_instance(session, models.ActionItem, action_id)
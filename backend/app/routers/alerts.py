@@ -0,0 +1,37 @@
+"""Alert delivery endpoints."""
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user
+from ..jobs import enqueue
+
+router = APIRouter(prefix="/alerts", tags=["alerts"], dependencies=[Depends(get_current_user)])
+
+
+@router.get("", response_model=list[schemas.AlertDeliveryRead])
+async def list_alerts(
+    alert_status: Optional[models.AlertStatus] = Query(None, alias="status"),
+    recipient_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[schemas.AlertDeliveryRead]:
+    query = select(models.AlertDelivery).order_by(models.AlertDelivery.created_at.desc()).limit(limit)
+    if alert_status is not None:
+        query = query.where(models.AlertDelivery.status == alert_status)
+    if recipient_id is not None:
+        query = query.where(models.AlertDelivery.recipient_id == recipient_id)
+    result = await session.execute(query)
+    return [schemas.AlertDeliveryRead.from_orm(delivery) for delivery in result.scalars().all()]
+
+
+@router.post("/evaluate", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def trigger_alert_evaluation(session: AsyncSession = Depends(get_write_session)) -> schemas.JobRead:
+    job = await enqueue(session, "evaluate_alerts", unique_key="periodic:evaluate_alerts")
+    return schemas.JobRead.from_orm(job)
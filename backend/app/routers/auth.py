@@ -1,20 +1,25 @@
 """Authentication endpoints."""
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import schemas
-from ..crud import create_user, get_user_by_username
-from ..database import get_session
+from ..crud import ListWindow, create_user, get_user_by_username
+from ..database import get_write_session
+from ..dependencies import get_current_user, list_window
+from ..projection import FieldSelection, Fields, project
+from ..reference import USERS, reference_cache
 from ..security import create_access_token, verify_password
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
-async def register_user(payload: schemas.UserCreate, session: AsyncSession = Depends(get_session)) -> schemas.UserRead:
+async def register_user(payload: schemas.UserCreate, session: AsyncSession = Depends(get_write_session)) -> schemas.UserRead:
     """Register a new user."""
 
     try:
@@ -29,13 +34,27 @@ async def register_user(payload: schemas.UserCreate, session: AsyncSession = Dep
     except IntegrityError as exc:
         await session.rollback()
         raise HTTPException(status_code=400, detail="Username already exists") from exc
+    reference_cache.invalidate(USERS)
     return schemas.UserRead.from_orm(user)
 
 
+@router.get("/users", response_model=list[schemas.UserSummary], dependencies=[Depends(get_current_user)])
+async def list_users(
+    fields: Fields = Depends(FieldSelection(schemas.UserSummary)),
+    window: ListWindow = Depends(list_window),
+) -> list[schemas.UserSummary]:
+    """Return the user directory used to populate assignee and technician selectors."""
+
+    users = window.filter(await reference_cache.get(USERS), "username", "full_name")
+    if fields:
+        return project(schemas.UserSummary, users, fields)
+    return users
+
+
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     payload: schemas.LoginRequest,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.Token:
     """Authenticate user credentials and issue a JWT access token."""
 
@@ -43,9 +62,9 @@ async def login_for_access_token(
         user = await get_user_by_username(session, payload.username)
     except NoResultFound as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials") from exc
-    if not verify_password(payload.password, user.password_hash):
+    if not await asyncio.to_thread(verify_password, payload.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    access_token = create_access_token(user.username)
+    access_token = create_access_token(user.username, role=user.role.value)
     user.last_login_at = user.last_login_at or user.created_at
     await session.commit()
     return schemas.Token(access_token=access_token)
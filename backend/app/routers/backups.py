@@ -0,0 +1,41 @@
+"""Admin-only database backup endpoints."""
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas
+from ..backup import BackupError, UnknownBackupError, list_backups, verify_backup
+from ..database import get_write_session, sqlite_database_path
+from ..dependencies import require_roles
+from ..jobs import enqueue
+
+router = APIRouter(
+    prefix="/backups", tags=["backups"], dependencies=[Depends(require_roles(models.UserRole.admin))]
+)
+
+
+@router.get("", response_model=list[schemas.BackupRead])
+async def list_database_backups() -> list[schemas.BackupRead]:
+    return [schemas.BackupRead.model_validate(manifest) for manifest in await list_backups()]
+
+
+@router.post("", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def create_database_backup(
+    payload: schemas.BackupCreate, session: AsyncSession = Depends(get_write_session)
+) -> schemas.JobRead:
+    if sqlite_database_path() is None:
+        raise HTTPException(status_code=400, detail="Online backups are only available for SQLite file databases")
+    job = await enqueue(session, "backup_database", {"label": payload.label}, unique_key="periodic:backup_database")
+    return schemas.JobRead.from_orm(job)
+
+
+@router.post("/{name}/verify", response_model=schemas.BackupRead)
+async def verify_database_backup(name: str) -> schemas.BackupRead:
+    try:
+        manifest = await verify_backup(name)
+    except UnknownBackupError as exc:
+        raise HTTPException(status_code=404, detail="Backup not found") from exc
+    except BackupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return schemas.BackupRead.model_validate(manifest)
@@ -0,0 +1,209 @@
+"""Batch mutation endpoint used by the offline outbox."""
+from __future__ import annotations
+
+import inspect
+import json
+from dataclasses import dataclass
+from typing import Any, Optional, get_type_hints
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.routing import Match
+
+from .. import idempotency, models, schemas
+from ..config import get_settings
+from ..coordination import deferred_invalidations
+from ..database import get_engine, pin_reads_to_primary
+from ..dependencies import get_current_user
+from . import actions, failures, maintenance, shot_counters, tools
+
+router = APIRouter(tags=["batch"], dependencies=[Depends(get_current_user)])
+
+_BATCHABLE_ROUTERS = (tools.router, shot_counters.router, maintenance.router, failures.router, actions.router)
+
+
+@dataclass(frozen=True)
+class _Handler:
+    route: APIRoute
+    body: Optional[tuple[str, type[BaseModel]]]
+    session: Optional[str]
+    user: Optional[str]
+
+    async def __call__(
+        self, path_params: dict[str, Any], body: Optional[dict[str, Any]], session: AsyncSession, user: models.User
+    ) -> Any:
+        arguments = dict(path_params)
+        if self.body is not None:
+            name, schema = self.body
+            arguments[name] = schema.model_validate(body or {})
+        if self.session is not None:
+            arguments[self.session] = session
+        if self.user is not None:
+            arguments[self.user] = user
+        return await self.route.endpoint(**arguments)
+
+
+def _plan(route: APIRoute) -> Optional[_Handler]:
+    """Describe how to call a mutation endpoint directly, or ``None`` if it needs more than we provide."""
+
+    hints = get_type_hints(route.endpoint)
+    body = session = user = None
+    for name in inspect.signature(route.endpoint).parameters:
+        hint = hints.get(name)
+        if name in route.param_convertors:
+            continue
+        if inspect.isclass(hint) and issubclass(hint, BaseModel):
+            body = (name, hint)
+        elif hint is AsyncSession:
+            session = name
+        elif hint is models.User:
+            user = name
+        else:
+            return None
+    return _Handler(route, body, session, user)
+
+
+_HANDLERS: Optional[list[_Handler]] = None
+
+
+def _handlers() -> list[_Handler]:
+    global _HANDLERS
+    if _HANDLERS is None:
+        _HANDLERS = [
+            handler
+            for batch_router in _BATCHABLE_ROUTERS
+            for route in batch_router.routes
+            if isinstance(route, APIRoute)
+            and route.methods & {"POST", "PATCH", "DELETE"}
+            and (handler := _plan(route)) is not None
+        ]
+    return _HANDLERS
+
+
+def _resolve(method: str, path: str) -> Optional[tuple[_Handler, dict[str, Any]]]:
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    for handler in _handlers():
+        match, child_scope = handler.route.matches(scope)
+        if match == Match.FULL:
+            return handler, child_scope["path_params"]
+    return None
+
+
+def _error(operation_id: str, status: int, detail: Any) -> schemas.BatchOperationResult:
+    return schemas.BatchOperationResult(id=operation_id, status=status, body={"detail": jsonable_encoder(detail)})
+
+
+async def _apply(
+    operation: schemas.BatchOperation, connection: Any, user: models.User
+) -> tuple[schemas.BatchOperationResult, bool]:
+    """Run one operation inside its own savepoint; return its result and whether it succeeded."""
+
+    resolved = _resolve(operation.method, operation.path)
+    if resolved is None:
+        return _error(operation.id, 404, f"No batchable route for {operation.method} {operation.path}"), False
+    handler, path_params = resolved
+
+    # Commits inside the endpoint only release this savepoint; the batch commits once at the end.
+    session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    try:
+        result = await handler(path_params, operation.body, session, user)
+    except ValidationError as exc:
+        await session.rollback()
+        return _error(operation.id, 422, exc.errors(include_url=False, include_context=False)), False
+    except HTTPException as exc:
+        await session.rollback()
+        return _error(operation.id, exc.status_code, exc.detail), False
+    except IntegrityError as exc:
+        await session.rollback()
+        return _error(operation.id, 409, str(exc.orig)), False
+    finally:
+        await session.close()
+    status = handler.route.status_code or 200
+    return schemas.BatchOperationResult(id=operation.id, status=status, body=jsonable_encoder(result)), True
+
+
+async def _apply_once(
+    operation: schemas.BatchOperation, connection: Any, user: models.User
+) -> tuple[schemas.BatchOperationResult, bool]:
+    """Apply an operation unless an earlier batch already committed it, replaying that result.
+
+    The operation id is the idempotency key. Its record is written in the batch transaction,
+    so it exists exactly when the operation's changes were committed.
+    """
+
+    if not get_settings().idempotency_enabled:
+        return await _apply(operation, connection, user)
+    key = idempotency.digest(user.id, "batch", operation.id)
+    request_hash = idempotency.digest(operation.method, operation.path, json.dumps(operation.body, sort_keys=True))
+    stored = await idempotency.load(connection, key)
+    if stored is not None:
+        if stored.request_hash != request_hash:
+            return _error(operation.id, 422, "Operation id was already used for a different operation"), False
+        body = json.loads(stored.body) if stored.body else None
+        return schemas.BatchOperationResult(id=operation.id, status=stored.status, body=body, replayed=True), True
+    result, succeeded = await _apply(operation, connection, user)
+    if succeeded:
+        await idempotency.save(connection, key, request_hash, result.status, json.dumps(result.body).encode("utf-8"))
+    return result, succeeded
+
+
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def apply_batch(
+    payload: schemas.BatchRequest,
+    response: Response,
+    current_user: models.User = Depends(get_current_user),
+) -> schemas.BatchResponse:
+    """Apply queued create, update and delete operations in order in one transaction.
+
+    Each operation runs in a savepoint and reports its own status. Failed operations are
+    rolled back individually unless ``atomic`` is set, in which case the first failure
+    rolls back the whole batch and the remaining operations are not attempted. Operations
+    whose id already succeeded in an earlier batch are not run again; their stored result
+    is returned with ``replayed`` set.
+    """
+
+    if len(payload.operations) > get_settings().batch_max_operations:
+        raise HTTPException(status_code=413, detail="Too many operations in one batch")
+    if len({operation.id for operation in payload.operations}) != len(payload.operations):
+        raise HTTPException(status_code=400, detail="Operation ids must be unique")
+
+    pin_reads_to_primary(response)
+    results: list[schemas.BatchOperationResult] = []
+    failed: Optional[str] = None
+    # Endpoint commits only release savepoints, so cache invalidations wait for the batch commit.
+    with deferred_invalidations() as invalidations:
+        async with get_engine().connect() as connection:
+            await connection.begin()
+            if connection.dialect.name == "sqlite":
+                # The SQLite driver defers BEGIN until the first write; without an explicit
+                # transaction releasing each operation's savepoint would commit it.
+                await connection.exec_driver_sql("BEGIN IMMEDIATE")
+            for operation in payload.operations:
+                result, succeeded = await _apply_once(operation, connection, current_user)
+                results.append(result)
+                if not succeeded and payload.atomic:
+                    failed = operation.id
+                    break
+            if failed is None:
+                await connection.commit()
+            else:
+                await connection.rollback()
+                invalidations.clear()
+    for invalidate in invalidations:
+        invalidate()
+
+    if failed is not None:
+        attempted = {result.id for result in results}
+        results = [
+            result if result.id == failed else _error(result.id, 424, f"Rolled back because {failed} failed")
+            for result in results
+        ] + [
+            _error(operation.id, 424, f"Not attempted because {failed} failed")
+            for operation in payload.operations
+            if operation.id not in attempted
+        ]
+    return schemas.BatchResponse(committed=failed is None, results=results)
@@ -6,26 +6,34 @@ from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
-from ..crud import create_instance, get_instance, list_instances, update_instance
-from ..database import get_session
-from ..dependencies import get_current_user
+from ..crud import ListWindow, create_instance, get_instance, list_instances, update_instance
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user, list_window
+from ..projection import FieldSelection, Fields, project
+from ..reference import FAILURE_CODES, reference_cache
 
 router = APIRouter(prefix="/failures", tags=["failures"], dependencies=[Depends(get_current_user)])
 
 
 @router.get("/codes", response_model=list[schemas.FailureCodeRead])
-async def list_failure_codes(session: AsyncSession = Depends(get_session)) -> list[schemas.FailureCodeRead]:
-    codes = await list_instances(session, models.FailureCode)
-    return [schemas.FailureCodeRead.from_orm(code) for code in codes]
+async def list_failure_codes(
+    fields: Fields = Depends(FieldSelection(schemas.FailureCodeRead)),
+    window: ListWindow = Depends(list_window),
+) -> list[schemas.FailureCodeRead]:
+    codes = window.filter(await reference_cache.get(FAILURE_CODES), "code", "name")
+    if fields:
+        return project(schemas.FailureCodeRead, codes, fields)
+    return codes
 
 
 @router.post("/codes", response_model=schemas.FailureCodeRead, status_code=status.HTTP_201_CREATED)
 async def create_failure_code(
     payload: schemas.FailureCodeCreate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.FailureCodeRead:
     code = models.FailureCode(**payload.dict())
     code = await create_instance(session, code)
+    reference_cache.invalidate(FAILURE_CODES)
     return schemas.FailureCodeRead.from_orm(code)
 
 
@@ -33,26 +41,40 @@ async def create_failure_code(
 async def update_failure_code(
     code_id: str,
     payload: schemas.FailureCodeUpdate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.FailureCodeRead:
     try:
         code = await get_instance(session, models.FailureCode, code_id)
     except NoResultFound as exc:
         raise HTTPException(status_code=404, detail="Failure code not found") from exc
     code = await update_instance(session, code, payload.dict(exclude_unset=True))
+    reference_cache.invalidate(FAILURE_CODES)
     return schemas.FailureCodeRead.from_orm(code)
 
 
 @router.get("/reports", response_model=list[schemas.FailureReportRead])
-async def list_failure_reports(session: AsyncSession = Depends(get_session)) -> list[schemas.FailureReportRead]:
-    reports = await list_instances(session, models.FailureReport)
+async def list_failure_reports(
+    fields: Fields = Depends(FieldSelection(schemas.FailureReportRead)),
+    window: ListWindow = Depends(list_window),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[schemas.FailureReportRead]:
+    reports = await list_instances(
+        session,
+        models.FailureReport,
+        fields,
+        window,
+        search_columns=(models.FailureReport.tool_id, models.FailureReport.description),
+        order_by=(models.FailureReport.occurred_at, models.FailureReport.id),
+    )
+    if fields:
+        return project(schemas.FailureReportRead, reports, fields)
     return [schemas.FailureReportRead.from_orm(report) for report in reports]
 
 
 @router.post("/reports", response_model=schemas.FailureReportRead, status_code=status.HTTP_201_CREATED)
 async def create_failure_report(
     payload: schemas.FailureReportCreate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.FailureReportRead:
     report = models.FailureReport(**payload.dict())
     report = await create_instance(session, report)
@@ -60,7 +82,7 @@ async def create_failure_report(
 
 
 @router.get("/reports/{report_id}", response_model=schemas.FailureReportRead)
-async def get_failure_report(report_id: str, session: AsyncSession = Depends(get_session)) -> schemas.FailureReportRead:
+async def get_failure_report(report_id: str, session: AsyncSession = Depends(get_read_session)) -> schemas.FailureReportRead:
     try:
         report = await get_instance(session, models.FailureReport, report_id)
     except NoResultFound as exc:
@@ -72,7 +94,7 @@ async def get_failure_report(report_id: str, session: AsyncSession = Depends(get
 async def update_failure_report(
     report_id: str,
     payload: schemas.FailureReportUpdate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.FailureReportRead:
     try:
         report = await get_instance(session, models.FailureReport, report_id)
@@ -0,0 +1,107 @@
+"""Background job endpoints."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas
+from ..crud import get_instance
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user
+from ..jobs import UnknownTaskError, can_enqueue, enqueue, registered_tasks
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(get_current_user)])
+
+
+async def _get_job(session: AsyncSession, job_id: str) -> models.Job:
+    try:
+        return await get_instance(session, models.Job, job_id)
+    except NoResultFound as exc:
+        raise HTTPException(status_code=404, detail="Job not found") from exc
+
+
+@router.get("/tasks", response_model=list[str])
+async def list_tasks(current_user: models.User = Depends(get_current_user)) -> list[str]:
+    """Tasks the current user may enqueue."""
+
+    return [name for name in registered_tasks() if can_enqueue(name, current_user.role)]
+
+
+@router.get("", response_model=list[schemas.JobRead])
+async def list_jobs(
+    job_status: Optional[models.JobStatus] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[schemas.JobRead]:
+    query = select(models.Job).order_by(models.Job.created_at.desc()).limit(limit)
+    if job_status is not None:
+        query = query.where(models.Job.status == job_status)
+    result = await session.execute(query)
+    return [schemas.JobRead.from_orm(job) for job in result.scalars().all()]
+
+
+@router.post("", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    payload: schemas.JobCreate,
+    session: AsyncSession = Depends(get_write_session),
+    current_user: models.User = Depends(get_current_user),
+) -> schemas.JobRead:
+    try:
+        allowed = can_enqueue(payload.task, current_user.role)
+    except UnknownTaskError as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown task: {payload.task}") from exc
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Not allowed to run {payload.task} jobs")
+    try:
+        job = await enqueue(
+            session,
+            payload.task,
+            payload.payload,
+            priority=payload.priority,
+            run_at=payload.run_at,
+            created_by=current_user.id,
+        )
+    except UnknownTaskError as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown task: {payload.task}") from exc
+    return schemas.JobRead.from_orm(job)
+
+
+@router.get("/{job_id}", response_model=schemas.JobRead)
+async def get_job(job_id: str, session: AsyncSession = Depends(get_read_session)) -> schemas.JobRead:
+    job = await _get_job(session, job_id)
+    return schemas.JobRead.from_orm(job)
+
+
+@router.post("/{job_id}/cancel", response_model=schemas.JobRead)
+async def cancel_job(
+    job_id: str,
+    session: AsyncSession = Depends(get_write_session),
+    current_user: models.User = Depends(get_current_user),
+) -> schemas.JobRead:
+    job = await _get_job(session, job_id)
+    # Scheduled and router-started jobs have no creator, so only admins can cancel them.
+    if current_user.role != models.UserRole.admin and job.created_by != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    if job.status != models.JobStatus.queued:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value} and cannot be cancelled")
+    job.status = models.JobStatus.cancelled
+    await session.commit()
+    await session.refresh(job)
+    return schemas.JobRead.from_orm(job)
+
+
+@router.get("/{job_id}/artifact")
+async def download_job_artifact(job_id: str, session: AsyncSession = Depends(get_read_session)) -> FileResponse:
+    job = await _get_job(session, job_id)
+    result = json.loads(job.result) if job.result else {}
+    artifact = result.get("path")
+    if job.status != models.JobStatus.succeeded or not artifact or not Path(artifact).is_file():
+        raise HTTPException(status_code=404, detail="Job has no artifact")
+    return FileResponse(artifact, filename=Path(artifact).name)
@@ -6,23 +6,37 @@ from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
-from ..crud import create_instance, get_instance, list_instances, update_instance
-from ..database import get_session
-from ..dependencies import get_current_user
+from ..crud import ListWindow, create_instance, get_instance, list_instances, update_instance
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user, list_window
+from ..projection import FieldSelection, Fields, project
 
 router = APIRouter(prefix="/maintenance", tags=["maintenance"], dependencies=[Depends(get_current_user)])
 
 
 @router.get("", response_model=list[schemas.MaintenanceLogRead])
-async def list_maintenance_logs(session: AsyncSession = Depends(get_session)) -> list[schemas.MaintenanceLogRead]:
-    logs = await list_instances(session, models.MaintenanceLog)
+async def list_maintenance_logs(
+    fields: Fields = Depends(FieldSelection(schemas.MaintenanceLogRead)),
+    window: ListWindow = Depends(list_window),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[schemas.MaintenanceLogRead]:
+    logs = await list_instances(
+        session,
+        models.MaintenanceLog,
+        fields,
+        window,
+        search_columns=(models.MaintenanceLog.tool_id, models.MaintenanceLog.observations),
+        order_by=(models.MaintenanceLog.performed_at, models.MaintenanceLog.id),
+    )
+    if fields:
+        return project(schemas.MaintenanceLogRead, logs, fields)
     return [schemas.MaintenanceLogRead.from_orm(log) for log in logs]
 
 
 @router.post("", response_model=schemas.MaintenanceLogRead, status_code=status.HTTP_201_CREATED)
 async def create_maintenance_log(
     payload: schemas.MaintenanceLogCreate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.MaintenanceLogRead:
     log = models.MaintenanceLog(**payload.dict())
     log = await create_instance(session, log)
@@ -30,7 +44,7 @@ async def create_maintenance_log(
 
 
 @router.get("/{log_id}", response_model=schemas.MaintenanceLogRead)
-async def get_maintenance_log(log_id: str, session: AsyncSession = Depends(get_session)) -> schemas.MaintenanceLogRead:
+async def get_maintenance_log(log_id: str, session: AsyncSession = Depends(get_read_session)) -> schemas.MaintenanceLogRead:
     try:
         log = await get_instance(session, models.MaintenanceLog, log_id)
     except NoResultFound as exc:
@@ -42,7 +56,7 @@ async def get_maintenance_log(log_id: str, session: AsyncSession = Depends(get_s
 async def update_maintenance_log(
     log_id: str,
     payload: schemas.MaintenanceLogUpdate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.MaintenanceLogRead:
     try:
         log = await get_instance(session, models.MaintenanceLog, log_id)
@@ -0,0 +1,82 @@
+"""Admin-only profiling endpoints: event loop sampling and slow-request profiles.
+
+Profiles are collected per worker process, so with several workers each response only
+covers the worker that served it.
+"""
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from .. import models, schemas
+from ..config import get_settings
+from ..dependencies import require_roles
+from ..profiling import ProfilerBusyError, SlowRequest, collapsed, get_slow_request, profile_event_loop, slow_requests
+
+router = APIRouter(
+    prefix="/profiling", tags=["profiling"], dependencies=[Depends(require_roles(models.UserRole.admin))]
+)
+
+
+def _summary(profile: SlowRequest) -> dict:
+    return {
+        "id": profile.id,
+        "method": profile.method,
+        "path": profile.path,
+        "route": profile.route,
+        "status": profile.status,
+        "started_at": profile.started_at,
+        "duration_ms": profile.duration_ms,
+        "samples": sum(profile.stacks.values()),
+        "statement_count": len(profile.statements),
+    }
+
+
+def _slow_request(profile_id: int) -> SlowRequest:
+    profile = get_slow_request(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Slow request profile not found")
+    return profile
+
+
+@router.post("/event-loop", response_class=PlainTextResponse)
+async def sample_event_loop(
+    seconds: float = Query(5.0, gt=0, description="How long to sample the event loop thread."),
+) -> PlainTextResponse:
+    """Sample the event loop thread and return collapsed stacks for a flame graph."""
+
+    limit = get_settings().profiling_max_seconds
+    if seconds > limit:
+        raise HTTPException(status_code=422, detail=f"seconds must not exceed {limit:g}")
+    try:
+        stacks = await profile_event_loop(seconds)
+    except ProfilerBusyError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return PlainTextResponse(collapsed(stacks))
+
+
+@router.get("/slow-requests", response_model=list[schemas.SlowRequestRead])
+async def list_slow_requests() -> list[schemas.SlowRequestRead]:
+    return [schemas.SlowRequestRead.model_validate(_summary(profile)) for profile in slow_requests()]
+
+
+@router.get("/slow-requests/{profile_id}", response_model=schemas.SlowRequestDetail)
+async def get_slow_request_profile(profile_id: int) -> schemas.SlowRequestDetail:
+    profile = _slow_request(profile_id)
+    return schemas.SlowRequestDetail.model_validate(
+        {
+            **_summary(profile),
+            "statements": [
+                {"statement": statement, "duration_ms": round(seconds * 1000, 3)}
+                for statement, seconds in profile.statements
+            ],
+            "stacks": [{"stack": stack, "samples": count} for stack, count in profile.stacks.most_common()],
+        }
+    )
+
+
+@router.get("/slow-requests/{profile_id}/stacks", response_class=PlainTextResponse)
+async def get_slow_request_stacks(profile_id: int) -> PlainTextResponse:
+    """Collapsed stacks of one slow request for a flame graph."""
+
+    return PlainTextResponse(collapsed(_slow_request(profile_id).stacks))
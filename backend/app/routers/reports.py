@@ -0,0 +1,88 @@
+"""Management report listing, downloads and refresh requests."""
+from __future__ import annotations
+
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user, require_roles
+from ..jobs import enqueue
+from ..reports import REPORTS, Report, artifact_path, partition_path, pending_periods, period_start, read_manifest
+
+router = APIRouter(prefix="/reports", tags=["reports"], dependencies=[Depends(get_current_user)])
+
+_MEDIA_TYPES = {"csv": "text/csv", "json": "application/json"}
+
+
+def _report(name: str) -> Report:
+    report = REPORTS.get(name)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report
+
+
+@router.get("", response_model=list[schemas.ReportRead])
+async def list_reports(session: AsyncSession = Depends(get_read_session)) -> list[schemas.ReportRead]:
+    pending = await pending_periods(session)
+    reports = []
+    for report in REPORTS.values():
+        manifest = read_manifest(report) or {}
+        reports.append(
+            schemas.ReportRead(
+                name=report.name,
+                title=report.title,
+                columns=report.columns,
+                built_at=manifest.get("built_at"),
+                full_built_at=manifest.get("full_built_at"),
+                periods=sorted(manifest.get("periods", {})),
+                rows=manifest.get("rows", 0),
+                pending_periods=pending.get(report.name, 0),
+            )
+        )
+    return reports
+
+
+@router.post(
+    "/refresh",
+    response_model=schemas.JobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(require_roles(models.UserRole.manager, models.UserRole.admin))],
+)
+async def refresh(payload: schemas.ReportRefresh, session: AsyncSession = Depends(get_write_session)) -> schemas.JobRead:
+    """Rebuild queued periods now; ``full`` rebuilds every period."""
+
+    for name in payload.reports or ():
+        _report(name)
+    unique_key = None
+    if not payload.reports:
+        # A refresh of every report joins the scheduled one if it is already queued.
+        unique_key = "refresh_reports:full" if payload.full else "periodic:refresh_reports"
+    job = await enqueue(session, "refresh_reports", payload.dict(), unique_key=unique_key)
+    return schemas.JobRead.from_orm(job)
+
+
+@router.get("/{name}/download")
+async def download_report(name: str, format: Literal["csv", "json"] = Query("csv")) -> FileResponse:
+    """The last materialised artifact; never computed on request."""
+
+    report = _report(name)
+    path = artifact_path(report, format)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Report has not been built yet")
+    return FileResponse(path, media_type=_MEDIA_TYPES[format], filename=path.name)
+
+
+@router.get("/{name}/periods/{start}")
+async def download_report_period(name: str, start: date) -> FileResponse:
+    """Rows of the week containing ``start`` as JSON."""
+
+    report = _report(name)
+    path = partition_path(report, period_start(start))
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="No rows for this period")
+    return FileResponse(path, media_type="application/json", filename=f"{report.name}-{path.name}")
@@ -1,32 +1,91 @@
 """Shot counter endpoints."""
 from __future__ import annotations
 
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import func, select
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
-from ..crud import get_instance
-from ..database import get_session
-from ..dependencies import get_current_user
+from ..config import get_settings
+from ..crud import ListWindow, get_instance
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user, list_window
+from ..projection import FieldSelection, Fields, load_columns, project
+from ..retention import archived_shot_totals, read_archived
 
 router = APIRouter(prefix="/shot-counters", tags=["shot counters"], dependencies=[Depends(get_current_user)])
 
 
 @router.get("", response_model=list[schemas.ToolShotCounterRead])
-async def list_shot_counters(session: AsyncSession = Depends(get_session)) -> list[schemas.ToolShotCounterRead]:
-    result = await session.execute(
-        select(models.ToolShotCounter).order_by(models.ToolShotCounter.recorded_at, models.ToolShotCounter.id),
-    )
-    counters = result.scalars().all()
+async def list_shot_counters(
+    tool_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Fields = Depends(FieldSelection(schemas.ToolShotCounterRead)),
+    window: ListWindow = Depends(list_window),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[schemas.ToolShotCounterRead]:
+    statement = select(models.ToolShotCounter)
+    if fields:
+        # recorded_at orders rows merged from the archive.
+        statement = statement.options(load_columns(models.ToolShotCounter, (*fields, "recorded_at")))
+    if tool_id is not None:
+        statement = statement.where(models.ToolShotCounter.tool_id == tool_id)
+    if since is not None:
+        statement = statement.where(models.ToolShotCounter.recorded_at >= since)
+    if until is not None:
+        statement = statement.where(models.ToolShotCounter.recorded_at < until)
+    ordering = (models.ToolShotCounter.recorded_at, models.ToolShotCounter.id)
+    search = (models.ToolShotCounter.tool_id,)
+    cutoff = datetime.utcnow() - timedelta(days=get_settings().retention_shot_counter_days)
+    if since is not None and since >= cutoff:
+        # Retention only archives rows older than the cutoff, so the range is entirely live.
+        result = await session.execute(window.apply(statement, search, ordering))
+        counters: list[Any] = list(result.scalars().all())
+    else:
+        # The range reaches archived segments: take the first offset + limit rows of each
+        # source, merge them and page the merged rows.
+        wanted = None if window.limit is None else window.offset + window.limit
+        result = await session.execute(replace(window, offset=0, limit=wanted).apply(statement, search, ordering))
+        counters = list(result.scalars().all())
+        archive_since, archive_until = since, until
+        if wanted is not None and len(counters) == wanted:
+            # Archived rows beyond the last live row on the page cannot be shown.
+            edge = counters[-1].recorded_at
+            if window.descending:
+                archive_since = edge if since is None else max(since, edge)
+            else:
+                edge += timedelta(microseconds=1)
+                archive_until = edge if until is None else min(until, edge)
+        archived = await read_archived(
+            session,
+            "shot_counters",
+            tool_id=tool_id or window.q,
+            since=archive_since,
+            until=archive_until,
+            limit=wanted,
+            descending=window.descending,
+        )
+        if archived:
+            counters.extend(
+                schemas.ToolShotCounterRead(**row) for row in archived if not window.q or row["tool_id"] == window.q
+            )
+            counters.sort(key=lambda counter: (counter.recorded_at, counter.id), reverse=window.descending)
+        counters = counters[window.offset : wanted]
+    if fields:
+        return project(schemas.ToolShotCounterRead, counters, fields)
     return [schemas.ToolShotCounterRead.from_orm(counter) for counter in counters]
 
 
 @router.post("", response_model=schemas.ToolShotCounterRead, status_code=status.HTTP_201_CREATED)
 async def create_shot_counter(
     payload: schemas.ToolShotCounterCreate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.ToolShotCounterRead:
     try:
         tool = await get_instance(session, models.Tool, payload.tool_id)
@@ -44,7 +103,7 @@ async def create_shot_counter(
 
 
 @router.get("/{counter_id}", response_model=schemas.ToolShotCounterRead)
-async def get_shot_counter(counter_id: str, session: AsyncSession = Depends(get_session)) -> schemas.ToolShotCounterRead:
+async def get_shot_counter(counter_id: str, session: AsyncSession = Depends(get_read_session)) -> schemas.ToolShotCounterRead:
     try:
         counter = await get_instance(session, models.ToolShotCounter, counter_id)
     except NoResultFound as exc:
@@ -56,7 +115,7 @@ async def get_shot_counter(counter_id: str, session: AsyncSession = Depends(get_
 async def update_shot_counter(
     counter_id: str,
     payload: schemas.ToolShotCounterUpdate,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
 ) -> schemas.ToolShotCounterRead:
     try:
         counter = await get_instance(session, models.ToolShotCounter, counter_id)
@@ -75,7 +134,8 @@ async def update_shot_counter(
                 models.ToolShotCounter.tool_id == counter.tool_id
             )
         )
-        total_shots = result.scalar_one()
+        archived = await archived_shot_totals(session, counter.tool_id)
+        total_shots = result.scalar_one() + archived.get(counter.tool_id, 0)
         tool = await get_instance(session, models.Tool, counter.tool_id)
         tool.current_shot_count = max(tool.initial_shot_count, tool.initial_shot_count + total_shots)
 
@@ -1,35 +1,106 @@
 """Tool management endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from .. import models, schemas
-from ..crud import create_instance, delete_instance, get_instance, list_instances, update_instance
-from ..database import get_session
-from ..dependencies import get_current_user
+from ..config import get_settings
+from ..crud import ListWindow, create_instance, delete_instance, get_instance, list_instances, update_instance
+from ..database import get_read_session, get_write_session
+from ..dependencies import get_current_user, list_window
+from ..fleet import FleetFilter, FleetSort, fleet_snapshot
+from ..projection import FieldSelection, Fields, project
+from ..reference import TOOL_CATALOGUE, reference_cache
 
 router = APIRouter(prefix="/tools", tags=["tools"], dependencies=[Depends(get_current_user)])
 
+_OPEN_ACTION_STATUSES = (models.ActionStatus.open, models.ActionStatus.in_progress)
+
 
 @router.get("", response_model=list[schemas.ToolRead])
-async def list_tools(session: AsyncSession = Depends(get_session)) -> list[schemas.ToolRead]:
-    tools = await list_instances(session, models.Tool)
+async def list_tools(
+    fields: Fields = Depends(FieldSelection(schemas.ToolRead)),
+    window: ListWindow = Depends(list_window),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[schemas.ToolRead]:
+    tools = await list_instances(
+        session,
+        models.Tool,
+        fields,
+        window,
+        search_columns=(models.Tool.asset_number, models.Tool.name, models.Tool.location),
+        order_by=(models.Tool.asset_number,),
+    )
+    if fields:
+        return project(schemas.ToolRead, tools, fields)
     return [schemas.ToolRead.from_orm(tool) for tool in tools]
 
 
 @router.post("", response_model=schemas.ToolRead, status_code=status.HTTP_201_CREATED)
-async def create_tool(payload: schemas.ToolCreate, session: AsyncSession = Depends(get_session)) -> schemas.ToolRead:
+async def create_tool(payload: schemas.ToolCreate, session: AsyncSession = Depends(get_write_session)) -> schemas.ToolRead:
     data = payload.dict()
     tool = models.Tool(**data)
     tool.current_shot_count = tool.initial_shot_count
     tool = await create_instance(session, tool)
+    reference_cache.invalidate(TOOL_CATALOGUE)
     return schemas.ToolRead.from_orm(tool)
 
 
+@router.get("/catalogue", response_model=list[schemas.ToolSummary])
+async def list_tool_catalogue(window: ListWindow = Depends(list_window)) -> list[schemas.ToolSummary]:
+    catalogue = await reference_cache.get(TOOL_CATALOGUE)
+    return window.filter(catalogue, "asset_number", "name", "location")
+
+
+@router.get("/fleet", response_model=schemas.FleetQueryResult)
+async def query_fleet(
+    tool_status: list[models.ToolStatus] = Query([], alias="status"),
+    location: Optional[str] = Query(None, description="Exact location, case-insensitive."),
+    min_usage: Optional[float] = Query(None, ge=0, description="Minimum fraction of max_shot_count used."),
+    max_usage: Optional[float] = Query(None, ge=0, description="Maximum fraction of max_shot_count used."),
+    maintained_before: Optional[datetime] = Query(None, description="Last maintained before this time, or never."),
+    end_of_life_before: Optional[datetime] = Query(None, description="Projected to reach max_shot_count before this time."),
+    sort: FleetSort = Query("asset_number"),
+    descending: bool = Query(False),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+) -> schemas.FleetQueryResult:
+    """Filter and rank the whole fleet from the in-memory snapshot.
+
+    ``usage`` is the fraction of ``max_shot_count`` already used; ``projected_end_of_life``
+    extrapolates the recent shots-per-day rate and is null for tools without a limit or
+    without recent shots. Tools without a value sort last.
+    """
+
+    if not get_settings().fleet_snapshot_enabled:
+        raise HTTPException(status_code=404, detail="Fleet snapshot is disabled")
+    await fleet_snapshot.sync()
+    criteria = FleetFilter(
+        statuses=tool_status,
+        location=location,
+        min_usage=min_usage,
+        max_usage=max_usage,
+        maintained_before=maintained_before,
+        end_of_life_before=end_of_life_before,
+    )
+    result = fleet_snapshot.query(criteria, sort=sort, descending=descending, limit=limit, offset=offset)
+    return schemas.FleetQueryResult(
+        total=result.total,
+        snapshot_age_seconds=result.snapshot_age_seconds,
+        query_microseconds=result.query_microseconds,
+        tools=[schemas.FleetTool.model_validate(row) for row in result.rows],
+    )
+
+
 @router.get("/{tool_id}", response_model=schemas.ToolRead)
-async def get_tool(tool_id: str, session: AsyncSession = Depends(get_session)) -> schemas.ToolRead:
+async def get_tool(tool_id: str, session: AsyncSession = Depends(get_read_session)) -> schemas.ToolRead:
     try:
         tool = await get_instance(session, models.Tool, tool_id)
     except NoResultFound as exc:
@@ -37,20 +108,98 @@ async def get_tool(tool_id: str, session: AsyncSession = Depends(get_session)) -
     return schemas.ToolRead.from_orm(tool)
 
 
+@router.get("/{tool_id}/detail", response_model=schemas.ToolDetail)
+async def get_tool_detail(
+    tool_id: str,
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+) -> schemas.ToolDetail:
+    """Return a tool with its recent history in a fixed number of queries.
+
+    ``limit``/``offset`` page the shot counters, maintenance logs and failure reports
+    (newest first); open action items are returned in full. ``totals`` gives the size of
+    each section for paging.
+    """
+
+    result = await session.execute(
+        select(models.Tool)
+        .where(models.Tool.id == tool_id)
+        .options(
+            selectinload(models.Tool.photos),
+            selectinload(models.Tool.action_items.and_(models.ActionItem.status.in_(_OPEN_ACTION_STATUSES))).joinedload(
+                models.ActionItem.assignee
+            ),
+        )
+    )
+    tool = result.scalars().first()
+    if tool is None:
+        raise HTTPException(status_code=404, detail="Tool not found")
+
+    counters = await session.execute(
+        select(models.ToolShotCounter)
+        .where(models.ToolShotCounter.tool_id == tool_id)
+        .order_by(models.ToolShotCounter.recorded_at.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    logs = await session.execute(
+        select(models.MaintenanceLog)
+        .where(models.MaintenanceLog.tool_id == tool_id)
+        .options(joinedload(models.MaintenanceLog.performed_by_user))
+        .order_by(models.MaintenanceLog.performed_at.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    reports = await session.execute(
+        select(models.FailureReport)
+        .where(models.FailureReport.tool_id == tool_id)
+        .options(joinedload(models.FailureReport.failure_code), selectinload(models.FailureReport.photos))
+        .order_by(models.FailureReport.occurred_at.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    totals = await session.execute(
+        select(
+            select(func.count()).where(models.ToolShotCounter.tool_id == tool_id).scalar_subquery(),
+            select(func.count()).where(models.MaintenanceLog.tool_id == tool_id).scalar_subquery(),
+            select(func.count()).where(models.FailureReport.tool_id == tool_id).scalar_subquery(),
+        )
+    )
+    counter_total, log_total, report_total = totals.one()
+
+    return schemas.ToolDetail(
+        **schemas.ToolRead.from_orm(tool).model_dump(),
+        photos=[schemas.ToolPhotoRead.from_orm(photo) for photo in tool.photos],
+        shot_counters=[schemas.ToolShotCounterRead.from_orm(counter) for counter in counters.scalars()],
+        maintenance_logs=[schemas.MaintenanceLogDetail.from_orm(log) for log in logs.scalars()],
+        failure_reports=[schemas.FailureReportDetail.from_orm(report) for report in reports.scalars()],
+        open_action_items=[schemas.ActionItemDetail.from_orm(item) for item in tool.action_items],
+        totals=schemas.ToolDetailTotals(
+            shot_counters=counter_total,
+            maintenance_logs=log_total,
+            failure_reports=report_total,
+            open_action_items=len(tool.action_items),
+        ),
+    )
+
+
 @router.patch("/{tool_id}", response_model=schemas.ToolRead)
-async def update_tool(tool_id: str, payload: schemas.ToolUpdate, session: AsyncSession = Depends(get_session)) -> schemas.ToolRead:
+async def update_tool(tool_id: str, payload: schemas.ToolUpdate, session: AsyncSession = Depends(get_write_session)) -> schemas.ToolRead:
     try:
         tool = await get_instance(session, models.Tool, tool_id)
     except NoResultFound as exc:
         raise HTTPException(status_code=404, detail="Tool not found") from exc
     tool = await update_instance(session, tool, payload.dict(exclude_unset=True))
+    reference_cache.invalidate(TOOL_CATALOGUE)
     return schemas.ToolRead.from_orm(tool)
 
 
 @router.delete("/{tool_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_tool(tool_id: str, session: AsyncSession = Depends(get_session)) -> None:
+async def delete_tool(tool_id: str, session: AsyncSession = Depends(get_write_session)) -> None:
     try:
         tool = await get_instance(session, models.Tool, tool_id)
     except NoResultFound as exc:
         raise HTTPException(status_code=404, detail="Tool not found") from exc
     await delete_instance(session, tool)
+    reference_cache.invalidate(TOOL_CATALOGUE)
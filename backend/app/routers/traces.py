@@ -0,0 +1,46 @@
+"""Admin-only access to recently recorded traces."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from .. import models, schemas
+from ..dependencies import require_roles
+from ..tracing import Span, get_trace, otlp_json, recent_traces
+
+router = APIRouter(prefix="/traces", tags=["traces"], dependencies=[Depends(require_roles(models.UserRole.admin))])
+
+
+def _summary(spans: list[Span]) -> schemas.TraceSummary:
+    span_ids = {span.span_id for span in spans}
+    roots = [span for span in spans if span.parent_span_id not in span_ids] or spans
+    root = min(roots, key=lambda span: span.start_ns)
+    end_ns = max(span.end_ns or span.start_ns for span in spans)
+    return schemas.TraceSummary(
+        trace_id=root.trace_id,
+        name=root.name,
+        started_at=datetime.utcfromtimestamp(root.start_ns / 1e9),
+        duration_ms=round((end_ns - root.start_ns) / 1_000_000, 3),
+        span_count=len(spans),
+        error=any(span.error for span in spans),
+    )
+
+
+@router.get("", response_model=list[schemas.TraceSummary])
+async def list_traces(
+    limit: int = Query(50, ge=1, le=1000), errors_only: bool = Query(False)
+) -> list[schemas.TraceSummary]:
+    summaries = (_summary(spans) for spans in recent_traces())
+    return [summary for summary in summaries if summary.error or not errors_only][:limit]
+
+
+@router.get("/{trace_id}")
+async def get_trace_spans(trace_id: str) -> dict[str, Any]:
+    """Spans of one trace as an OTLP/JSON export request."""
+
+    spans = get_trace(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return otlp_json(spans)
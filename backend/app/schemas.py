@@ -1,13 +1,14 @@
 """Pydantic schemas for API request/response models."""
 from __future__ import annotations
 
+import json
 from datetime import date, datetime
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from pydantic.config import ConfigDict
 
-from .models import ActionStatus, PhotoAngle, Severity, ShotSource, ToolStatus, UserRole
+from .models import ActionStatus, AlertStatus, JobStatus, PhotoAngle, Severity, ShotSource, ToolStatus, UserRole
 
 
 class APIModel(BaseModel):
@@ -33,6 +34,13 @@ class UserRead(UserBase):
     last_login_at: Optional[datetime]
 
 
+class UserSummary(APIModel):
+    id: str
+    username: str
+    full_name: str
+    role: UserRole
+
+
 class ToolBase(APIModel):
     asset_number: str
     name: str
@@ -68,6 +76,14 @@ class ToolRead(ToolBase):
     current_shot_count: int
 
 
+class ToolSummary(APIModel):
+    id: str
+    asset_number: str
+    name: str
+    status: ToolStatus
+    location: Optional[str]
+
+
 class ToolShotCounterBase(APIModel):
     shot_count: int
     recorded_by: Optional[str]
@@ -229,6 +245,187 @@ class ActionItemRead(ActionItemBase):
     id: str
 
 
+class MaintenanceLogDetail(MaintenanceLogRead):
+    performed_by_user: Optional[UserSummary]
+
+
+class FailureReportDetail(FailureReportRead):
+    failure_code: Optional[FailureCodeRead]
+    photos: list[FailurePhotoRead]
+
+
+class ActionItemDetail(ActionItemRead):
+    assignee: Optional[UserSummary]
+
+
+class ToolDetailTotals(APIModel):
+    shot_counters: int
+    maintenance_logs: int
+    failure_reports: int
+    open_action_items: int
+
+
+class ToolDetail(ToolRead):
+    photos: list[ToolPhotoRead]
+    shot_counters: list[ToolShotCounterRead]
+    maintenance_logs: list[MaintenanceLogDetail]
+    failure_reports: list[FailureReportDetail]
+    open_action_items: list[ActionItemDetail]
+    totals: ToolDetailTotals
+
+
+class BatchOperation(APIModel):
+    id: str = Field(min_length=1, max_length=64)
+    method: str = Field(pattern=r"^(POST|PATCH|DELETE)$")
+    path: str = Field(pattern=r"^/")
+    body: Optional[dict[str, Any]] = None
+
+
+class BatchRequest(APIModel):
+    operations: list[BatchOperation]
+    atomic: bool = False
+
+
+class BatchOperationResult(APIModel):
+    id: str
+    status: int
+    body: Optional[Any] = None
+    replayed: bool = False
+
+
+class BatchResponse(APIModel):
+    committed: bool
+    results: list[BatchOperationResult]
+
+
+class JobCreate(APIModel):
+    task: str
+    payload: dict[str, Any] = Field(default_factory=dict)
+    priority: int = 0
+    run_at: Optional[datetime] = None
+
+
+class JobRead(APIModel):
+    id: str
+    task: str
+    payload: dict[str, Any]
+    status: JobStatus
+    priority: int
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    result: Optional[dict[str, Any]]
+    last_error: Optional[str]
+    created_by: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    @field_validator("payload", "result", mode="before")
+    @classmethod
+    def _decode_json(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+
+class AlertDeliveryRead(APIModel):
+    id: str
+    alert_key: str
+    kind: str
+    entity_id: str
+    recipient_id: Optional[str]
+    message: str
+    status: AlertStatus
+    attempts: int
+    last_error: Optional[str]
+    created_at: datetime
+    delivered_at: Optional[datetime]
+
+
+class BackupRead(APIModel):
+    name: str
+    created_at: datetime
+    label: Optional[str]
+    size_bytes: int
+    pages: int
+    sha256: str
+    integrity: str
+    duration_seconds: float
+
+
+class BackupCreate(APIModel):
+    label: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-]{1,32}$")
+
+
+class ProfiledStatement(APIModel):
+    statement: str
+    duration_ms: float
+
+
+class ProfiledStack(APIModel):
+    stack: str
+    samples: int
+
+
+class SlowRequestRead(APIModel):
+    id: int
+    method: str
+    path: str
+    route: Optional[str]
+    status: Optional[int]
+    started_at: datetime
+    duration_ms: float
+    samples: int
+    statement_count: int
+
+
+class SlowRequestDetail(SlowRequestRead):
+    statements: list[ProfiledStatement]
+    stacks: list[ProfiledStack]
+
+
+class TraceSummary(APIModel):
+    trace_id: str
+    name: str
+    started_at: datetime
+    duration_ms: float
+    span_count: int
+    error: bool
+
+
+class FleetTool(ToolSummary):
+    current_shot_count: int
+    max_shot_count: Optional[int]
+    usage: Optional[float]
+    shots_per_day: float
+    last_maintenance_at: Optional[datetime]
+    projected_end_of_life: Optional[datetime]
+
+
+class FleetQueryResult(APIModel):
+    total: int
+    snapshot_age_seconds: float
+    query_microseconds: float
+    tools: list[FleetTool]
+
+
+class ReportRead(APIModel):
+    name: str
+    title: str
+    columns: list[str]
+    built_at: Optional[datetime]
+    full_built_at: Optional[datetime]
+    periods: list[date]
+    rows: int
+    pending_periods: int
+
+
+class ReportRefresh(APIModel):
+    reports: Optional[list[str]] = None
+    full: bool = False
+
+
 class Token(APIModel):
     access_token: str
     token_type: str = "bearer"
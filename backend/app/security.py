@@ -46,12 +46,18 @@ def verify_password(password: str, stored_hash: str) -> bool:
     return hmac.compare_digest(expected, derived)
 
 
-def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
-    """Generate a signed JWT access token."""
+def create_access_token(subject: str, expires_delta: timedelta | None = None, role: str | None = None) -> str:
+    """Generate a signed JWT access token.
+
+    ``role`` is informational (admission control classifies requests by it before the
+    user is loaded); authorisation always uses the stored role.
+    """
 
     settings = get_settings()
     expire = datetime.now(tz=timezone.utc) + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     payload: Dict[str, Any] = {"sub": subject, "exp": expire}
+    if role is not None:
+        payload["role"] = role
     return jwt.encode(payload, settings.access_token_secret, algorithm="HS256")
 
 
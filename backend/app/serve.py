@@ -0,0 +1,57 @@
+"""Production server entry point: ``python -m app.serve [--workers N]``.
+
+Pending migrations are applied once in the supervisor before any worker starts, then
+uvicorn's process manager runs the workers. Send ``SIGHUP`` to the supervisor to restart
+the workers one by one (for example after deploying new code), ``SIGTTIN``/``SIGTTOU`` to
+add or remove a worker, and ``SIGTERM`` for a graceful shutdown.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+from typing import Optional
+
+import uvicorn
+
+from .config import get_settings
+
+
+async def _migrate() -> None:
+    from .database import get_engine  # noqa: WPS433 - keep the supervisor import light
+    from .migrations import upgrade  # noqa: WPS433
+
+    try:
+        await upgrade()
+    finally:
+        await get_engine().dispose()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description="Run the Tool Maintenance API.")
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--host", default=settings.api_host)
+    parser.add_argument("--port", type=int, default=settings.api_port)
+    parser.add_argument("--reload", action="store_true", default=settings.debug, help="Reload on code changes.")
+    parser.add_argument("--skip-migrations", action="store_true", help="Do not apply pending migrations first.")
+    args = parser.parse_args(argv)
+
+    if not args.skip_migrations:
+        asyncio.run(_migrate())
+    # Workers only verify the schema version; migrations never run concurrently in several workers.
+    os.environ["AUTO_MIGRATE"] = "false"
+    os.environ["WORKERS"] = str(1 if args.reload else args.workers)
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        reload=args.reload,
+        timeout_graceful_shutdown=settings.graceful_shutdown_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,37 @@
+import { clearOfflineData, loadLists, pendingOperations, queueOperation, removeOperations, saveLists } from "./offline.js";
+import { VirtualTable } from "./virtual-table.js";
+
 const API_BASE = "/api";
 
 const TAB_KEYS = ["tools", "maintenance", "shotCounters", "failureReports", "actions"];
 
+// API path prefixes mapped to the state lists their records belong to (most specific first).
+const COLLECTIONS = [
+  ["/failures/codes", "failureCodes"],
+  ["/failures/reports", "failureReports"],
+  ["/shot-counters", "shotCounters"],
+  ["/maintenance", "maintenanceLogs"],
+  ["/actions", "actionItems"],
+  ["/tools", "tools"],
+];
+const BATCH_LIMIT = 200;
+const QUEUED_MESSAGE = "Saved offline – will sync when the connection returns";
+const OUTBOX_RETRY_MS = 30000;
+// Large selects show one page of options; the search box beside them pages the rest from the API.
+const SELECT_OPTION_LIMIT = 100;
+const SEARCH_DEBOUNCE_MS = 250;
+// Event logs grow without bound, so their tables load newest first, one page at a time.
+const TABLE_PAGE_SIZE = 200;
+const PAGED_COLLECTIONS = ["maintenanceLogs", "shotCounters", "failureReports"];
+
 const state = {
   token: localStorage.getItem("tm_auth_token") || "",
   username: localStorage.getItem("tm_username") || "",
   defaultUserId: localStorage.getItem("tm_user_id") || "",
   loading: false,
+  offline: false,
+  flushing: null,
+  pendingCount: 0,
   activeTab: localStorage.getItem("tm_active_tab") || TAB_KEYS[0],
   data: {
     tools: [],
@@ -16,6 +41,8 @@ const state = {
     failureReports: [],
     actionItems: [],
   },
+  // Filter text and paging position of each paged table.
+  pages: Object.fromEntries(PAGED_COLLECTIONS.map((key) => [key, { q: "", loaded: 0, more: false }])),
 };
 
 const elements = {
@@ -40,6 +67,7 @@ const elements = {
   actionTool: document.getElementById("action-tool"),
   actionFailureReport: document.getElementById("action-failure-report"),
   toast: document.getElementById("toast"),
+  syncStatus: document.getElementById("sync-status"),
   tabButtons: Array.from(document.querySelectorAll("[data-tab-target]")),
   tabSections: Array.from(document.querySelectorAll("[data-tab-section]")),
   toolTableWrapper: document.getElementById("tools-table-wrapper"),
@@ -134,11 +162,199 @@ async function api(path, options = {}) {
   const data = await response.json().catch(() => null);
   if (!response.ok) {
     const message = data?.detail || data?.message || response.statusText;
-    throw new Error(message || "Request failed");
+    const error = new Error(message || "Request failed");
+    error.status = response.status;
+    throw error;
   }
   return data;
 }
 
+function isNetworkError(error) {
+  // fetch rejects with a TypeError when the request never reached the server.
+  return error instanceof TypeError && error.status === undefined;
+}
+
+function errorMessage(detail) {
+  if (Array.isArray(detail)) {
+    return detail.map((item) => item.msg || JSON.stringify(item)).join("; ");
+  }
+  return typeof detail === "string" ? detail : "Request rejected";
+}
+
+function updateSyncStatus() {
+  if (!elements.syncStatus) return;
+  const parts = [];
+  if (state.offline) parts.push("Offline – showing saved data");
+  if (state.pendingCount) {
+    parts.push(`${state.pendingCount} change${state.pendingCount === 1 ? "" : "s"} waiting to sync`);
+  }
+  elements.syncStatus.textContent = parts.join(" • ");
+  elements.syncStatus.hidden = parts.length === 0;
+}
+
+function collectionFor(path) {
+  return COLLECTIONS.find(([prefix]) => path === prefix || path.startsWith(`${prefix}/`))?.[1] ?? null;
+}
+
+function collectionPath(key) {
+  return COLLECTIONS.find(([, name]) => name === key)[0];
+}
+
+function updateLoadMore(key) {
+  const button = document.querySelector(`[data-load-more="${key}"]`);
+  if (button) button.hidden = !state.pages[key]?.more;
+}
+
+async function fetchCollection(key, { offset = 0 } = {}) {
+  const path = collectionPath(key);
+  const page = state.pages[key];
+  if (!page) return api(path);
+  const params = new URLSearchParams({ limit: String(TABLE_PAGE_SIZE), offset: String(offset), order: "desc" });
+  if (page.q) params.set("q", page.q);
+  const records = await api(`${path}?${params}`);
+  page.loaded = offset + records.length;
+  page.more = records.length === TABLE_PAGE_SIZE;
+  updateLoadMore(key);
+  return records;
+}
+
+function renderCollection(key) {
+  switch (key) {
+    case "tools":
+      renderTools();
+      renderShotCounters();
+      break;
+    case "maintenanceLogs":
+      renderMaintenance();
+      break;
+    case "shotCounters":
+      renderShotCounters();
+      renderTools();
+      break;
+    case "failureCodes":
+      renderFailureCodes();
+      break;
+    case "failureReports":
+      renderFailureReports();
+      break;
+    case "actionItems":
+      renderActionItems();
+      break;
+    default:
+      break;
+  }
+}
+
+function applyResult(operation, result) {
+  const key = collectionFor(operation.path);
+  if (!key) return null;
+  const records = state.data[key];
+  if (operation.method === "DELETE") {
+    const id = operation.path.split("/").pop();
+    state.data[key] = records.filter((record) => record.id !== id);
+  } else if (result.body?.id) {
+    const index = records.findIndex((record) => record.id === result.body.id);
+    if (index === -1) {
+      records.push(result.body);
+    } else {
+      records[index] = result.body;
+    }
+    if (key === "shotCounters" && operation.method === "POST" && !result.replayed) {
+      // Shot totals are worked back from the tool's count, so keep it in step with the server.
+      const tool = state.data.tools.find((item) => item.id === result.body.tool_id);
+      if (tool) {
+        tool.current_shot_count = Math.max(tool.current_shot_count, tool.initial_shot_count) + result.body.shot_count;
+      }
+    }
+  }
+  return key;
+}
+
+async function flushOutbox() {
+  if (state.flushing) return state.flushing;
+  state.flushing = (async () => {
+    const outcomes = new Map();
+    let queue = await pendingOperations();
+    while (queue.length && state.token) {
+      const operations = queue.slice(0, BATCH_LIMIT);
+      let response;
+      try {
+        response = await api("/batch", {
+          method: "POST",
+          body: { operations: operations.map(({ id, method, path, body }) => ({ id, method, path, body })) },
+        });
+        state.offline = false;
+      } catch (error) {
+        if (isNetworkError(error)) {
+          state.offline = true;
+        } else {
+          console.error(error);
+        }
+        break;
+      }
+      const results = new Map(response.results.map((result) => [result.id, result]));
+      const settled = [];
+      const changed = new Set();
+      operations.forEach((operation) => {
+        const result = results.get(operation.id);
+        // Server errors stay queued for the next attempt; applied or rejected operations leave the outbox.
+        if (!result || result.status >= 500) return;
+        settled.push(operation.seq);
+        outcomes.set(operation.id, result);
+        if (result.status < 300) {
+          const key = applyResult(operation, result);
+          if (key) changed.add(key);
+        } else {
+          showToast(`${operation.method} ${operation.path}: ${errorMessage(result.body?.detail)}`, "error");
+        }
+      });
+      await removeOperations(settled);
+      changed.forEach(renderCollection);
+      if (changed.size) {
+        refreshSelections();
+        void saveLists(state.data).catch(console.error);
+      }
+      if (settled.length < operations.length) break;
+      queue = queue.slice(operations.length);
+    }
+    state.pendingCount = (await pendingOperations()).length;
+    updateSyncStatus();
+    return outcomes;
+  })();
+  try {
+    return await state.flushing;
+  } finally {
+    state.flushing = null;
+  }
+}
+
+async function submitWrite(method, path, body) {
+  // Every write goes through the durable outbox so nothing is lost when the connection drops.
+  const operation = await queueOperation({ method, path, body });
+  if (state.flushing) {
+    await state.flushing;
+  }
+  const outcomes = await flushOutbox();
+  const result = outcomes.get(operation.id);
+  if (!result) {
+    return { queued: true };
+  }
+  if (result.status >= 400) {
+    const error = new Error(errorMessage(result.body?.detail));
+    error.status = result.status;
+    error.reported = true;
+    throw error;
+  }
+  return { queued: false, body: result.body };
+}
+
+function reportWriteError(error) {
+  console.error(error);
+  if (!error.reported) {
+    showToast(error.message, "error");
+  }
+}
+
 function updateAuthState() {
   const isAuthenticated = Boolean(state.token);
   if (isAuthenticated) {
@@ -174,7 +390,7 @@ function setToken(token, username) {
   }
   updateAuthState();
   if (token) {
-    void loadDashboard();
+    void syncOutbox().then(() => loadDashboard());
   } else {
     clearTables();
   }
@@ -211,16 +427,7 @@ function setDefaultUserId(userId) {
 }
 
 function clearTables() {
-  elements.toolTableWrapper.innerHTML = "";
-  elements.maintenanceTableWrapper.innerHTML = "";
-  elements.shotCounterTableWrapper.innerHTML = "";
-  elements.failureCodesTableWrapper.innerHTML = "";
-  elements.failureReportsTableWrapper.innerHTML = "";
-  elements.actionsTableWrapper.innerHTML = "";
-}
-
-function renderEmptyState(message) {
-  return `<div class="empty-state">${message}</div>`;
+  Object.values(tables).forEach((table) => table.clear());
 }
 
 function setActiveTab(tabKey) {
@@ -250,268 +457,197 @@ function setActiveTab(tabKey) {
   });
 }
 
+function shotTotalCell(total, maxShots) {
+  const isOverLimit = maxShots !== null && total > maxShots;
+  return `
+    <span class="shot-total${isOverLimit ? " over-limit" : ""}">${formatNumber(total)}</span>
+    ${isOverLimit ? '<span class="badge badge-negative">Over limit</span>' : ""}
+  `.trim();
+}
+
+const tables = {
+  tools: new VirtualTable(elements.toolTableWrapper, {
+    headers: ["Asset #", "Name", "Location", "Status", "Cavities", "Initial shots", "Current shots", "Max shots", "Created"],
+    emptyMessage: "No tools have been recorded yet.",
+    renderRow: ({ tool, totalShots, maxShots }) => `
+      <td><code>${tool.asset_number}</code></td>
+      <td>${tool.name}</td>
+      <td>${tool.location || "-"}</td>
+      <td>
+        <span class="status-indicator status-${tool.status}">
+          <span class="status-dot"></span>
+          ${tool.status}
+        </span>
+      </td>
+      <td>${tool.cavity_count ?? "-"}</td>
+      <td>${formatNumber(tool.initial_shot_count)}</td>
+      <td>${shotTotalCell(totalShots, maxShots)}</td>
+      <td>${maxShots !== null ? formatNumber(maxShots) : "-"}</td>
+      <td>${formatDateTime(tool.created_at)}</td>
+    `,
+  }),
+  maintenance: new VirtualTable(elements.maintenanceTableWrapper, {
+    headers: ["Tool id", "Performed by", "Performed at", "Duration", "Follow up", "Observations"],
+    emptyMessage: "No maintenance logs found.",
+    renderRow: (log) => `
+      <td><code>${log.tool_id}</code></td>
+      <td><code>${log.performed_by}</code></td>
+      <td>${formatDateTime(log.performed_at)}</td>
+      <td>${log.duration_minutes ?? "-"}</td>
+      <td>${log.follow_up_required ? "Yes" : "No"}</td>
+      <td>${log.observations || "-"}</td>
+    `,
+  }),
+  shotCounters: new VirtualTable(elements.shotCounterTableWrapper, {
+    headers: ["Tool id", "Shots added", "Total shots", "Max shots", "Source", "Recorded by", "Recorded at"],
+    emptyMessage: "No shot counters recorded.",
+    renderRow: ({ entry, total, maxShots }) => `
+      <td><code>${entry.tool_id}</code></td>
+      <td>${formatNumber(entry.shot_count)}</td>
+      <td>${shotTotalCell(total, maxShots)}</td>
+      <td>${maxShots !== null ? formatNumber(maxShots) : "-"}</td>
+      <td>${entry.source}</td>
+      <td><code>${entry.recorded_by || "-"}</code></td>
+      <td>${formatDateTime(entry.recorded_at)}</td>
+    `,
+  }),
+  failureCodes: new VirtualTable(elements.failureCodesTableWrapper, {
+    headers: ["Code", "Name", "Description", "Default severity", "Status"],
+    emptyMessage: "No failure codes defined.",
+    renderRow: (code) => `
+      <td><code>${code.code}</code></td>
+      <td>${code.name}</td>
+      <td>${code.description || "-"}</td>
+      <td><span class="badge severity-${code.severity_default}">${code.severity_default}</span></td>
+      <td>${code.active ? "Active" : "Inactive"}</td>
+    `,
+  }),
+  failureReports: new VirtualTable(elements.failureReportsTableWrapper, {
+    headers: ["Tool id", "Reported by", "Failure code", "Severity", "Occurred at", "Description"],
+    emptyMessage: "No failure reports captured.",
+    renderRow: (report) => `
+      <td><code>${report.tool_id}</code></td>
+      <td><code>${report.reported_by}</code></td>
+      <td>${report.failure_code_id ? `<code>${report.failure_code_id}</code>` : "-"}</td>
+      <td><span class="badge severity-${report.severity}">${report.severity}</span></td>
+      <td>${formatDateTime(report.occurred_at)}</td>
+      <td>${report.description || "-"}</td>
+    `,
+  }),
+  actions: new VirtualTable(elements.actionsTableWrapper, {
+    headers: ["Title", "Status", "Tool id", "Failure report", "Assignee", "Due date"],
+    emptyMessage: "No action items assigned yet.",
+    renderRow: (item) => `
+      <td>${item.title}</td>
+      <td><span class="badge status-${item.status}">${item.status.replace("_", " ")}</span></td>
+      <td><code>${item.tool_id}</code></td>
+      <td>${item.failure_report_id ? `<code>${item.failure_report_id}</code>` : "-"}</td>
+      <td><code>${item.assigned_to}</code></td>
+      <td>${item.due_date ? formatDate(item.due_date) : "-"}</td>
+    `,
+  }),
+};
+
+function maxShotsOf(tool) {
+  return typeof tool?.max_shot_count === "number" ? tool.max_shot_count : null;
+}
+
 function renderTools() {
-  const tools = state.data.tools;
-  if (!tools.length) {
-    elements.toolTableWrapper.innerHTML = renderEmptyState("No tools have been recorded yet.");
-    return;
-  }
   const shotTotals = new Map();
   state.data.shotCounters.forEach((entry) => {
     shotTotals.set(entry.tool_id, (shotTotals.get(entry.tool_id) ?? 0) + entry.shot_count);
   });
-  const rows = tools
-    .map((tool) => {
-      const statusClass = `status-${tool.status}`;
-      const maxShots = typeof tool.max_shot_count === "number" ? tool.max_shot_count : null;
-      const counterTotal = shotTotals.get(tool.id) ?? 0;
-      const totalShots = Math.max(tool.current_shot_count, tool.initial_shot_count + counterTotal);
-      const isOverLimit = maxShots !== null && totalShots > maxShots;
-      const currentShots = formatNumber(totalShots);
-      const currentShotsCell = `
-        <span class="shot-total${isOverLimit ? " over-limit" : ""}">${currentShots}</span>
-        ${isOverLimit ? '<span class="badge badge-negative">Over limit</span>' : ""}
-      `.trim();
-      return `
-        <tr>
-          <td><code>${tool.asset_number}</code></td>
-          <td>${tool.name}</td>
-          <td>${tool.location || "-"}</td>
-          <td>
-            <span class="status-indicator ${statusClass}">
-              <span class="status-dot"></span>
-              ${tool.status}
-            </span>
-          </td>
-          <td>${tool.cavity_count ?? "-"}</td>
-          <td>${formatNumber(tool.initial_shot_count)}</td>
-          <td>${currentShotsCell}</td>
-          <td>${maxShots !== null ? formatNumber(maxShots) : "-"}</td>
-          <td>${formatDateTime(tool.created_at)}</td>
-        </tr>
-      `;
-    })
-    .join("");
-  elements.toolTableWrapper.innerHTML = `
-    <table>
-      <thead>
-        <tr>
-          <th>Asset #</th>
-          <th>Name</th>
-          <th>Location</th>
-          <th>Status</th>
-          <th>Cavities</th>
-          <th>Initial shots</th>
-          <th>Current shots</th>
-          <th>Max shots</th>
-          <th>Created</th>
-        </tr>
-      </thead>
-      <tbody>${rows}</tbody>
-    </table>
-  `;
+  tables.tools.setRows(
+    state.data.tools.map((tool) => ({
+      id: tool.id,
+      tool,
+      totalShots: Math.max(tool.current_shot_count, tool.initial_shot_count + (shotTotals.get(tool.id) ?? 0)),
+      maxShots: maxShotsOf(tool),
+    })),
+  );
 }
 
 function renderMaintenance() {
-  const logs = state.data.maintenanceLogs;
-  if (!logs.length) {
-    elements.maintenanceTableWrapper.innerHTML = renderEmptyState("No maintenance logs found.");
-    return;
-  }
-  const rows = logs
-    .map((log) => `
-      <tr>
-        <td><code>${log.tool_id}</code></td>
-        <td><code>${log.performed_by}</code></td>
-        <td>${formatDateTime(log.performed_at)}</td>
-        <td>${log.duration_minutes ?? "-"}</td>
-        <td>${log.follow_up_required ? "Yes" : "No"}</td>
-        <td>${log.observations || "-"}</td>
-      </tr>
-    `)
-    .join("");
-  elements.maintenanceTableWrapper.innerHTML = `
-    <table>
-      <thead>
-        <tr>
-          <th>Tool id</th>
-          <th>Performed by</th>
-          <th>Performed at</th>
-          <th>Duration</th>
-          <th>Follow up</th>
-          <th>Observations</th>
-        </tr>
-      </thead>
-      <tbody>${rows}</tbody>
-    </table>
-  `;
+  tables.maintenance.setRows(state.data.maintenanceLogs);
 }
 
 function renderShotCounters() {
   const counters = [...state.data.shotCounters];
-  if (!counters.length) {
-    elements.shotCounterTableWrapper.innerHTML = renderEmptyState("No shot counters recorded.");
-    return;
-  }
-  counters.sort((a, b) => {
-    const timeA = new Date(a.recorded_at ?? 0).getTime();
-    const timeB = new Date(b.recorded_at ?? 0).getTime();
-    return timeA - timeB;
-  });
+  counters.sort((a, b) => new Date(b.recorded_at ?? 0).getTime() - new Date(a.recorded_at ?? 0).getTime());
 
-  const runningTotals = new Map();
+  // Only the newest entries are loaded, so running totals are worked back from each tool's
+  // current count, once per data change rather than per rendered row.
+  const totalsBefore = new Map();
   const toolIndex = new Map(state.data.tools.map((tool) => [tool.id, tool]));
-
-  const rows = counters
-    .map((entry) => {
+  tables.shotCounters.setRows(
+    counters.map((entry) => {
       const tool = toolIndex.get(entry.tool_id);
-      const startingValue = runningTotals.has(entry.tool_id)
-        ? runningTotals.get(entry.tool_id)
-        : tool?.initial_shot_count ?? 0;
-      const newTotal = startingValue + entry.shot_count;
-      runningTotals.set(entry.tool_id, newTotal);
-
-      const maxShots = typeof tool?.max_shot_count === "number" ? tool.max_shot_count : null;
-      const isOverLimit = maxShots !== null && newTotal > maxShots;
-      const totalCell = `
-        <span class="shot-total${isOverLimit ? " over-limit" : ""}">${formatNumber(newTotal)}</span>
-        ${isOverLimit ? '<span class="badge badge-negative">Over limit</span>' : ""}
-      `.trim();
-
-      return `
-        <tr>
-          <td><code>${entry.tool_id}</code></td>
-          <td>${formatNumber(entry.shot_count)}</td>
-          <td>${totalCell}</td>
-          <td>${maxShots !== null ? formatNumber(maxShots) : "-"}</td>
-          <td>${entry.source}</td>
-          <td><code>${entry.recorded_by || "-"}</code></td>
-          <td>${formatDateTime(entry.recorded_at)}</td>
-        </tr>
-      `;
-    })
-    .join("");
-  elements.shotCounterTableWrapper.innerHTML = `
-    <table>
-      <thead>
-        <tr>
-          <th>Tool id</th>
-          <th>Shots added</th>
-          <th>Total shots</th>
-          <th>Max shots</th>
-          <th>Source</th>
-          <th>Recorded by</th>
-          <th>Recorded at</th>
-        </tr>
-      </thead>
-      <tbody>${rows}</tbody>
-    </table>
-  `;
+      const current = tool ? Math.max(tool.current_shot_count, tool.initial_shot_count) : entry.shot_count;
+      const total = totalsBefore.get(entry.tool_id) ?? current;
+      totalsBefore.set(entry.tool_id, total - entry.shot_count);
+      return { id: entry.id, entry, total, maxShots: maxShotsOf(tool) };
+    }),
+  );
 }
 
 function renderFailureCodes() {
-  const codes = state.data.failureCodes;
-  if (!codes.length) {
-    elements.failureCodesTableWrapper.innerHTML = renderEmptyState("No failure codes defined.");
-    return;
-  }
-  const rows = codes
-    .map((code) => `
-      <tr>
-        <td><code>${code.code}</code></td>
-        <td>${code.name}</td>
-        <td>${code.description || "-"}</td>
-        <td><span class="badge severity-${code.severity_default}">${code.severity_default}</span></td>
-        <td>${code.active ? "Active" : "Inactive"}</td>
-      </tr>
-    `)
-    .join("");
-  elements.failureCodesTableWrapper.innerHTML = `
-    <table>
-      <thead>
-        <tr>
-          <th>Code</th>
-          <th>Name</th>
-          <th>Description</th>
-          <th>Default severity</th>
-          <th>Status</th>
-        </tr>
-      </thead>
-      <tbody>${rows}</tbody>
-    </table>
-  `;
+  tables.failureCodes.setRows(state.data.failureCodes);
 }
 
 function renderFailureReports() {
-  const reports = state.data.failureReports;
-  if (!reports.length) {
-    elements.failureReportsTableWrapper.innerHTML = renderEmptyState("No failure reports captured.");
-    return;
-  }
-  const rows = reports
-    .map((report) => `
-      <tr>
-        <td><code>${report.tool_id}</code></td>
-        <td><code>${report.reported_by}</code></td>
-        <td>${report.failure_code_id ? `<code>${report.failure_code_id}</code>` : "-"}</td>
-        <td><span class="badge severity-${report.severity}">${report.severity}</span></td>
-        <td>${formatDateTime(report.occurred_at)}</td>
-        <td>${report.description || "-"}</td>
-      </tr>
-    `)
-    .join("");
-  elements.failureReportsTableWrapper.innerHTML = `
-    <table>
-      <thead>
-        <tr>
-          <th>Tool id</th>
-          <th>Reported by</th>
-          <th>Failure code</th>
-          <th>Severity</th>
-          <th>Occurred at</th>
-          <th>Description</th>
-        </tr>
-      </thead>
-      <tbody>${rows}</tbody>
-    </table>
-  `;
+  tables.failureReports.setRows(state.data.failureReports);
 }
 
 function renderActionItems() {
-  const items = state.data.actionItems;
-  if (!items.length) {
-    elements.actionsTableWrapper.innerHTML = renderEmptyState("No action items assigned yet.");
-    return;
-  }
-  const rows = items
-    .map((item) => `
-      <tr>
-        <td>${item.title}</td>
-        <td><span class="badge status-${item.status}">${item.status.replace("_", " ")}</span></td>
-        <td><code>${item.tool_id}</code></td>
-        <td>${item.failure_report_id ? `<code>${item.failure_report_id}</code>` : "-"}</td>
-        <td><code>${item.assigned_to}</code></td>
-        <td>${item.due_date ? formatDate(item.due_date) : "-"}</td>
-      </tr>
-    `)
-    .join("");
-  elements.actionsTableWrapper.innerHTML = `
-    <table>
-      <thead>
-        <tr>
-          <th>Title</th>
-          <th>Status</th>
-          <th>Tool id</th>
-          <th>Failure report</th>
-          <th>Assignee</th>
-          <th>Due date</th>
-        </tr>
-      </thead>
-      <tbody>${rows}</tbody>
-    </table>
-  `;
+  tables.actions.setRows(state.data.actionItems);
 }
 
+const toolOption = (tool) => ({ value: tool.id, label: `${tool.name} (${tool.asset_number})` });
+const failureCodeOption = (code) => ({ value: code.id, label: `${code.code} — ${code.name}` });
+const maintenanceOption = (log) => ({
+  value: log.id,
+  label: `${log.tool_id} • ${log.performed_at ? formatDateTime(log.performed_at) : "No timestamp"}`,
+});
+const shotCounterOption = (entry) => ({
+  value: entry.id,
+  label: `${entry.tool_id} • +${formatNumber(entry.shot_count)} (${entry.recorded_at ? formatDateTime(entry.recorded_at) : "No timestamp"})`,
+});
+const failureReportOption = (report) => ({
+  value: report.id,
+  label: `${report.id.slice(0, 8)} – ${report.description?.slice(0, 40) || "Report"}`,
+});
+const actionOption = (item) => ({ value: item.id, label: `${item.title} – ${item.tool_id}` });
+
+// Server-side lookups behind the search box next to each large select.
+const SELECT_SEARCHES = {
+  tools: { path: "/tools/catalogue", collection: "tools", option: toolOption },
+  maintenance: {
+    path: "/maintenance",
+    collection: "maintenanceLogs",
+    fields: "id,tool_id,performed_at",
+    order: "desc",
+    option: maintenanceOption,
+  },
+  shotCounters: {
+    path: "/shot-counters",
+    collection: "shotCounters",
+    fields: "id,tool_id,shot_count,recorded_at",
+    order: "desc",
+    option: shotCounterOption,
+  },
+  failureReports: {
+    path: "/failures/reports",
+    collection: "failureReports",
+    fields: "id,description",
+    order: "desc",
+    option: failureReportOption,
+  },
+  actions: { path: "/actions", collection: "actionItems", fields: "id,title,tool_id", option: actionOption },
+};
+
+const selectSignatures = new WeakMap();
+const searchedOptions = new WeakMap();
+
 function populateSelect(
   selectElement,
   options,
@@ -519,25 +655,19 @@ function populateSelect(
 ) {
   if (!selectElement) return;
   const currentValue = selectElement.value;
-  selectElement.innerHTML = "";
-  if (includeEmpty) {
-    const option = document.createElement("option");
-    option.value = "";
-    option.textContent = emptyLabel;
-    selectElement.appendChild(option);
+  const source = searchedOptions.get(selectElement) ?? options;
+  const visible = source.slice(0, SELECT_OPTION_LIMIT);
+  // Keep the current selection available even when it falls outside the visible page.
+  if (currentValue && !visible.some(({ value }) => value === currentValue)) {
+    const selected = options.find(({ value }) => value === currentValue);
+    if (selected) visible.unshift(selected);
   }
-  options.forEach(({ value, label }) => {
-    const option = document.createElement("option");
-    option.value = value;
-    option.textContent = label;
-    selectElement.appendChild(option);
-  });
-  extraOptions.forEach(({ value, label }) => {
-    const option = document.createElement("option");
-    option.value = value;
-    option.textContent = label;
-    selectElement.appendChild(option);
-  });
+  const entries = [...(includeEmpty ? [{ value: "", label: emptyLabel }] : []), ...visible, ...extraOptions];
+  const signature = entries.map(({ value, label }) => `${value}\u0000${label}`).join("\u0001");
+  if (selectSignatures.get(selectElement) === signature) return;
+  selectSignatures.set(selectElement, signature);
+
+  selectElement.replaceChildren(...entries.map(({ value, label }) => new Option(label, value)));
   if (currentValue) {
     selectElement.value = currentValue;
     if (selectElement.value !== currentValue && includeEmpty) {
@@ -547,7 +677,7 @@ function populateSelect(
 }
 
 function refreshSelections() {
-  const toolOptions = state.data.tools.map((tool) => ({ value: tool.id, label: `${tool.name} (${tool.asset_number})` }));
+  const toolOptions = state.data.tools.map(toolOption);
   populateSelect(elements.maintenanceTool, toolOptions);
   populateSelect(elements.shotCounterTool, toolOptions);
   populateSelect(elements.failureReportTool, toolOptions);
@@ -556,7 +686,7 @@ function refreshSelections() {
   populateSelect(elements.updateMaintenanceTool, toolOptions, { includeEmpty: true, emptyLabel: "Keep current" });
   populateSelect(elements.updateFailureReportTool, toolOptions, { includeEmpty: true, emptyLabel: "Keep current" });
 
-  const failureCodeOptions = state.data.failureCodes.map((code) => ({ value: code.id, label: `${code.code} — ${code.name}` }));
+  const failureCodeOptions = state.data.failureCodes.map(failureCodeOption);
   populateSelect(elements.failureReportCode, failureCodeOptions, { includeEmpty: true, emptyLabel: "None" });
   populateSelect(elements.updateFailureReportCode, failureCodeOptions, {
     includeEmpty: true,
@@ -565,64 +695,120 @@ function refreshSelections() {
   });
   populateSelect(elements.updateFailureCodeId, failureCodeOptions, { includeEmpty: true, emptyLabel: "Select code" });
 
-  const maintenanceOptions = state.data.maintenanceLogs.map((log) => ({
-    value: log.id,
-    label: `${log.tool_id} • ${log.performed_at ? formatDateTime(log.performed_at) : "No timestamp"}`,
-  }));
+  const maintenanceOptions = state.data.maintenanceLogs.map(maintenanceOption);
   populateSelect(elements.updateMaintenanceId, maintenanceOptions, { includeEmpty: true, emptyLabel: "Select log" });
 
-  const shotCounterOptions = state.data.shotCounters.map((entry) => ({
-    value: entry.id,
-    label: `${entry.tool_id} • +${formatNumber(entry.shot_count)} (${entry.recorded_at ? formatDateTime(entry.recorded_at) : "No timestamp"})`,
-  }));
+  const shotCounterOptions = state.data.shotCounters.map(shotCounterOption);
   populateSelect(elements.updateShotCounterId, shotCounterOptions, { includeEmpty: true, emptyLabel: "Select entry" });
 
-  const failureReportOptions = state.data.failureReports.map((report) => ({
-    value: report.id,
-    label: `${report.id.slice(0, 8)} – ${report.description?.slice(0, 40) || "Report"}`,
-  }));
+  const failureReportOptions = state.data.failureReports.map(failureReportOption);
   populateSelect(elements.actionFailureReport, failureReportOptions, { includeEmpty: true, emptyLabel: "None" });
   populateSelect(elements.updateFailureReportId, failureReportOptions, { includeEmpty: true, emptyLabel: "Select report" });
 
-  const actionOptions = state.data.actionItems.map((item) => ({
-    value: item.id,
-    label: `${item.title} – ${item.tool_id}`,
-  }));
+  const actionOptions = state.data.actionItems.map(actionOption);
   populateSelect(elements.updateActionId, actionOptions, { includeEmpty: true, emptyLabel: "Select action" });
 }
 
+async function searchOptions(kind, query) {
+  const { path, fields, order, option } = SELECT_SEARCHES[kind];
+  const params = new URLSearchParams({ q: query, limit: String(SELECT_OPTION_LIMIT) });
+  if (fields) params.set("fields", fields);
+  if (order) params.set("order", order);
+  return (await api(`${path}?${params}`)).map(option);
+}
+
+function attachSelectSearch(input) {
+  const selectElement = document.getElementById(input.dataset.selectTarget);
+  const kind = input.dataset.selectSearch;
+  if (!selectElement || !SELECT_SEARCHES[kind]) return;
+  let timer = null;
+  let latest = 0;
+  input.addEventListener("keydown", (event) => {
+    // Enter in the search box should not submit the surrounding form.
+    if (event.key === "Enter") event.preventDefault();
+  });
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    timer = setTimeout(async () => {
+      const query = input.value.trim();
+      const request = (latest += 1);
+      if (!query) {
+        searchedOptions.delete(selectElement);
+      } else {
+        let options;
+        try {
+          options = await searchOptions(kind, query);
+        } catch (error) {
+          if (!isNetworkError(error)) {
+            console.error(error);
+            return;
+          }
+          // Offline: fall back to matching the labels of the cached records.
+          const { collection, option } = SELECT_SEARCHES[kind];
+          const needle = query.toLowerCase();
+          options = state.data[collection].map(option).filter(({ label }) => label.toLowerCase().includes(needle));
+        }
+        if (request !== latest) return;
+        searchedOptions.set(selectElement, options);
+      }
+      refreshSelections();
+    }, SEARCH_DEBOUNCE_MS);
+  });
+}
+
 async function loadDashboard({ showNotification = true } = {}) {
   if (!state.token) return;
   try {
     state.loading = true;
-    const [tools, maintenanceLogs, shotCounters, failureCodes, failureReports, actionItems] = await Promise.all([
-      api("/tools"),
-      api("/maintenance"),
-      api("/shot-counters"),
-      api("/failures/codes"),
-      api("/failures/reports"),
-      api("/actions"),
-    ]);
-    state.data = { tools, maintenanceLogs, shotCounters, failureCodes, failureReports, actionItems };
-    renderTools();
-    renderMaintenance();
-    renderShotCounters();
-    renderFailureCodes();
-    renderFailureReports();
-    renderActionItems();
-    refreshSelections();
-    applyDefaultUserId();
+    const keys = Object.keys(state.data);
+    const lists = await Promise.all(keys.map((key) => fetchCollection(key)));
+    state.data = Object.fromEntries(keys.map((key, index) => [key, lists[index]]));
+    state.offline = false;
+    void saveLists(state.data).catch(console.error);
+    renderDashboard();
     if (showNotification) {
       showToast("Dashboard updated");
     }
   } catch (error) {
-    console.error(error);
-    showToast(error.message, "error");
+    if (isNetworkError(error) && (await loadCachedDashboard())) {
+      showToast("Offline – showing saved data", "error");
+    } else {
+      console.error(error);
+      showToast(error.message, "error");
+    }
   } finally {
     state.loading = false;
+    updateSyncStatus();
   }
 }
 
+async function loadCachedDashboard() {
+  try {
+    state.data = await loadLists(Object.keys(state.data));
+  } catch (error) {
+    console.error(error);
+    return false;
+  }
+  Object.keys(state.pages).forEach((key) => {
+    state.pages[key].more = false;
+    updateLoadMore(key);
+  });
+  state.offline = true;
+  renderDashboard();
+  return true;
+}
+
+function renderDashboard() {
+  renderTools();
+  renderMaintenance();
+  renderShotCounters();
+  renderFailureCodes();
+  renderFailureReports();
+  renderActionItems();
+  refreshSelections();
+  applyDefaultUserId();
+}
+
 function formDataToObject(form) {
   const data = new FormData(form);
   return Object.fromEntries(data.entries());
@@ -681,20 +867,61 @@ function attachUpdateHandler({
       return;
     }
     try {
-      await api(buildPath(identifier), { method: "PATCH", body: data });
+      const outcome = await submitWrite("PATCH", buildPath(identifier), data);
       form.reset();
       afterReset?.();
-      await loadDashboard({ showNotification: false });
       afterSuccess?.();
-      showToast(successMessage);
+      showToast(outcome.queued ? QUEUED_MESSAGE : successMessage);
     } catch (error) {
-      console.error(error);
-      showToast(error.message, "error");
+      reportWriteError(error);
     }
   });
 }
 
+async function loadMore(key) {
+  try {
+    const records = await fetchCollection(key, { offset: state.pages[key].loaded });
+    const known = new Set(state.data[key].map((record) => record.id));
+    state.data[key] = [...state.data[key], ...records.filter((record) => !known.has(record.id))];
+    renderCollection(key);
+    refreshSelections();
+  } catch (error) {
+    console.error(error);
+    showToast(error.message, "error");
+  }
+}
+
+function attachTableSearch(input) {
+  const key = input.dataset.tableSearch;
+  if (!state.pages[key]) return;
+  let timer = null;
+  let latest = 0;
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    timer = setTimeout(async () => {
+      const request = (latest += 1);
+      state.pages[key].q = input.value.trim();
+      try {
+        const records = await fetchCollection(key);
+        if (request !== latest) return;
+        state.data[key] = records;
+        renderCollection(key);
+        refreshSelections();
+      } catch (error) {
+        console.error(error);
+        showToast(error.message, "error");
+      }
+    }, SEARCH_DEBOUNCE_MS);
+  });
+}
+
 function attachEventListeners() {
+  document.querySelectorAll("[data-select-search]").forEach(attachSelectSearch);
+  document.querySelectorAll("[data-table-search]").forEach(attachTableSearch);
+  document.querySelectorAll("[data-load-more]").forEach((button) => {
+    button.addEventListener("click", () => loadMore(button.dataset.loadMore));
+  });
+
   elements.tabButtons.forEach((button) => {
     button.addEventListener("click", () => {
       const { tabTarget } = button.dataset;
@@ -731,11 +958,18 @@ function attachEventListeners() {
     }
   });
 
-  elements.logoutButton?.addEventListener("click", () => {
+  elements.logoutButton?.addEventListener("click", async () => {
     localStorage.removeItem("tm_auth_token");
     localStorage.removeItem("tm_username");
     state.username = "";
     setToken("", "");
+    state.pendingCount = 0;
+    updateSyncStatus();
+    try {
+      await clearOfflineData();
+    } catch (error) {
+      console.error(error);
+    }
     showToast("Signed out");
   });
 
@@ -750,13 +984,11 @@ function attachEventListeners() {
     event.preventDefault();
     const payload = sanitisePayload(formDataToObject(elements.createToolForm));
     try {
-      await api("/tools", { method: "POST", body: payload });
+      const outcome = await submitWrite("POST", "/tools", payload);
       elements.createToolForm.reset();
-      await loadDashboard();
-      showToast("Tool created");
+      showToast(outcome.queued ? QUEUED_MESSAGE : "Tool created");
     } catch (error) {
-      console.error(error);
-      showToast(error.message, "error");
+      reportWriteError(error);
     }
   });
 
@@ -764,14 +996,12 @@ function attachEventListeners() {
     event.preventDefault();
     const payload = sanitisePayload(formDataToObject(elements.createMaintenanceForm));
     try {
-      await api("/maintenance", { method: "POST", body: payload });
+      const outcome = await submitWrite("POST", "/maintenance", payload);
       elements.createMaintenanceForm.reset();
       applyDefaultUserId();
-      await loadDashboard();
-      showToast("Maintenance log recorded");
+      showToast(outcome.queued ? QUEUED_MESSAGE : "Maintenance log recorded");
     } catch (error) {
-      console.error(error);
-      showToast(error.message, "error");
+      reportWriteError(error);
     }
   });
 
@@ -779,14 +1009,12 @@ function attachEventListeners() {
     event.preventDefault();
     const payload = sanitisePayload(formDataToObject(elements.createShotCounterForm));
     try {
-      await api("/shot-counters", { method: "POST", body: payload });
+      const outcome = await submitWrite("POST", "/shot-counters", payload);
       elements.createShotCounterForm.reset();
       applyDefaultUserId();
-      await loadDashboard();
-      showToast("Shot counter added");
+      showToast(outcome.queued ? QUEUED_MESSAGE : "Shot counter added");
     } catch (error) {
-      console.error(error);
-      showToast(error.message, "error");
+      reportWriteError(error);
     }
   });
 
@@ -794,13 +1022,11 @@ function attachEventListeners() {
     event.preventDefault();
     const payload = sanitisePayload(formDataToObject(elements.createFailureCodeForm));
     try {
-      await api("/failures/codes", { method: "POST", body: payload });
+      const outcome = await submitWrite("POST", "/failures/codes", payload);
       elements.createFailureCodeForm.reset();
-      await loadDashboard();
-      showToast("Failure code created");
+      showToast(outcome.queued ? QUEUED_MESSAGE : "Failure code created");
     } catch (error) {
-      console.error(error);
-      showToast(error.message, "error");
+      reportWriteError(error);
     }
   });
 
@@ -808,14 +1034,12 @@ function attachEventListeners() {
     event.preventDefault();
     const payload = sanitisePayload(formDataToObject(elements.createFailureReportForm));
     try {
-      await api("/failures/reports", { method: "POST", body: payload });
+      const outcome = await submitWrite("POST", "/failures/reports", payload);
       elements.createFailureReportForm.reset();
       applyDefaultUserId();
-      await loadDashboard();
-      showToast("Failure reported");
+      showToast(outcome.queued ? QUEUED_MESSAGE : "Failure reported");
     } catch (error) {
-      console.error(error);
-      showToast(error.message, "error");
+      reportWriteError(error);
     }
   });
 
@@ -823,14 +1047,12 @@ function attachEventListeners() {
     event.preventDefault();
     const payload = sanitisePayload(formDataToObject(elements.createActionForm));
     try {
-      await api("/actions", { method: "POST", body: payload });
+      const outcome = await submitWrite("POST", "/actions", payload);
       elements.createActionForm.reset();
       applyDefaultUserId();
-      await loadDashboard();
-      showToast("Action item created");
+      showToast(outcome.queued ? QUEUED_MESSAGE : "Action item created");
     } catch (error) {
-      console.error(error);
-      showToast(error.message, "error");
+      reportWriteError(error);
     }
   });
 
@@ -896,11 +1118,11 @@ function attachEventListeners() {
             refreshSelections();
             break;
           case "maintenance":
-            state.data.maintenanceLogs = await api("/maintenance");
+            state.data.maintenanceLogs = await fetchCollection("maintenanceLogs");
             renderMaintenance();
             break;
           case "shotCounters":
-            state.data.shotCounters = await api("/shot-counters");
+            state.data.shotCounters = await fetchCollection("shotCounters");
             renderShotCounters();
             break;
           case "failureCodes":
@@ -909,7 +1131,7 @@ function attachEventListeners() {
             refreshSelections();
             break;
           case "failureReports":
-            state.data.failureReports = await api("/failures/reports");
+            state.data.failureReports = await fetchCollection("failureReports");
             renderFailureReports();
             refreshSelections();
             break;
@@ -929,9 +1151,33 @@ function attachEventListeners() {
   });
 }
 
+async function syncOutbox() {
+  if (!state.token) return;
+  const outcomes = await flushOutbox();
+  if (outcomes.size) {
+    showToast(`Synced ${outcomes.size} saved change${outcomes.size === 1 ? "" : "s"}`);
+  }
+}
+
+function registerServiceWorker() {
+  if (!("serviceWorker" in navigator)) return;
+  navigator.serviceWorker.register("/sw.js").catch((error) => console.error(error));
+}
+
 attachEventListeners();
 setActiveTab(state.activeTab);
 updateAuthState();
+registerServiceWorker();
+window.addEventListener("online", () => {
+  void syncOutbox().then(() => loadDashboard({ showNotification: false }));
+});
+window.addEventListener("offline", () => {
+  state.offline = true;
+  updateSyncStatus();
+});
+setInterval(() => {
+  if (state.pendingCount) void syncOutbox();
+}, OUTBOX_RETRY_MS);
 if (state.token) {
-  void loadDashboard();
+  void syncOutbox().then(() => loadDashboard());
 }
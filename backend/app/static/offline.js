@@ -0,0 +1,94 @@
+// IndexedDB storage for offline use: cached entity lists and a durable outbox of writes.
+
+const DB_NAME = "tool-maintenance";
+const DB_VERSION = 1;
+const LISTS = "lists";
+const OUTBOX = "outbox";
+
+let databasePromise = null;
+
+function openDatabase() {
+  if (!("indexedDB" in window)) {
+    return Promise.reject(new Error("IndexedDB is not available"));
+  }
+  if (!databasePromise) {
+    databasePromise = new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+      request.onupgradeneeded = () => {
+        const database = request.result;
+        if (!database.objectStoreNames.contains(LISTS)) {
+          database.createObjectStore(LISTS);
+        }
+        if (!database.objectStoreNames.contains(OUTBOX)) {
+          // Auto-incrementing keys keep queued operations in submission order.
+          database.createObjectStore(OUTBOX, { keyPath: "seq", autoIncrement: true });
+        }
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => {
+        databasePromise = null;
+        reject(request.error);
+      };
+    });
+  }
+  return databasePromise;
+}
+
+async function withStore(storeName, mode, operation) {
+  const database = await openDatabase();
+  return new Promise((resolve, reject) => {
+    const transaction = database.transaction(storeName, mode);
+    const result = operation(transaction.objectStore(storeName));
+    transaction.oncomplete = () => resolve(result?.result);
+    transaction.onerror = () => reject(transaction.error);
+    transaction.onabort = () => reject(transaction.error);
+  });
+}
+
+function operationId() {
+  if (window.crypto?.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+export async function saveLists(lists) {
+  await withStore(LISTS, "readwrite", (store) => {
+    Object.entries(lists).forEach(([name, records]) => store.put({ records, savedAt: Date.now() }, name));
+  });
+}
+
+export async function loadLists(names) {
+  const lists = {};
+  await withStore(LISTS, "readonly", (store) => {
+    names.forEach((name) => {
+      const request = store.get(name);
+      request.onsuccess = () => {
+        lists[name] = request.result?.records ?? [];
+      };
+    });
+  });
+  return lists;
+}
+
+export async function queueOperation({ method, path, body }) {
+  const operation = { id: operationId(), method, path, body: body ?? null, queuedAt: Date.now() };
+  operation.seq = await withStore(OUTBOX, "readwrite", (store) => store.add(operation));
+  return operation;
+}
+
+export async function pendingOperations() {
+  return (await withStore(OUTBOX, "readonly", (store) => store.getAll())) ?? [];
+}
+
+export async function removeOperations(seqs) {
+  if (!seqs.length) return;
+  await withStore(OUTBOX, "readwrite", (store) => {
+    seqs.forEach((seq) => store.delete(seq));
+  });
+}
+
+export async function clearOfflineData() {
+  // Saved lists and queued writes belong to the signed-in user; none may outlive their session.
+  await Promise.all([LISTS, OUTBOX].map((storeName) => withStore(storeName, "readwrite", (store) => store.clear())));
+}
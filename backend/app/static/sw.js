@@ -0,0 +1,46 @@
+// Service worker: serve the portal shell from cache so it opens without a connection.
+// API requests always go to the network; the page keeps its own data cache in IndexedDB.
+
+const CACHE_NAME = "tool-maintenance-shell-v3";
+const APP_SHELL = ["/", "/static/styles.css", "/static/app.js", "/static/offline.js", "/static/virtual-table.js"];
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.addAll(APP_SHELL)));
+  self.skipWaiting();
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    caches
+      .keys()
+      .then((names) => Promise.all(names.filter((name) => name !== CACHE_NAME).map((name) => caches.delete(name))))
+      .then(() => self.clients.claim()),
+  );
+});
+
+self.addEventListener("fetch", (event) => {
+  const { request } = event;
+  const url = new URL(request.url);
+  if (request.method !== "GET" || url.origin !== self.location.origin) return;
+  if (url.pathname !== "/" && !url.pathname.startsWith("/static/")) return;
+
+  // Stale-while-revalidate: answer from cache immediately and refresh it in the background.
+  event.respondWith(
+    caches.open(CACHE_NAME).then(async (cache) => {
+      const cached = await cache.match(request);
+      const network = fetch(request)
+        .then((response) => {
+          if (response.ok) {
+            cache.put(request, response.clone());
+          }
+          return response;
+        })
+        .catch(() => cached);
+      if (cached) {
+        event.waitUntil(network);
+        return cached;
+      }
+      return network;
+    }),
+  );
+});
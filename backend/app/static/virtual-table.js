@@ -0,0 +1,124 @@
+// Windowed table rendering: only rows inside the scroll viewport exist in the DOM, and row
+// elements are reused by key until their rendered content changes.
+
+const DEFAULT_ROW_HEIGHT = 44;
+const DEFAULT_VIEWPORT = 600;
+const OVERSCAN = 8;
+
+export class VirtualTable {
+  constructor(container, { headers, renderRow, rowKey = (row) => row.id, emptyMessage = "No records." }) {
+    this.container = container;
+    this.headers = headers;
+    this.renderRow = renderRow;
+    this.rowKey = rowKey;
+    this.emptyMessage = emptyMessage;
+    this.rows = [];
+    this.rowHeight = DEFAULT_ROW_HEIGHT;
+    this.measured = false;
+    this.rendered = new Map();
+    this.window = null;
+    this.frame = null;
+    this.tbody = null;
+    this.container.classList.add("virtual-table");
+    this.container.addEventListener("scroll", () => this.schedule(), { passive: true });
+    if ("ResizeObserver" in window) {
+      new ResizeObserver(() => this.schedule()).observe(this.container);
+    }
+  }
+
+  setRows(rows) {
+    this.rows = rows;
+    this.window = null;
+    if (!rows.length) {
+      this.tbody = null;
+      this.rendered.clear();
+      this.container.innerHTML = `<div class="empty-state">${this.emptyMessage}</div>`;
+      return;
+    }
+    if (!this.tbody) {
+      this.mount();
+    }
+    this.render();
+  }
+
+  clear() {
+    this.rows = [];
+    this.window = null;
+    this.tbody = null;
+    this.rendered.clear();
+    this.container.innerHTML = "";
+  }
+
+  mount() {
+    const headerCells = this.headers.map((header) => `<th>${header}</th>`).join("");
+    this.container.innerHTML = `<table><thead><tr>${headerCells}</tr></thead><tbody></tbody></table>`;
+    this.tbody = this.container.querySelector("tbody");
+    this.topSpacer = this.spacer();
+    this.bottomSpacer = this.spacer();
+  }
+
+  spacer() {
+    const row = document.createElement("tr");
+    row.className = "virtual-spacer";
+    row.setAttribute("aria-hidden", "true");
+    row.innerHTML = `<td colspan="${this.headers.length}"></td>`;
+    return row;
+  }
+
+  schedule() {
+    if (this.frame || !this.tbody) return;
+    this.frame = requestAnimationFrame(() => {
+      this.frame = null;
+      this.render();
+    });
+  }
+
+  render() {
+    if (!this.tbody) return;
+    const viewport = this.container.clientHeight || DEFAULT_VIEWPORT;
+    const scrollTop = this.container.scrollTop;
+    const start = Math.max(0, Math.floor(scrollTop / this.rowHeight) - OVERSCAN);
+    const end = Math.min(this.rows.length, Math.ceil((scrollTop + viewport) / this.rowHeight) + OVERSCAN);
+
+    const visible = new Map();
+    let changed = !this.window || this.window.start !== start || this.window.end !== end;
+    const elements = [];
+    for (let index = start; index < end; index += 1) {
+      const row = this.rows[index];
+      const key = this.rowKey(row);
+      const html = this.renderRow(row, index);
+      let entry = this.rendered.get(key);
+      if (!entry || entry.html !== html) {
+        // Only rows whose content changed are rebuilt; unchanged rows keep their element.
+        const element = entry?.element ?? document.createElement("tr");
+        element.innerHTML = html;
+        entry = { html, element };
+        changed = true;
+      }
+      visible.set(key, entry);
+      elements.push(entry.element);
+    }
+    this.rendered = visible;
+    this.window = { start, end };
+
+    this.topSpacer.firstChild.style.height = `${start * this.rowHeight}px`;
+    this.bottomSpacer.firstChild.style.height = `${(this.rows.length - end) * this.rowHeight}px`;
+    this.topSpacer.hidden = start === 0;
+    this.bottomSpacer.hidden = end === this.rows.length;
+    if (changed) {
+      this.tbody.replaceChildren(this.topSpacer, ...elements, this.bottomSpacer);
+    }
+
+    if (!this.measured && elements.length) {
+      const height = elements[0].getBoundingClientRect().height;
+      if (height > 0) {
+        this.measured = true;
+        if (Math.abs(height - this.rowHeight) > 1) {
+          this.rowHeight = height;
+          this.window = null;
+          this.schedule();
+        }
+      }
+    }
+  }
+}
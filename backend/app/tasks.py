@@ -0,0 +1,220 @@
+"""Background tasks executed by the job runner."""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .alerts import evaluate_alerts
+from .backup import create_backup
+from .config import get_settings
+from .database import ReadSessionLocal
+from .idempotency import purge_expired
+from .jobs import task
+from .reports import refresh_reports
+from .retention import archive_expired, archived_shot_totals
+
+EXPORTABLE_MODELS: dict[str, type[models.Base]] = {
+    "tools": models.Tool,
+    "shot_counters": models.ToolShotCounter,
+    "maintenance_logs": models.MaintenanceLog,
+    "failure_codes": models.FailureCode,
+    "failure_reports": models.FailureReport,
+    "action_items": models.ActionItem,
+}
+
+_EXPORT_BATCH_SIZE = 1000
+
+
+def _export_path(name: str, suffix: str) -> Path:
+    directory = Path(get_settings().export_directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    return directory / f"{name}-{stamp}.{suffix}"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return value
+
+
+def _write_rows(path: Path, rows: list[list[Any]], header: Optional[list[str]] = None) -> None:
+    with path.open("a", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        if header is not None:
+            writer.writerow(header)
+        writer.writerows(rows)
+
+
+@task("export_entities")
+async def export_entities(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Stream an entity table to a CSV file in the export directory."""
+
+    entity = payload.get("entity")
+    model = EXPORTABLE_MODELS.get(entity or "")
+    if model is None:
+        raise ValueError(f"Unknown export entity: {entity}")
+
+    columns = [column.name for column in model.__table__.columns]
+    path = _export_path(entity, "csv")
+    await asyncio.to_thread(_write_rows, path, [], columns)
+
+    row_count = 0
+    # Long scans use the read pool so they do not hold up short transactional writes.
+    async with ReadSessionLocal() as read_session:
+        result = await read_session.stream(select(model.__table__).execution_options(yield_per=_EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            rows = [[_csv_value(value) for value in row] for row in partition]
+            await asyncio.to_thread(_write_rows, path, rows)
+            row_count += len(rows)
+    return {"entity": entity, "path": str(path), "rows": row_count}
+
+
+@task("reconcile_shot_counts", roles=(models.UserRole.manager, models.UserRole.admin))
+async def reconcile_shot_counts(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Recompute ``Tool.current_shot_count`` from live and archived shot counters."""
+
+    totals = (
+        select(
+            models.ToolShotCounter.tool_id,
+            func.coalesce(func.sum(models.ToolShotCounter.shot_count), 0).label("total"),
+        )
+        .group_by(models.ToolShotCounter.tool_id)
+        .subquery()
+    )
+    result = await session.execute(
+        select(
+            models.Tool.id,
+            models.Tool.initial_shot_count,
+            models.Tool.current_shot_count,
+            func.coalesce(totals.c.total, 0),
+        ).outerjoin(totals, totals.c.tool_id == models.Tool.id)
+    )
+
+    archived = await archived_shot_totals(session)
+    corrected: list[str] = []
+    skipped = 0
+    checked = 0
+    for tool_id, initial, current, counted in result.all():
+        checked += 1
+        expected = max(initial, initial + counted + archived.get(tool_id, 0))
+        if current != expected:
+            # Only overwrite the count that was read: a shot counter committed since then has
+            # already moved it, and the next run re-checks the tool instead of losing that update.
+            updated = await session.execute(
+                update(models.Tool)
+                .where(models.Tool.id == tool_id, models.Tool.current_shot_count == current)
+                .values(current_shot_count=expected)
+                .execution_options(synchronize_session=False)
+            )
+            if updated.rowcount:
+                corrected.append(tool_id)
+            else:
+                skipped += 1
+    await session.commit()
+    return {
+        "tools_checked": checked,
+        "tools_corrected": len(corrected),
+        "tools_changed_concurrently": skipped,
+        "corrected_ids": corrected,
+    }
+
+
+@task("summary_report")
+async def summary_report(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Write a JSON snapshot of fleet, failure and action totals."""
+
+    today = date.today()
+    tools_by_status = await session.execute(
+        select(models.Tool.status, func.count()).group_by(models.Tool.status)
+    )
+    failures_by_severity = await session.execute(
+        select(models.FailureReport.severity, func.count()).group_by(models.FailureReport.severity)
+    )
+    actions_by_status = await session.execute(
+        select(models.ActionItem.status, func.count()).group_by(models.ActionItem.status)
+    )
+    overdue_actions = await session.execute(
+        select(func.count()).where(
+            models.ActionItem.due_date < today,
+            models.ActionItem.status.in_((models.ActionStatus.open, models.ActionStatus.in_progress)),
+        )
+    )
+    over_limit_tools = await session.execute(
+        select(func.count()).where(
+            models.Tool.max_shot_count.is_not(None),
+            models.Tool.current_shot_count > models.Tool.max_shot_count,
+        )
+    )
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "tools_by_status": {status.value: count for status, count in tools_by_status.all()},
+        "tools_over_limit": over_limit_tools.scalar_one(),
+        "failures_by_severity": {severity.value: count for severity, count in failures_by_severity.all()},
+        "actions_by_status": {status.value: count for status, count in actions_by_status.all()},
+        "overdue_actions": overdue_actions.scalar_one(),
+    }
+    path = _export_path("summary-report", "json")
+    await asyncio.to_thread(path.write_text, json.dumps(report, indent=2), "utf-8")
+    return {"path": str(path), **report}
+
+
+@task("refresh_reports", roles=())
+async def refresh_reports_task(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Rebuild the report periods touched since the last build, or every period with ``full``."""
+
+    return {"reports": await refresh_reports(session, payload.get("reports"), full=bool(payload.get("full")))}
+
+
+@task("evaluate_alerts", roles=())
+async def evaluate_alerts_task(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Raise and deliver overdue action and shot threshold alerts."""
+
+    return await evaluate_alerts(session)
+
+
+@task("archive_expired_records", roles=(models.UserRole.admin,))
+async def archive_expired_records(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Move shot counters, audit logs and integration events past their retention age to archive files."""
+
+    return {"archived": await archive_expired(session)}
+
+
+@task("purge_idempotency_keys", roles=(models.UserRole.admin,))
+async def purge_idempotency_keys(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Delete idempotency records whose replay window has passed."""
+
+    purged = await purge_expired(await session.connection())
+    await session.commit()
+    return {"purged": purged}
+
+
+@task("backup_database", roles=())
+async def backup_database(session: AsyncSession, payload: dict[str, Any]) -> dict[str, Any]:
+    """Take an online snapshot of the SQLite database and rotate old snapshots."""
+
+    return await create_backup(payload.get("label"))
+
+
+__all__ = [
+    "EXPORTABLE_MODELS",
+    "archive_expired_records",
+    "backup_database",
+    "evaluate_alerts_task",
+    "export_entities",
+    "purge_idempotency_keys",
+    "reconcile_shot_counts",
+    "refresh_reports_task",
+    "summary_report",
+]
@@ -0,0 +1,488 @@
+"""Lightweight in-process request tracing exported as OpenTelemetry (OTLP/JSON) spans.
+
+Each HTTP request and background job runs in a trace. The sampling decision is made once
+at the root: an incoming W3C ``traceparent`` header decides for the caller, otherwise
+``TRACING_SAMPLE_RATIO`` of trace ids are kept. Unsampled work only pays for a context
+variable lookup per span.
+
+Sampled traces get spans for FastAPI dependency resolution, the endpoint and response
+serialisation, ``crud`` calls, session commits, every SQL statement and enqueued jobs.
+Jobs carry their enqueuer's ``traceparent`` so their execution joins the same trace.
+Finished traces are kept in a ring buffer and can be appended as OTLP/JSON lines to
+``TRACING_EXPORT_PATH``.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable, Iterator, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MAX_STATEMENT_LENGTH = 2000
+SCOPE_NAME = "app.tracing"
+
+
+class SpanKind(IntEnum):
+    """OTLP span kinds."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+    PRODUCER = 4
+    CONSUMER = 5
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    kind: SpanKind = SpanKind.INTERNAL
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    error: Optional[str] = None
+    _started: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or self.start_ns) - self.start_ns) / 1_000_000
+
+    def record_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + time.perf_counter_ns() - self._started
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": int(self.kind),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 0},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+@dataclass
+class _Trace:
+    trace_id: str
+    spans: list[Span] = field(default_factory=list)
+    dropped: int = 0
+
+    def open(self, name: str, kind: SpanKind, parent_span_id: Optional[str], attributes: dict[str, Any]) -> Span:
+        span = Span(name, self.trace_id, os.urandom(8).hex(), parent_span_id, kind, attributes)
+        if len(self.spans) < get_settings().tracing_max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+        return span
+
+
+_current: ContextVar[Optional[tuple[_Trace, Span]]] = ContextVar("trace_span", default=None)
+_buffer: OrderedDict[str, list[Span]] = OrderedDict()
+_buffer_lock = threading.Lock()
+_installed: set[int] = set()
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple[str, str, bool]]:
+    """Return ``(trace_id, parent_span_id, sampled)`` from a W3C ``traceparent`` header."""
+
+    if not value:
+        return None
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def _head_sampled(trace_id: str) -> bool:
+    # Same rule as OpenTelemetry's TraceIdRatioBased sampler, so decisions agree across services.
+    ratio = get_settings().tracing_sample_ratio
+    return int(trace_id[16:], 16) < ratio * 2**64
+
+
+def current_span() -> Optional[Span]:
+    state = _current.get()
+    return state[1] if state is not None else None
+
+
+def current_traceparent() -> Optional[str]:
+    """``traceparent`` of the active span, for handing the trace to other work."""
+
+    span = current_span()
+    return span.traceparent if span is not None else None
+
+
+@contextmanager
+def start_trace(
+    name: str, kind: SpanKind = SpanKind.INTERNAL, traceparent: Optional[str] = None, **attributes: Any
+) -> Iterator[Optional[Span]]:
+    """Run the block as the root of a new trace, or of a continued one when ``traceparent`` is given.
+
+    Yields the root span, or ``None`` when the trace is not sampled.
+    """
+
+    settings = get_settings()
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_span_id, sampled = parent
+    else:
+        trace_id, parent_span_id = os.urandom(16).hex(), None
+        sampled = _head_sampled(trace_id)
+    if not (settings.tracing_enabled and sampled):
+        token = _current.set(None)
+        try:
+            yield None
+        finally:
+            _current.reset(token)
+        return
+
+    trace = _Trace(trace_id)
+    root = trace.open(name, kind, parent_span_id, attributes)
+    token = _current.set((trace, root))
+    try:
+        yield root
+    except Exception as exc:
+        root.record_error(exc)
+        raise
+    finally:
+        _current.reset(token)
+        root.end()
+        if trace.dropped:
+            root.attributes["tracing.dropped_spans"] = trace.dropped
+        export(trace.spans)
+
+
+@contextmanager
+def span(name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the block as a child of the active span; a no-op outside a sampled trace."""
+
+    state = _current.get()
+    if state is None:
+        yield None
+        return
+    trace, parent = state
+    child = trace.open(name, kind, parent.span_id, attributes)
+    token = _current.set((trace, child))
+    try:
+        yield child
+    except Exception as exc:
+        child.record_error(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def traced(
+    name: Optional[str] = None, kind: SpanKind = SpanKind.INTERNAL
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorate a coroutine function so each call is a span named ``module.function``."""
+
+    def decorator(function: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        span_name = name or f"{function.__module__.rsplit('.', 1)[-1]}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            if _current.get() is None:
+                return await function(*args, **kwargs)
+            with span(span_name, kind):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def export(spans: Iterable[Span]) -> None:
+    """Add finished spans to the ring buffer and the export file."""
+
+    finished = [span for span in spans if span.end_ns is not None]
+    if not finished:
+        return
+    settings = get_settings()
+    trace_id = finished[0].trace_id
+    with _buffer_lock:
+        _buffer.setdefault(trace_id, []).extend(finished)
+        _buffer.move_to_end(trace_id)
+        while len(_buffer) > settings.tracing_buffer_traces:
+            _buffer.popitem(last=False)
+    if settings.tracing_export_path:
+        line = json.dumps(otlp_json(finished), separators=(",", ":"))
+        try:
+            path = Path(settings.tracing_export_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with _buffer_lock, path.open("a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+        except OSError:
+            logger.exception("Could not export trace %s", trace_id)
+
+
+def otlp_json(spans: Iterable[Span]) -> dict[str, Any]:
+    """Wrap spans in an OTLP/JSON ``ExportTraceServiceRequest``."""
+
+    resource = {"service.name": get_settings().app_name, "process.pid": os.getpid()}
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes(resource)},
+                "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [span.to_otlp() for span in spans]}],
+            }
+        ]
+    }
+
+
+def recent_traces() -> list[list[Span]]:
+    """Buffered traces, most recently finished first."""
+
+    with _buffer_lock:
+        return [list(spans) for spans in reversed(_buffer.values())]
+
+
+def get_trace(trace_id: str) -> Optional[list[Span]]:
+    with _buffer_lock:
+        spans = _buffer.get(trace_id.lower())
+        return list(spans) if spans is not None else None
+
+
+def _open_child(name: str, kind: SpanKind, attributes: dict[str, Any]) -> Optional[tuple[Span, Any, Any]]:
+    state = _current.get()
+    if state is None:
+        return None
+    trace, parent = state
+    child = trace.open(name, kind, parent.span_id, attributes)
+    return child, _current.set((trace, child)), state
+
+
+def _close_child(handle: tuple[Span, Any, Any], error: Optional[BaseException] = None) -> None:
+    child, token, previous = handle
+    if error is not None:
+        child.record_error(error)
+    child.end()
+    try:
+        _current.reset(token)
+    except ValueError:  # ended from a different context than it started in
+        _current.set(previous)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    state = _current.get()
+    if state is None:
+        return
+    trace, parent = state
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    child = trace.open(
+        operation,
+        SpanKind.CLIENT,
+        parent.span_id,
+        {
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            "db.operation": operation,
+            "db.executemany": executemany or None,
+        },
+    )
+    conn.info.setdefault("trace_spans", []).append(child)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+    spans = conn.info.get("trace_spans")
+    if spans:
+        child = spans.pop()
+        if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+            child.attributes["db.rows_affected"] = cursor.rowcount
+        child.end()
+
+
+def _handle_error(exception_context) -> None:  # noqa: ANN001
+    connection = exception_context.connection
+    spans = connection.info.get("trace_spans") if connection is not None else None
+    if spans:
+        child = spans.pop()
+        child.record_error(exception_context.original_exception)
+        child.end()
+
+
+def _before_commit(session: Session) -> None:
+    handle = _open_child("session.commit", SpanKind.INTERNAL, {})
+    if handle is not None:
+        session.info.setdefault("trace_commit", []).append(handle)
+
+
+def _after_commit(session: Session) -> None:
+    handles = session.info.get("trace_commit")
+    if handles:
+        _close_child(handles.pop())
+
+
+def _after_rollback(session: Session) -> None:
+    handles = session.info.get("trace_commit")
+    if handles:
+        _close_child(handles.pop(), RuntimeError("commit rolled back"))
+
+
+def install(engines: Iterable[Engine]) -> None:
+    """Emit spans for SQL statements on ``engines`` and for ORM session commits."""
+
+    if not _installed:
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        _installed.add(id(Session))
+    for engine in engines:
+        if id(engine) in _installed:
+            continue
+        _installed.add(id(engine))
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _traced_endpoint(run_endpoint_function: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(run_endpoint_function)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _current.get() is None:
+            return await run_endpoint_function(*args, **kwargs)
+        call = getattr(kwargs.get("dependant"), "call", None)
+        with span(f"endpoint {getattr(call, '__name__', 'handler')}"):
+            return await run_endpoint_function(*args, **kwargs)
+
+    return wrapper
+
+
+def instrument_fastapi() -> None:
+    """Give FastAPI's dependency resolution, endpoint call and response serialisation their own spans.
+
+    These stages are module functions of ``fastapi.routing`` looked up at call time; any
+    that a FastAPI release no longer has are left alone.
+    """
+
+    from fastapi import routing  # noqa: WPS433 - only needed when tracing is enabled
+
+    if getattr(routing, "_app_tracing_installed", False):
+        return
+    if hasattr(routing, "solve_dependencies"):
+        routing.solve_dependencies = traced("resolve dependencies")(routing.solve_dependencies)
+    if hasattr(routing, "run_endpoint_function"):
+        routing.run_endpoint_function = _traced_endpoint(routing.run_endpoint_function)
+    if hasattr(routing, "serialize_response"):
+        routing.serialize_response = traced("serialize response")(routing.serialize_response)
+    routing._app_tracing_installed = True
+
+
+class TracingMiddleware:
+    """ASGI middleware running every HTTP request in a (possibly unsampled) trace."""
+
+    def __init__(self, app: Any) -> None:
+        from .database import get_engine, get_read_engine  # noqa: WPS433 - avoid a circular import
+
+        self.app = app
+        install({id(engine): engine for engine in (get_engine().sync_engine, get_read_engine().sync_engine)}.values())
+        instrument_fastapi()
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = next(
+            (value.decode("latin-1") for name, value in scope.get("headers", ()) if name == b"traceparent"), None
+        )
+        method = scope["method"]
+        with start_trace(
+            method, SpanKind.SERVER, traceparent, **{"http.request.method": method, "url.path": scope["path"]}
+        ) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message: dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    root.attributes["http.response.status_code"] = status
+                    if status >= 500:
+                        root.error = f"HTTP {status}"
+                    headers = [*message.get("headers", ()), (b"x-trace-id", root.trace_id.encode())]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    root.name = f"{method} {route}"
+                    root.attributes["http.route"] = route
+
+
+__all__ = [
+    "Span",
+    "SpanKind",
+    "TracingMiddleware",
+    "current_span",
+    "current_traceparent",
+    "export",
+    "get_trace",
+    "install",
+    "instrument_fastapi",
+    "otlp_json",
+    "parse_traceparent",
+    "recent_traces",
+    "span",
+    "start_trace",
+    "traced",
+]